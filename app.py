@@ -1,8 +1,70 @@
-from flask import Flask, request, jsonify
-from bridge_simulator.hand_generator import BridgeHandGenerator
+import os
+import time
+_IMPORT_START = time.perf_counter()
 
+from flask import Flask, request, jsonify, g, Response
+from bridge_simulator import metrics, warmup
+
+# redeal and libdds are imported on first use (or by the background warm-up),
+# so the health check never pays for them.
 app = Flask(__name__)
-generator = BridgeHandGenerator()
+_generator = None
+
+def get_generator():
+    # The generator is stateless, so an extra instance created by a race is harmless
+    global _generator
+    if _generator is None:
+        from bridge_simulator.hand_generator import BridgeHandGenerator
+        _generator = BridgeHandGenerator()
+    return _generator
+
+# Pre-solved deal corpus (see bridge_simulator/corpus.py), opened on first use
+CORPUS_PATH = os.environ.get('BRIDGE_CORPUS')
+_corpus = None
+
+def get_corpus():
+    global _corpus
+    if _corpus is None and CORPUS_PATH and os.path.exists(CORPUS_PATH):
+        from bridge_simulator.corpus import Corpus
+        _corpus = Corpus(CORPUS_PATH)
+    return _corpus
+
+# Worker instances for /api/cluster, as comma-separated base URLs
+WORKER_URLS = [url for url in os.environ.get('BRIDGE_WORKERS', '').split(',') if url]
+
+# Most processes a lead study may fork to solve its deals. Off (1) by default:
+# the 512 MB VM has room for one solver, and forking a threaded worker is only
+# safe where the deployment has been checked for it.
+LEAD_WORKERS = max(1, int(os.environ.get('BRIDGE_LEAD_WORKERS', 1)))
+
+# Endpoints whose latency and queue depth are exported on /metrics
+TIMED_ENDPOINTS = ('/api/simulate', '/api/generate-hands', '/api/shard')
+
+@app.before_request
+def start_request_timer():
+    if request.path in TIMED_ENDPOINTS:
+        g.request_start = time.perf_counter()
+        metrics.registry.add_gauge('bridge_http_requests_in_flight', 1, endpoint=request.path)
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        metrics.registry.observe('bridge_http_request_seconds', time.perf_counter() - start,
+                                 metrics.REQUEST_BUCKETS, endpoint=request.path)
+        metrics.registry.inc('bridge_http_requests_total', endpoint=request.path,
+                             status=response.status_code)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    if request.path in TIMED_ENDPOINTS:
+        metrics.registry.add_gauge('bridge_http_requests_in_flight', -1, endpoint=request.path)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics merged across all workers on this machine."""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/generate-hands')
 def generate_hands():
@@ -73,9 +135,41 @@ def generate_hands():
             return jsonify({"error": "Invalid controls format. Expected format: N:6-8,E:4-6"}), 400
     
     # Generate hands with constraints
-    hands = generator.generate_hands(num_hands=num_hands, **constraints)
+    warmup.wait_until_ready()
+    hands = get_generator().generate_hands(num_hands=num_hands, **constraints)
     return jsonify(hands)
 
+@app.route('/api/frequency', methods=['POST'])
+def frequency():
+    """
+    Exact probability that a deal satisfies the given generator_params.
+    Computed analytically, so it never deals or loads redeal.
+    """
+    data = request.json
+    if not data:
+        return jsonify({"error": "Missing JSON data"}), 400
+
+    generator_params = dict(data.get('generator_params', {}))
+    generator_params.pop('num_hands', None)
+
+    # JSON has no tuples: ranges arrive as lists
+    for key in ('hcp', 'hand_losers', 'controls'):
+        for p, value in generator_params.get(key, {}).items():
+            generator_params[key][p] = tuple(value)
+    for p, config in generator_params.get('smart_stack', {}).items():
+        if 'hcp' in config and isinstance(config['hcp'], list):
+            config['hcp'] = tuple(config['hcp'])
+
+    from bridge_simulator import frequency as frequency_calc
+    try:
+        probability = frequency_calc.probability(**generator_params)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "probability": probability,
+        "one_in": 1 / probability if probability else None,
+    })
+
 @app.route('/api/simulate', methods=['POST'])
 def simulate():
     """
@@ -101,48 +195,176 @@ def simulate():
     num_simulations = int(data.get('num_events', 100))
     strategies_json = data.get('strategies', [])
     
+    warmup.wait_until_ready()
     from bridge_simulator.strategies import DecisionStrategy
     from bridge_simulator.simulator import SimulationRunner
+    from bridge_simulator import comparison, scoring
     
     strategies = [DecisionStrategy(s) for s in strategies_json]
-    runner = SimulationRunner()
+    runner = SimulationRunner(corpus=get_corpus())
+    # 'none', 'NS', 'EW', 'both', or 'sweep' for all four from the same solves
+    vulnerability = data.get('vulnerability', 'none')
+    if vulnerability != 'sweep' and vulnerability not in scoring.VULNERABILITIES:
+        return jsonify({"error": f"Invalid vulnerability: {vulnerability}"}), 400
     
-    def simulation_callback(deal, solver):
-        result = {}
-        scores = {}
-        for strategy in strategies:
-            decision = strategy.evaluate(deal)
-            contract = decision['contract']
-            declarer = decision['declarer']
-            score = solver.get_score(contract, declarer, vulnerable=False)
-            result[f"{strategy.name}_contract"] = contract
-            result[f"{strategy.name}_score"] = score
-            scores[strategy.name] = score
-
-        if len(strategies) == 2:
-            s1 = strategies[0].name
-            s2 = strategies[1].name
-            diff = scores[s1] - scores[s2]
-            result[f"diff_{s1}_minus_{s2}"] = diff
-            
-            # Track winner for win percentage display
-            if diff > 0:
-                result["winner"] = "A_wins"
-            elif diff < 0:
-                result["winner"] = "B_wins"
-            else:
-                result["winner"] = "tie"
-            
-        return result
-
     try:
-        report = runner.run(simulation_callback, num_simulations=num_simulations, generator_params=generator_params)
+        if vulnerability == 'sweep':
+            report = runner.run_sweep(lambda v: comparison.strategy_callback(strategies, v),
+                                      num_simulations=num_simulations, generator_params=generator_params,
+                                      mode=data.get('mode', 'auto'))
+            return jsonify(report)
+        if data.get('mode') == 'disagreement':
+            report = comparison.run_disagreement(runner, strategies, num_simulations=num_simulations,
+                                                 generator_params=generator_params, vulnerable=vulnerability)
+            return jsonify(report)
+        if data.get('mode') == 'racing':
+            report = comparison.run_racing(runner, strategies, num_simulations=num_simulations,
+                                           generator_params=generator_params, vulnerable=vulnerability)
+            return jsonify(report)
+        if data.get('checkpoint'):
+            # Resumable Monte Carlo run: posting the same id again continues or extends it
+            from bridge_simulator import checkpoint
+            problem = checkpoint.persistence_problem()
+            if problem:
+                message = (f"Checkpoints will not survive a restart: {problem}. "
+                           f"Set BRIDGE_CHECKPOINT_DIR to a directory on a persistent volume.")
+                if checkpoint.REQUIRE_PERSISTENT:
+                    return jsonify({"error": message}), 400
+                print(f"WARNING: {message}")
+            try:
+                path = checkpoint.job_path(data['checkpoint'])
+                report = runner.run_checkpointed(comparison.strategy_callback(strategies, vulnerability), path,
+                                                 num_simulations=num_simulations, generator_params=generator_params,
+                                                 spec={'strategies': strategies_json, 'vulnerability': vulnerability})
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            if problem:
+                report['warning'] = message
+            return jsonify(report)
+        report = runner.run(comparison.strategy_callback(strategies, vulnerability), num_simulations=num_simulations,
+                            generator_params=generator_params, mode=data.get('mode', 'auto'),
+                            stratify_by=data.get('stratify_by', 'hcp'),
+                            stratify_seat=data.get('stratify_seat'),
+                            control_variates=data.get('control_variates'),
+                            with_par=bool(data.get('par')),
+                            with_tricks=bool(data.get('tricks')),
+                            temper=float(data.get('temper', 1.0)))
         return jsonify(report)
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/lead_study', methods=['POST'])
+def lead_study():
+    """
+    Score every opening lead against a contract over simulated deals.
+    The leader (declarer's left-hand opponent) must be in generator_params.predeal.
+    `workers` asks for parallel solving, capped at BRIDGE_LEAD_WORKERS.
+    """
+    data = request.json
+    if not data:
+        return jsonify({"error": "Missing JSON data"}), 400
+
+    generator_params = dict(data.get('generator_params', {}))
+    generator_params.pop('num_hands', None)
+    for p, config in generator_params.get('smart_stack', {}).items():
+        if 'hcp' in config and isinstance(config['hcp'], list):
+            config['hcp'] = tuple(config['hcp'])
+
+    warmup.wait_until_ready()
+    from bridge_simulator.simulator import SimulationRunner
+
+    try:
+        report = SimulationRunner().run_lead_study(data.get('contract', ''), data.get('declarer', ''),
+                                                   num_simulations=int(data.get('num_events', 100)),
+                                                   generator_params=generator_params,
+                                                   workers=min(max(1, int(data.get('workers', LEAD_WORKERS))),
+                                                               LEAD_WORKERS))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(report)
+
+@app.route('/api/sweep', methods=['POST'])
+def sweep():
+    """
+    Run a simulation at every point of a parameter grid on one shared deal pool.
+    `grid` maps dotted paths into the request ('generator_params.…' or
+    'strategies.…') to the values to try.
+    """
+    data = request.json
+    if not data:
+        return jsonify({"error": "Missing JSON data"}), 400
+
+    generator_params = dict(data.get('generator_params', {}))
+    generator_params.pop('num_hands', None)
+    vulnerability = data.get('vulnerability', 'none')
+
+    warmup.wait_until_ready()
+    from bridge_simulator.simulator import SimulationRunner
+    from bridge_simulator import scoring, sweep as grid_sweep
+
+    if vulnerability not in scoring.VULNERABILITIES:
+        return jsonify({"error": f"Invalid vulnerability: {vulnerability}"}), 400
+    try:
+        report = grid_sweep.run_grid(SimulationRunner(), data.get('strategies', []), data.get('grid', {}),
+                                     num_simulations=int(data.get('num_events', 100)),
+                                     generator_params=generator_params, vulnerable=vulnerability)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(report)
+
+@app.route('/api/shard', methods=['POST'])
+def shard():
+    """
+    Worker side of a sharded simulation (see bridge_simulator/cluster.py): deal
+    num_events deals from the seed and return their mergeable summaries.
+    """
+    data = request.json
+    if not data or 'seed' not in data:
+        return jsonify({"error": "Missing spec or seed"}), 400
+
+    warmup.wait_until_ready()
+    from bridge_simulator import cluster
+
+    try:
+        partial = cluster.run_shard(data.get('spec', {}), int(data.get('num_events', 100)), int(data['seed']))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(partial)
+
+@app.route('/api/cluster', methods=['POST'])
+def cluster_simulate():
+    """
+    Run a simulation sharded over the worker instances listed in BRIDGE_WORKERS
+    (comma-separated base URLs). Takes the body of /api/simulate plus optional
+    `shards` and `seed`.
+    """
+    data = request.json
+    if not data:
+        return jsonify({"error": "Missing JSON data"}), 400
+    if not WORKER_URLS:
+        return jsonify({"error": "No workers configured (BRIDGE_WORKERS)"}), 400
+
+    from bridge_simulator import cluster
+
+    spec = {key: data[key] for key in ('generator_params', 'strategies', 'vulnerability') if key in data}
+    try:
+        report = cluster.Coordinator(WORKER_URLS).run(spec, num_simulations=int(data.get('num_events', 100)),
+                                                      shards=data.get('shards'), seed=data.get('seed'))
+    except cluster.ShardRejected as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 503
+    return jsonify(report)
+
+@app.route('/healthz')
+def healthz():
+    """Cheap liveness check for the platform; never touches redeal or DDS."""
+    return jsonify({"status": "ok", "warm": warmup.is_ready(), "startup_phases": warmup.phases})
+
 @app.route('/')
 def index():
     return "Bridge Simulator API Running. <br><a href='/simulation'>Go to Simulation Lab</a>"
@@ -157,5 +379,8 @@ def send_static(path):
     from flask import send_from_directory
     return send_from_directory('static', path)
 
+warmup.report_import_time(time.perf_counter() - _IMPORT_START)
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
+    warmup.start_background_warmup()
+    app.run(debug=True, port=int(os.environ.get('PORT', 5000)))
@@ -0,0 +1,279 @@
+"""
+Local load generator for the Flask API.
+
+Drives /api/simulate and /api/generate-hands at a fixed concurrency and reports
+throughput, latency percentiles, error and timeout rates and the resident memory
+of every worker (read from the app's /metrics endpoint).
+
+Against an app that is already running:
+
+    python benchmarks/loadtest.py --url http://127.0.0.1:8080 --concurrency 4 --duration 30
+
+Or let the script start gunicorn itself on a free local port:
+
+    python benchmarks/loadtest.py --spawn --workers 2 --threads 1 --concurrency 4
+
+Only the standard library is used; no external services are contacted.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Same shape as the payload in bridge_simulator/tests/test_api_simulate.py
+SIMULATE_PAYLOAD = {
+    "num_events": 20,
+    "generator_params": {
+        "predeal": {"S": "AKQJ AKQJ AK AK"},
+        "smart_stack": {"N": {"shape": "balanced", "hcp": [0, 5]}}
+    },
+    "strategies": [
+        {"name": "Bid7NT", "root": {"type": "contract", "contract": "7N", "declarer": "S"}},
+        {"name": "Bid1NT", "root": {"type": "contract", "contract": "1N", "declarer": "S"}}
+    ]
+}
+
+# The 1NT vs Stayman study from simulations/major_vs_1nt.py, as sent by the UI
+STAYMAN_PAYLOAD = {
+    "num_events": 20,
+    "generator_params": {
+        "predeal": {"S": "K842 QT72 986 52"},
+        "smart_stack": {"N": {"shape": "balanced", "hcp": [15, 17]}}
+    },
+    "strategies": [
+        {"name": "Pass1NT", "root": {"type": "contract", "contract": "1N", "declarer": "N"}},
+        {"name": "Stayman", "root": {
+            "type": "branch",
+            "condition": {"type": "suit_length", "suit": "H", "operator": ">=", "value": 4},
+            "true_branch": {"type": "contract", "contract": "2H", "declarer": "N"},
+            "false_branch": {
+                "type": "branch",
+                "condition": {"type": "suit_length", "suit": "S", "operator": ">=", "value": 4},
+                "true_branch": {"type": "contract", "contract": "2S", "declarer": "N"},
+                "false_branch": {"type": "contract", "contract": "2H", "declarer": "S"}
+            }
+        }}
+    ]
+}
+
+GENERATE_QUERIES = [
+    "num_hands=5",
+    "num_hands=10&hcp=N:15-17",
+    "num_hands=5&suit_holding=E:S6",
+    "num_hands=5&hand_shape=S:5332&controls=N:4-8",
+]
+
+
+class Stats:
+    """Thread-safe collection of per-endpoint latencies and outcomes."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.timeouts = {}
+
+    def record(self, endpoint, latency=None, error=False, timeout=False):
+        with self.lock:
+            if timeout:
+                self.timeouts[endpoint] = self.timeouts.get(endpoint, 0) + 1
+            elif error:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+            else:
+                self.latencies.setdefault(endpoint, []).append(latency)
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def spawn_app(workers, threads, timeout):
+    """Start gunicorn on a free local port and wait until it answers."""
+    port = free_port()
+    cmd = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+           '--workers', str(workers), '--threads', str(threads), '--timeout', str(timeout), 'app:app']
+    proc = subprocess.Popen(cmd, cwd=ROOT)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {proc.returncode}")
+        try:
+            urllib.request.urlopen(url + '/', timeout=2).read()
+            return proc, url
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("Timed out waiting for the app to start")
+
+
+def scrape_memory(url):
+    """Return {pid: rss_bytes} from the app's /metrics endpoint."""
+    try:
+        text = urllib.request.urlopen(url + '/metrics', timeout=5).read().decode()
+    except (urllib.error.URLError, OSError):
+        return {}
+    memory = {}
+    for match in re.finditer(r'^process_resident_memory_bytes\{pid="(\d+)"\} (\S+)$', text, re.M):
+        memory[match.group(1)] = float(match.group(2))
+    return memory
+
+
+def one_request(url, endpoint, timeout, num_events):
+    if endpoint == '/api/simulate':
+        payload = dict(random.choice([SIMULATE_PAYLOAD, STAYMAN_PAYLOAD]), num_events=num_events)
+        req = urllib.request.Request(url + endpoint, data=json.dumps(payload).encode(),
+                                     headers={'Content-Type': 'application/json'}, method='POST')
+    else:
+        req = urllib.request.Request(f"{url}{endpoint}?{random.choice(GENERATE_QUERIES)}")
+    start = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def run_load(url, concurrency, duration, max_requests, simulate_share, timeout, num_events):
+    stats = Stats()
+    peak_memory = {}
+    stop_at = time.time() + duration
+    issued = [0]
+    issued_lock = threading.Lock()
+
+    def next_ticket():
+        with issued_lock:
+            if time.time() >= stop_at or (max_requests and issued[0] >= max_requests):
+                return False
+            issued[0] += 1
+            return True
+
+    def worker():
+        while next_ticket():
+            endpoint = '/api/simulate' if random.random() < simulate_share else '/api/generate-hands'
+            try:
+                stats.record(endpoint, one_request(url, endpoint, timeout, num_events))
+            except socket.timeout:
+                stats.record(endpoint, timeout=True)
+            except urllib.error.URLError as e:
+                is_timeout = isinstance(e.reason, socket.timeout)
+                stats.record(endpoint, error=not is_timeout, timeout=is_timeout)
+            except (OSError, ValueError):
+                stats.record(endpoint, error=True)
+
+    def sample_memory():
+        while time.time() < stop_at and not done.is_set():
+            for pid, rss in scrape_memory(url).items():
+                peak_memory[pid] = max(peak_memory.get(pid, 0), rss)
+            done.wait(2)
+
+    done = threading.Event()
+    sampler = threading.Thread(target=sample_memory, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    elapsed = time.perf_counter() - start
+    done.set()
+    for pid, rss in scrape_memory(url).items():
+        peak_memory[pid] = max(peak_memory.get(pid, 0), rss)
+    return stats, elapsed, peak_memory
+
+
+def build_report(stats, elapsed, peak_memory, concurrency):
+    report = {'concurrency': concurrency, 'elapsed_seconds': elapsed, 'endpoints': {},
+              'worker_peak_rss_mb': {pid: rss / 2 ** 20 for pid, rss in sorted(peak_memory.items())}}
+    endpoints = set(stats.latencies) | set(stats.errors) | set(stats.timeouts)
+    for endpoint in sorted(endpoints):
+        latencies = stats.latencies.get(endpoint, [])
+        errors = stats.errors.get(endpoint, 0)
+        timeouts = stats.timeouts.get(endpoint, 0)
+        total = len(latencies) + errors + timeouts
+        report['endpoints'][endpoint] = {
+            'requests': total,
+            'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'mean_ms': statistics.mean(latencies) * 1000 if latencies else float('nan'),
+            'error_rate': errors / total if total else 0.0,
+            'timeout_rate': timeouts / total if total else 0.0,
+        }
+    return report
+
+
+def print_report(report):
+    print(f"Concurrency {report['concurrency']}, {report['elapsed_seconds']:.1f}s")
+    print(f"{'endpoint':22} {'reqs':>6} {'rps':>8} {'p50ms':>9} {'p95ms':>9} {'p99ms':>9} {'err%':>6} {'tmo%':>6}")
+    for endpoint, row in report['endpoints'].items():
+        print(f"{endpoint:22} {row['requests']:6d} {row['throughput_rps']:8.2f} {row['p50_ms']:9.1f} "
+              f"{row['p95_ms']:9.1f} {row['p99_ms']:9.1f} {row['error_rate']*100:6.1f} {row['timeout_rate']*100:6.1f}")
+    print("Worker peak RSS (MB):")
+    for pid, mb in report['worker_peak_rss_mb'].items():
+        print(f"  pid {pid}: {mb:.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='Base URL of a running app, e.g. http://127.0.0.1:8080')
+    parser.add_argument('--spawn', action='store_true', help='Start gunicorn locally instead of using --url')
+    parser.add_argument('--workers', type=int, default=1, help='gunicorn workers when spawning')
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker when spawning')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to keep issuing requests')
+    parser.add_argument('--requests', type=int, default=0, help='Stop after this many requests (0 = no limit)')
+    parser.add_argument('--simulate-share', type=float, default=0.2,
+                        help='Fraction of requests sent to /api/simulate; the rest go to /api/generate-hands')
+    parser.add_argument('--num-events', type=int, default=20, help='num_events per simulate request')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Client timeout per request (s)')
+    parser.add_argument('--json', help='Also write the report to this file')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if not args.url and not args.spawn:
+        parser.error('either --url or --spawn is required')
+    random.seed(args.seed)
+
+    proc = None
+    url = args.url.rstrip('/') if args.url else None
+    if args.spawn:
+        proc, url = spawn_app(args.workers, args.threads, int(args.timeout))
+    try:
+        stats, elapsed, peak_memory = run_load(url, args.concurrency, args.duration, args.requests,
+                                               args.simulate_share, args.timeout, args.num_events)
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    report = build_report(stats, elapsed, peak_memory, args.concurrency)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+"""
+Micro-benchmarks for the generator, solver, strategies and runner.
+
+Every benchmark reseeds the random module before it runs, so the same deals
+are produced and solved on every invocation. Benchmarks of work done on deals
+(solving, strategy evaluation, formatting) deal them once up front, clear the
+bitboards and trick tables cached on them before each repeat, and time only
+the loop over them; only the benchmarks selected by --filter deal anything.
+Results are written as JSON and can be compared against a stored baseline.
+Throughput depends on the machine, so no baseline is committed: the first run
+on a machine must save one, and later runs compare against it:
+
+    python benchmarks/run_benchmarks.py --out bench_results.json
+    python benchmarks/run_benchmarks.py --save-baseline
+    python benchmarks/run_benchmarks.py --compare benchmarks/baseline.json
+
+A benchmark counts as a regression when its throughput drops more than
+--tolerance (default 15%) below the baseline; the script then exits with 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+# Ensure we can import bridge_simulator
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from bridge_simulator.hand_generator import BridgeHandGenerator
+from bridge_simulator.double_dummy import DoubleDummySolver
+from bridge_simulator.strategies import DecisionStrategy
+from bridge_simulator.simulator import SimulationRunner
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+SEED = 20240601
+
+CONSTRAINT_MIXES = {
+    'none': {},
+    'hcp_only': {'hcp': {'N': (12, 14)}},
+    'smartstack_bal_15_17': {'smart_stack': {'N': {'shape': 'balanced', 'hcp': (15, 17)}}},
+    'rare_any_shape': {'any_shape': {'E': '(55)xx'}},
+}
+
+
+def deep_strategy(depth: int) -> DecisionStrategy:
+    """Build a strategy whose evaluation walks `depth` alternating conditions."""
+    node = {"type": "contract", "contract": "3N", "declarer": "N"}
+    for level in range(depth):
+        if level % 2:
+            condition = {"type": "hcp", "operator": ">=", "value": 10 + level % 5}
+        else:
+            condition = {"type": "suit_length", "suit": "SHDC"[level % 4], "operator": ">=", "value": 2}
+        node = {
+            "type": "branch",
+            "condition": condition,
+            "true_branch": node,
+            "false_branch": {"type": "contract", "contract": "1N", "declarer": "N"},
+        }
+    return DecisionStrategy({"name": f"Deep{depth}", "root": node})
+
+
+def seeded_deals(count: int, **params):
+    """Deals for the benchmarks that consume them, dealt once before any timing."""
+    random.seed(SEED)
+    return list(BridgeHandGenerator().yield_deals(num_hands=count, **params))
+
+
+def clear_deal_caches(deals):
+    """Drop the bitboards and trick tables cached on the deals, so every run starts cold."""
+    for deal in deals:
+        for attr in ('_bitboard', '_trick_table'):
+            try:
+                delattr(deal, attr)
+            except AttributeError:
+                pass
+
+
+def bench_generate_hands(params, count):
+    def run():
+        BridgeHandGenerator().generate_hands(num_hands=count, **params)
+        return count
+    return run
+
+
+def bench_yield_deals(params, count):
+    def run():
+        return sum(1 for _ in BridgeHandGenerator().yield_deals(num_hands=count, **params))
+    return run
+
+
+def bench_get_score(count):
+    deals = seeded_deals(count)
+
+    def run():
+        # A new solver per deal starts with an empty trick cache
+        for deal in deals:
+            DoubleDummySolver(deal).get_score("4S", "N", vulnerable=False)
+        return count
+    run.reset = lambda: clear_deal_caches(deals)
+    return run
+
+
+def bench_full_table(count):
+    deals = seeded_deals(count)
+
+    def run():
+        for deal in deals:
+            DoubleDummySolver(deal).get_trick_table()
+        return count
+    run.reset = lambda: clear_deal_caches(deals)
+    return run
+
+
+def bench_strategy_evaluate(depth, count):
+    strategy = deep_strategy(depth)
+    deals = seeded_deals(50)
+
+    def run():
+        for i in range(count):
+            strategy.evaluate(deals[i % len(deals)])
+        return count
+    run.reset = lambda: clear_deal_caches(deals)
+    return run
+
+
+def bench_format_hand(count):
+    generator = BridgeHandGenerator()
+    deals = seeded_deals(50)
+
+    def run():
+        for i in range(count):
+            generator._format_hand(deals[i % len(deals)])
+        return count
+    run.reset = lambda: clear_deal_caches(deals)
+    return run
+
+
+def bench_runner(count):
+    strategies = [deep_strategy(4), DecisionStrategy(
+        {"name": "Bid3NT", "root": {"type": "contract", "contract": "3N", "declarer": "N"}})]
+
+    def callback(deal, solver):
+        result = {}
+        for strategy in strategies:
+            decision = strategy.evaluate(deal)
+            result[f"{strategy.name}_score"] = solver.get_score(
+                decision['contract'], decision['declarer'], vulnerable=False)
+            result[f"{strategy.name}_contract"] = decision['contract']
+        return result
+
+    def run():
+        report = SimulationRunner().run(callback, num_simulations=count,
+                                        generator_params=CONSTRAINT_MIXES['smartstack_bal_15_17'])
+        return report['simulations_run']
+    return run
+
+
+def build_benchmarks(quick: bool):
+    """
+    Benchmark name -> factory of its timed function. Factories deal their
+    inputs when called, so only the selected benchmarks pay for them.
+    """
+    scale = 1 if quick else 5
+    benchmarks = {}
+    for mix, params in CONSTRAINT_MIXES.items():
+        count = 20 * scale if mix == 'rare_any_shape' else 100 * scale
+        benchmarks[f'generate_hands[{mix}]'] = lambda params=params, count=count: bench_generate_hands(params, count)
+        benchmarks[f'yield_deals[{mix}]'] = lambda params=params, count=count: bench_yield_deals(params, count)
+    benchmarks['dds_get_score'] = lambda: bench_get_score(10 * scale)
+    benchmarks['dds_full_table'] = lambda: bench_full_table(2 * scale)
+    benchmarks['strategy_evaluate[depth=12]'] = lambda: bench_strategy_evaluate(12, 2000 * scale)
+    benchmarks['format_hand'] = lambda: bench_format_hand(1000 * scale)
+    benchmarks['runner_end_to_end'] = lambda: bench_runner(10 * scale)
+    return benchmarks
+
+
+def time_benchmark(func, repeats: int):
+    """
+    Return the median throughput (ops/s) over `repeats` seeded runs. A
+    benchmark's `reset`, if it has one, runs before each repeat, off the clock.
+    """
+    rates = []
+    ops = 0
+    reset = getattr(func, 'reset', None)
+    for _ in range(repeats):
+        if reset is not None:
+            reset()
+        random.seed(SEED)
+        start = time.perf_counter()
+        ops = func()
+        elapsed = time.perf_counter() - start
+        rates.append(ops / elapsed if elapsed > 0 else float('inf'))
+    return {'ops': ops, 'ops_per_sec': statistics.median(rates), 'runs': rates}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(__file__), text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Print a comparison table and return the names of regressed benchmarks."""
+    regressions = []
+    print(f"{'benchmark':40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, current in results['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            print(f"{name:40} {'-':>12} {current['ops_per_sec']:12.1f} {'new':>8}")
+            continue
+        change = current['ops_per_sec'] / base['ops_per_sec'] - 1
+        flag = ''
+        if change < -tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:40} {base['ops_per_sec']:12.1f} {current['ops_per_sec']:12.1f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out', default='bench_output.json', help='Where to write the JSON results')
+    parser.add_argument('--compare', metavar='BASELINE', help='Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help=f'Also write results to {DEFAULT_BASELINE}')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative slowdown')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--quick', action='store_true', help='Smaller workloads for a fast smoke run')
+    parser.add_argument('--filter', default='', help='Only run benchmarks whose name contains this text')
+    args = parser.parse_args(argv)
+
+    results = {
+        'meta': {
+            'seed': SEED,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'quick': args.quick,
+        },
+        'results': {},
+    }
+    if args.compare and not os.path.exists(args.compare):
+        parser.error(f"No baseline at {args.compare}; record one first with --save-baseline")
+    for name, factory in build_benchmarks(args.quick).items():
+        if args.filter not in name:
+            continue
+        results['results'][name] = time_benchmark(factory(), args.repeats)
+        print(f"{name:40} {results['results'][name]['ops_per_sec']:12.1f} ops/s")
+
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('quick') != args.quick:
+            print("Warning: baseline and current run use different workload sizes (--quick).")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+"""
+Estimators used to summarize simulation results.
+
+Plain runs summarize each result key over equally weighted deals. Stratified
+runs draw a fixed number of deals from each stratum; a stratum's results are
+summarized on their own and then combined with the stratum weights (its
+probability under the generator constraints), so over- or under-sampling a
+stratum does not bias the answer.
+"""
+import math
+import statistics
+from typing import Any, Dict, List, Sequence, Tuple
+
+
+def is_numeric(value) -> bool:
+    return isinstance(value, (int, float))
+
+
+def summarize(values: Sequence, exact: bool = False) -> Dict[str, Any]:
+    """
+    Summary of one result key.
+
+    Numeric values give mean, stdev, min, max and the standard error of the
+    mean. When `exact` the values are the whole population (exhaustive runs),
+    so stdev is the population standard deviation and the mean has no error.
+    Other values give a count per distinct value.
+    """
+    if not is_numeric(values[0]):
+        return count_values(values)
+    mean = statistics.mean(values)
+    if exact:
+        stdev = statistics.pstdev(values)
+        stderr = 0.0
+    else:
+        stdev = statistics.stdev(values) if len(values) > 1 else 0.0
+        stderr = stdev / math.sqrt(len(values))
+    return {
+        'mean': mean,
+        'stdev': stdev,
+        'stderr': stderr,
+        'min': min(values),
+        'max': max(values)
+    }
+
+
+def count_values(values: Sequence, weight: float = 1.0) -> Dict[str, float]:
+    # Convert to string to be safe for counting
+    counts = {}
+    for v in values:
+        v_str = str(v)
+        counts[v_str] = counts.get(v_str, 0) + weight
+    return counts
+
+
+def stratified(strata: List[Tuple[float, Sequence]]) -> Dict[str, Any]:
+    """
+    Combine per-stratum values of one result key.
+
+    Args:
+        strata: (weight, values) per stratum. Weights are normalized over the
+                strata that have values.
+
+    Returns:
+        For numeric values: the weighted mean, the stdev of the underlying
+        distribution, the stratified standard error
+        sqrt(sum W_h^2 s_h^2 / n_h), and min/max. For other values: weighted
+        counts scaled to the number of deals, so shares read as with plain runs.
+    """
+    strata = [(w, values) for w, values in strata if values and w > 0]
+    total_weight = sum(w for w, _ in strata)
+    strata = [(w / total_weight, values) for w, values in strata]
+    num_deals = sum(len(values) for _, values in strata)
+
+    if not is_numeric(strata[0][1][0]):
+        counts = {}
+        for w, values in strata:
+            for key, c in count_values(values, w * num_deals / len(values)).items():
+                counts[key] = counts.get(key, 0) + c
+        return counts
+
+    means = [statistics.mean(values) for _, values in strata]
+    variances = [statistics.variance(values) if len(values) > 1 else 0.0 for _, values in strata]
+    mean = sum(w * m for (w, _), m in zip(strata, means))
+    # Law of total variance: within-stratum plus between-stratum spread
+    variance = sum(w * (v + (m - mean) ** 2) for (w, _), m, v in zip(strata, means, variances))
+    stderr = math.sqrt(sum(w * w * v / len(values) for (w, values), v in zip(strata, variances)))
+    return {
+        'mean': mean,
+        'stdev': math.sqrt(variance),
+        'stderr': stderr,
+        'min': min(min(values) for _, values in strata),
+        'max': max(max(values) for _, values in strata)
+    }
+
+
+def allocate(weights: Sequence[float], total: int, minimum: int = 2) -> List[int]:
+    """
+    Proportional allocation of `total` deals to strata (largest remainder),
+    with at least `minimum` deals per stratum so each one has a variance.
+    """
+    total_weight = sum(weights)
+    shares = [w / total_weight * total for w in weights]
+    counts = [max(minimum, int(s)) for s in shares]
+    by_remainder = sorted(range(len(weights)), key=lambda i: shares[i] - int(shares[i]), reverse=True)
+    for i in by_remainder:
+        if sum(counts) >= total:
+            break
+        counts[i] += 1
+    # The minimum can push us over budget: take the excess from the largest strata
+    while sum(counts) > total and max(counts) > minimum:
+        counts[counts.index(max(counts))] -= 1
+    return counts
+
+
+def _solve(matrix: List[List[float]], vector: List[float]) -> List[float]:
+    """Solve a small linear system by Gaussian elimination with partial pivoting."""
+    size = len(vector)
+    rows = [list(row) + [v] for row, v in zip(matrix, vector)]
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda r: abs(rows[r][col]))
+        if abs(rows[pivot][col]) < 1e-12:
+            raise ValueError("Singular system")
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(col + 1, size):
+            factor = rows[r][col] / rows[col][col]
+            for c in range(col, size + 1):
+                rows[r][c] -= factor * rows[col][c]
+    solution = [0.0] * size
+    for r in reversed(range(size)):
+        solution[r] = (rows[r][size] - sum(rows[r][c] * solution[c] for c in range(r + 1, size))) / rows[r][r]
+    return solution
+
+
+def control_variate(values: Sequence[float], features: Sequence[Sequence[float]],
+                    expectations: Sequence[float]) -> Dict[str, float]:
+    """
+    Control-variate estimate of the mean of `values`.
+
+    Each deal's features (cheap, with known expectations) are regressed out:
+    mean(y) - beta . (mean(x) - E[x]), with beta the least-squares
+    coefficients. The standard error uses the residual variance, so a
+    feature that explains a fraction R^2 of the variance cuts the error by
+    sqrt(1 - R^2), i.e. the same precision for proportionally fewer deals.
+
+    Features that do not vary are dropped. Returns an empty dict when there
+    are too few values for the regression or no usable feature.
+    """
+    n = len(values)
+    columns = [j for j in range(len(expectations)) if len({row[j] for row in features}) > 1]
+    k = len(columns)
+    if k == 0 or n <= k + 1:
+        return {}
+    mean_y = statistics.mean(values)
+    mean_x = [statistics.mean(row[j] for row in features) for j in columns]
+    dx = [[row[j] - m for j, m in zip(columns, mean_x)] for row in features]
+    dy = [v - mean_y for v in values]
+    sxx = [[sum(d[a] * d[b] for d in dx) for b in range(k)] for a in range(k)]
+    sxy = [sum(d[a] * e for d, e in zip(dx, dy)) for a in range(k)]
+    syy = sum(e * e for e in dy)
+    try:
+        beta = _solve(sxx, sxy)
+    except ValueError:
+        return {}
+    adjusted = mean_y - sum(b * (m - expectations[j]) for b, m, j in zip(beta, mean_x, columns))
+    residual_variance = max(syy - sum(b * c for b, c in zip(beta, sxy)), 0.0) / (n - k - 1)
+    raw_variance = syy / (n - 1)
+    return {
+        'cv_mean': adjusted,
+        'cv_stderr': math.sqrt(residual_variance / n),
+        'cv_variance_reduction': 1 - residual_variance / raw_variance if raw_variance > 0 else 0.0,
+    }
+
+
+def weighted(values: Sequence, weights: Sequence[float]) -> Dict[str, Any]:
+    """
+    Self-normalized importance-sampling summary of one result key.
+
+    Numeric values give the weighted mean and stdev and the delta-method
+    standard error sqrt(sum w^2 (y - mean)^2) / sum w. Other values give
+    weighted counts scaled to the number of deals.
+    """
+    total = sum(weights)
+    if not is_numeric(values[0]):
+        counts = {}
+        for v, w in zip(values, weights):
+            counts[str(v)] = counts.get(str(v), 0) + w * len(values) / total
+        return counts
+    mean = sum(w * v for v, w in zip(values, weights)) / total
+    variance = sum(w * (v - mean) ** 2 for v, w in zip(values, weights)) / total
+    stderr = math.sqrt(sum((w * (v - mean)) ** 2 for v, w in zip(values, weights))) / total
+    return {
+        'mean': mean,
+        'stdev': math.sqrt(variance),
+        'stderr': stderr,
+        'min': min(values),
+        'max': max(values)
+    }
+
+
+def effective_sample_size(weights: Sequence[float]) -> float:
+    """Kish's effective sample size (sum w)^2 / sum w^2."""
+    squares = sum(w * w for w in weights)
+    return sum(weights) ** 2 / squares if squares else 0.0
+
+
+class RunningStats:
+    """
+    Streaming mean and variance (Welford), mergeable with Chan's formula so
+    partial results from chunks or workers combine exactly.
+    """
+
+    __slots__ = ('n', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: 'RunningStats'):
+        if other.n == 0:
+            return
+        if self.n == 0:
+            self.n, self.mean, self.m2, self.min, self.max = other.n, other.mean, other.m2, other.min, other.max
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    @property
+    def stderr(self) -> float:
+        return self.stdev / math.sqrt(self.n) if self.n else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {'mean': self.mean, 'stdev': self.stdev, 'stderr': self.stderr, 'min': self.min, 'max': self.max}
+
+    def to_state(self) -> List:
+        return [self.n, self.mean, self.m2, self.min, self.max]
+
+    @classmethod
+    def from_state(cls, state: Sequence) -> 'RunningStats':
+        stats = cls()
+        stats.n, stats.mean, stats.m2, stats.min, stats.max = state
+        return stats
+
+
+class ResultStats:
+    """
+    Mergeable summaries of every result key: RunningStats for numeric keys and
+    counts for the others. summary() matches summarize() over all the values
+    added, without keeping them.
+    """
+
+    def __init__(self):
+        self.numeric = {}
+        self.counts = {}
+
+    def add(self, results: Dict[str, Sequence]):
+        """Add the values per result key of some deals."""
+        for key, values in results.items():
+            if not values:
+                continue
+            if is_numeric(values[0]):
+                stats = self.numeric.setdefault(key, RunningStats())
+                for v in values:
+                    stats.add(v)
+            else:
+                counts = self.counts.setdefault(key, {})
+                for v, c in count_values(values).items():
+                    counts[v] = counts.get(v, 0) + c
+
+    def merge(self, other: 'ResultStats'):
+        for key, stats in other.numeric.items():
+            self.numeric.setdefault(key, RunningStats()).merge(stats)
+        for key, counts in other.counts.items():
+            mine = self.counts.setdefault(key, {})
+            for v, c in counts.items():
+                mine[v] = mine.get(v, 0) + c
+
+    def summary(self) -> Dict[str, Any]:
+        stats = {key: s.summary() for key, s in self.numeric.items()}
+        stats.update({key: dict(counts) for key, counts in self.counts.items()})
+        return stats
+
+    def to_state(self) -> Dict[str, Any]:
+        return {'numeric': {key: s.to_state() for key, s in self.numeric.items()},
+                'counts': {key: dict(counts) for key, counts in self.counts.items()}}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'ResultStats':
+        stats = cls()
+        stats.numeric = {key: RunningStats.from_state(s) for key, s in state['numeric'].items()}
+        stats.counts = {key: dict(counts) for key, counts in state['counts'].items()}
+        return stats
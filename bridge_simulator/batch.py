@@ -0,0 +1,239 @@
+"""
+Batch runs of simulation scenarios.
+
+A scenario is a Python file defining SCENARIO (or a list, SCENARIOS) as a dict:
+
+    SCENARIO = {
+        'name': 'major_vs_1nt',
+        'generator_params': {...},
+        'callback': major_vs_1nt_callback,   # (deal, solver) -> results
+        'num_simulations': 1000,
+    }
+
+or a YAML file (needs PyYAML) holding the same keys, with 'strategies' (the
+DecisionStrategy trees of /api/simulate) and an optional 'vulnerability' in
+place of the callback. Python scenarios may also give strategies.
+
+Scenarios with identical generator_params form a group. Each group's deals
+are dealt once, and every scenario's callback runs on the same deals with the
+same solver, so a contract two scenarios both score is solved once. A
+scenario asking for fewer deals than its group uses the first ones. Groups
+small enough to enumerate are walked exhaustively, as in SimulationRunner.run.
+
+    python -m bridge_simulator run simulations/*.py --workers 4 --out reports
+"""
+import argparse
+import csv
+import importlib.util
+import json
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+from . import comparison, scoring, sweep
+from .double_dummy import DoubleDummySolver
+from .simulator import SimulationRunner
+from .strategies import DecisionStrategy
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+DEFAULT_SIMULATIONS = 1000
+
+# Deals per chunk. Chunks are the unit of seeding, so their size must not
+# depend on the number of workers for a seeded run to deal the same deals.
+BATCH_CHUNK_SIZE = 250
+
+# Statistics written to the CSV report, one row per scenario and result key
+CSV_FIELDS = ['scenario', 'key', 'mean', 'stdev', 'stderr', 'min', 'max']
+
+# (runner, scenarios, generator_params, exhaustive) of the group in progress,
+# inherited by forked workers like simulator._chunk_task
+_group_task = None
+
+
+def _callback(spec: Dict[str, Any], path: str):
+    if spec.get('callback') is not None:
+        return spec['callback']
+    if spec.get('strategies'):
+        strategies = [DecisionStrategy(s) for s in spec['strategies']]
+        return comparison.strategy_callback(strategies, spec.get('vulnerability', 'none'))
+    raise ValueError(f"Scenario in {path} needs a callback or strategies")
+
+
+def load_scenarios(path: str) -> List[Dict[str, Any]]:
+    """
+    The scenarios of a .py or .yaml file, each with 'name', 'generator_params',
+    'callback' and 'num_simulations' filled in.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if path.endswith('.py'):
+        spec = importlib.util.spec_from_file_location(f"scenario_{stem}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        specs = getattr(module, 'SCENARIOS', None) or [getattr(module, 'SCENARIO', None)]
+    elif path.endswith(('.yaml', '.yml')):
+        if yaml is None:
+            raise ValueError("YAML scenarios need PyYAML (pip install pyyaml)")
+        with open(path) as f:
+            loaded = yaml.safe_load(f)
+        specs = loaded if isinstance(loaded, list) else [loaded]
+    else:
+        raise ValueError(f"Scenarios must be .py or .yaml files: {path}")
+    if not all(isinstance(spec, dict) for spec in specs):
+        raise ValueError(f"{path} defines no SCENARIO")
+
+    scenarios = []
+    for i, spec in enumerate(specs):
+        scenarios.append({
+            'name': spec.get('name') or (stem if len(specs) == 1 else f"{stem}_{i}"),
+            'generator_params': sweep.tuple_ranges(dict(spec.get('generator_params') or {})),
+            'callback': _callback(spec, path),
+            'num_simulations': int(spec.get('num_simulations', DEFAULT_SIMULATIONS)),
+        })
+    return scenarios
+
+
+def group_key(generator_params: Dict[str, Any]) -> str:
+    """Scenarios share deals exactly when these keys are equal."""
+    return json.dumps(generator_params, sort_keys=True)
+
+
+def _collect_chunk(task) -> List:
+    """
+    Deal or enumerate one chunk and run every scenario on it; returns per
+    scenario (values per result key, deals evaluated).
+    """
+    runner, scenarios, generator_params, walk = _group_task
+    start, stop, seed = task
+    if walk:
+        deals = runner.generator.enumerate_deals(start, stop, **generator_params)
+    else:
+        # Each chunk deals from its own generator, never from the shared random
+        # module, so no chunk moves the state later groups draw their seeds from
+        deals = runner.generator.yield_seeded_deals(random.Random(seed), num_hands=stop - start,
+                                                    **generator_params)
+
+    parts = [({}, 0) for _ in scenarios]
+    for index, deal in enumerate(deals, start):
+        solver = DoubleDummySolver(deal)
+        for j, scenario in enumerate(scenarios):
+            if not walk and index >= scenario['num_simulations']:
+                continue
+            try:
+                result = scenario['callback'](deal, solver)
+            except Exception as e:
+                print(f"Error in scenario {scenario['name']} deal {index}: {e}")
+                continue
+            accumulator, count = parts[j]
+            for key, value in result.items():
+                accumulator.setdefault(key, []).append(value)
+            parts[j] = (accumulator, count + 1)
+    return parts
+
+
+def run_group(runner: SimulationRunner, scenarios: List[Dict[str, Any]], workers: int = 1,
+              rng: random.Random = None) -> Dict[str, Any]:
+    """
+    Run scenarios sharing generator_params on one set of deals; returns a report per scenario name.
+    The group's chunk seeds are drawn from rng (a fresh unseeded generator by default).
+    """
+    global _group_task
+    generator_params = scenarios[0]['generator_params']
+    num_deals = max(scenario['num_simulations'] for scenario in scenarios)
+    layouts = runner._enumerable_layouts(generator_params)
+    walk = layouts is not None and layouts <= num_deals
+    total = layouts if walk else num_deals
+
+    # Each chunk's seed comes from its index, as cluster.split seeds shards
+    seeds = random.Random((rng or random.Random()).getrandbits(32))
+    tasks = [(start, min(start + BATCH_CHUNK_SIZE, total), seeds.getrandbits(32))
+             for start in range(0, total, BATCH_CHUNK_SIZE)]
+    _group_task = (runner, scenarios, generator_params, walk)
+    try:
+        if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+            chunks = [_collect_chunk(task) for task in tasks]
+        else:
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                chunks = list(pool.map(_collect_chunk, tasks))
+    finally:
+        _group_task = None
+
+    reports = {}
+    for j, scenario in enumerate(scenarios):
+        # Merge in deal order so the result does not depend on the worker count
+        results_accumulator = {}
+        count = 0
+        for parts in chunks:
+            part_results, part_count = parts[j]
+            for key, values in part_results.items():
+                results_accumulator.setdefault(key, []).extend(values)
+            count += part_count
+        results_accumulator.update(scoring.derived_results(results_accumulator))
+        report = runner._aggregate(results_accumulator, count, exact=walk)
+        report['method'] = 'exhaustive' if walk else 'monte_carlo'
+        if walk:
+            report['layouts'] = layouts
+        report['group_deals'] = total
+        reports[scenario['name']] = report
+    return reports
+
+
+def run_scenarios(scenarios: List[Dict[str, Any]], workers: int = 1,
+                  rng: random.Random = None) -> Dict[str, Any]:
+    """
+    Run scenarios grouped by generator_params; returns a report per scenario name.
+    Every group draws its seed from rng in turn, so one seeded rng fixes all deals.
+    """
+    rng = rng or random.Random()
+    names = [scenario['name'] for scenario in scenarios]
+    if len(set(names)) != len(names):
+        raise ValueError("Scenario names must be unique")
+    groups = {}
+    for scenario in scenarios:
+        groups.setdefault(group_key(scenario['generator_params']), []).append(scenario)
+
+    runner = SimulationRunner()
+    reports = {}
+    for i, group in enumerate(groups.values()):
+        print(f"Group {i + 1}/{len(groups)}: {', '.join(scenario['name'] for scenario in group)}")
+        reports.update(run_group(runner, group, workers, rng))
+    return {name: reports[name] for name in names}
+
+
+def write_reports(reports: Dict[str, Any], out_dir: str):
+    """One JSON report per scenario and summary.csv with the numeric statistics of all."""
+    os.makedirs(out_dir, exist_ok=True)
+    for name, report in reports.items():
+        with open(os.path.join(out_dir, f"{name}.json"), 'w') as f:
+            json.dump(report, f, indent=2)
+    with open(os.path.join(out_dir, 'summary.csv'), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for name, report in reports.items():
+            for key, stats in report['stats'].items():
+                if 'mean' in stats:
+                    writer.writerow({'scenario': name, 'key': key,
+                                     **{field: stats[field] for field in CSV_FIELDS[2:]}})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bridge_simulator', description="Run simulation scenarios in batch.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help="Run scenario files (.py or .yaml)")
+    run_parser.add_argument('paths', nargs='+')
+    run_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    run_parser.add_argument('--out', default='reports', help="Directory for the JSON and CSV reports")
+    run_parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    scenarios = [scenario for path in args.paths for scenario in load_scenarios(path)]
+    reports = run_scenarios(scenarios, workers=args.workers, rng=random.Random(args.seed))
+    write_reports(reports, args.out)
+    for name, report in reports.items():
+        print(f"{name}: {report['simulations_run']} deals ({report['method']})")
+    print(f"Reports written to {args.out}")
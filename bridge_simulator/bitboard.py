@@ -0,0 +1,83 @@
+"""
+Bitboard view of a deal: one 13-bit mask per seat per suit.
+
+Masks use the layout of the evaluators module (ace = bit 12, deuce = bit 0),
+so suit lengths are popcounts and honor features are table lookups. The view
+is built from the holdings of each redeal Hand, without creating Card objects,
+and is cached on the deal so the generator filter and every strategy
+condition share one conversion.
+"""
+from typing import Dict, List, Tuple
+from . import evaluators
+
+SEATS = ['N', 'E', 'S', 'W']
+SUITS = ['S', 'H', 'D', 'C']
+SEAT_INDEX = {seat: i for i, seat in enumerate(SEATS)}
+SUIT_INDEX = {suit: i for i, suit in enumerate(SUITS)}
+
+
+class DealBitboard:
+    """Immutable per-seat, per-suit rank masks of a deal."""
+
+    __slots__ = ('masks',)
+
+    def __init__(self, masks: Tuple[Tuple[int, int, int, int], ...]):
+        self.masks = masks
+
+    @classmethod
+    def from_deal(cls, deal) -> 'DealBitboard':
+        """Build from a redeal Deal (four Hands, each four holdings in S, H, D, C order)."""
+        return cls(tuple(evaluators.hand_masks(deal[seat]) for seat in range(4)))
+
+    @classmethod
+    def from_formatted(cls, hands: Dict[str, Dict[str, List[str]]]) -> 'DealBitboard':
+        """Build from the {'N': {'S': ['A', 'K'], ...}, ...} format returned by generate_hands."""
+        return cls(tuple(
+            tuple(evaluators.holding_mask(hands.get(seat, {}).get(suit, [])) for suit in SUITS)
+            for seat in SEATS
+        ))
+
+    def hand(self, seat: int) -> Tuple[int, int, int, int]:
+        return self.masks[seat]
+
+    def length(self, seat: int, suit: int) -> int:
+        return self.masks[seat][suit].bit_count()
+
+    def shape(self, seat: int) -> Tuple[int, int, int, int]:
+        s, h, d, c = self.masks[seat]
+        return (s.bit_count(), h.bit_count(), d.bit_count(), c.bit_count())
+
+    def hcp(self, seat: int) -> int:
+        return evaluators.hcp(self.masks[seat])
+
+    def controls(self, seat: int) -> int:
+        return evaluators.controls(self.masks[seat])
+
+    def losers(self, seat: int) -> int:
+        return evaluators.losers(self.masks[seat])
+
+    def ranks(self, seat: int, suit: int) -> List[str]:
+        """Rank characters held in a suit, highest first."""
+        mask = self.masks[seat][suit]
+        return [rank for rank in evaluators.RANK_ORDER if mask & evaluators.RANK_BITS[rank]]
+
+    def __eq__(self, other):
+        return isinstance(other, DealBitboard) and self.masks == other.masks
+
+    def __hash__(self):
+        return hash(self.masks)
+
+    def __repr__(self):
+        return f"DealBitboard({self.masks!r})"
+
+
+def bitboard_for(deal) -> DealBitboard:
+    """Return the bitboard of a deal, computing it once and caching it on the deal."""
+    board = getattr(deal, '_bitboard', None)
+    if board is None:
+        board = DealBitboard.from_deal(deal)
+        try:
+            deal._bitboard = board
+        except AttributeError:
+            pass
+    return board
@@ -0,0 +1,118 @@
+"""
+Checkpoints of long simulations.
+
+A checkpoint is a small JSON file holding everything a Monte Carlo run needs
+to continue: the mergeable summaries of the results so far
+(aggregation.ResultStats), the number of deals done, the position of the
+random generator that deals them, and the generator_params and spec the run
+was started with. It is rewritten atomically (written beside the target, then
+renamed), so a process killed mid-write leaves the previous checkpoint intact.
+
+Each job deals from its own random.Random (never the module-level generator,
+which the app's threads share), and resuming restores it, so a run
+interrupted any number of times deals the same deals as an uninterrupted one. A finished run keeps its
+checkpoint and can be extended by asking for more deals.
+"""
+import json
+import os
+import random
+import tempfile
+from typing import Any, Dict, Optional
+
+CHECKPOINT_DIR = os.environ.get(
+    'BRIDGE_CHECKPOINT_DIR',
+    os.path.join(tempfile.gettempdir(), 'bridge_simulator_checkpoints')
+)
+
+# On Fly.io the root filesystem is recreated whenever a machine restarts, so
+# checkpoints there must live on a mounted volume (see fly.toml); elsewhere a
+# directory that will not survive a restart only draws a warning
+REQUIRE_PERSISTENT = bool(os.environ.get('FLY_APP_NAME'))
+
+# Filesystems held in memory
+MEMORY_FILESYSTEMS = ('tmpfs', 'ramfs')
+
+# Deals between two checkpoint writes
+CHECKPOINT_EVERY = 1000
+
+# Bumped when the file layout changes; older checkpoints are then refused
+CHECKPOINT_VERSION = 1
+
+
+def job_path(job_id: str, directory: str = CHECKPOINT_DIR) -> str:
+    """Checkpoint file of a job id made of letters, digits, '-' and '_'."""
+    if not job_id or not all(c.isalnum() or c in '-_' for c in job_id):
+        raise ValueError(f"Invalid checkpoint id: {job_id!r}")
+    return os.path.join(directory, f"{job_id}.json")
+
+
+def _mount_point(path: str) -> str:
+    path = os.path.realpath(path)
+    while not os.path.ismount(path):
+        path = os.path.dirname(path)
+    return path
+
+
+def _filesystem_type(mount_point: str) -> Optional[str]:
+    """Type of the filesystem mounted at mount_point, from /proc/mounts where there is one."""
+    fs_type = None
+    try:
+        with open('/proc/mounts') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 2 and fields[1] == mount_point:
+                    fs_type = fields[2]
+    except OSError:
+        return None
+    return fs_type
+
+
+def persistence_problem(directory: str = CHECKPOINT_DIR) -> Optional[str]:
+    """Why checkpoints in directory would be lost when the machine restarts, or None."""
+    path = os.path.realpath(directory)
+    tmp = os.path.realpath(tempfile.gettempdir())
+    if path == tmp or path.startswith(tmp + os.sep):
+        return f"{directory} is in the temporary directory"
+    mount_point = _mount_point(path)
+    if _filesystem_type(mount_point) in MEMORY_FILESYSTEMS:
+        return f"{directory} is on an in-memory filesystem"
+    if REQUIRE_PERSISTENT and mount_point == '/':
+        return f"{directory} is on the machine's root filesystem, not a volume"
+    return None
+
+
+def rng_state(rng: random.Random) -> list:
+    """Position of a job's random generator, as JSON-friendly lists."""
+    version, internal, gauss_next = rng.getstate()
+    return [version, list(internal), gauss_next]
+
+
+def restore_rng(state: list) -> random.Random:
+    """A new random generator at the saved position."""
+    version, internal, gauss_next = state
+    rng = random.Random()
+    rng.setstate((version, tuple(internal), gauss_next))
+    return rng
+
+
+def save(path: str, state: Dict[str, Any]):
+    """Atomically replace the checkpoint at path."""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(dict(state, version=CHECKPOINT_VERSION), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load(path: str) -> Optional[Dict[str, Any]]:
+    """The checkpoint at path, or None if there is none yet."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        state = json.load(f)
+    if state.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"Checkpoint {path} has an unsupported version")
+    return state
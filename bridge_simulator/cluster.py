@@ -0,0 +1,211 @@
+"""
+Simulations sharded over several app instances.
+
+The coordinator splits a simulation into shards, each a number of deals with
+its own random seed, and posts them to worker instances of this app
+(POST /api/shard). A worker deals its shard from a random.Random seeded with
+it, leaving the process's shared generator alone, and answers with
+mergeable summaries (aggregation.ResultStats state). The coordinator merges
+them as they come back. A shard's deals depend only on its seed, so the
+result does not depend on which worker ran which shard.
+
+A worker that fails or times out is dropped and its shard goes back in the
+queue for the others. A shard the workers reject (HTTP 4xx) stops the run.
+
+Run a coordinator against local instances:
+
+    PORT=5001 python app.py &
+    PORT=5002 python app.py &
+    python -m bridge_simulator.cluster run spec.json \\
+        --workers http://127.0.0.1:5001,http://127.0.0.1:5002
+
+where spec.json holds generator_params, strategies, vulnerability and
+num_events, as posted to /api/simulate.
+"""
+import argparse
+import copy
+import json
+import queue
+import random
+import threading
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List
+from . import aggregation, exhaustive, scoring
+
+# Shards per worker, so a lost worker costs little and fast workers take more
+SHARDS_PER_WORKER = 4
+
+# Seconds a worker may take to answer one shard
+SHARD_TIMEOUT = 300
+
+# Times a shard is tried before the run fails
+MAX_ATTEMPTS = 3
+
+def split(num_simulations: int, shards: int, seed: int) -> List[Dict[str, int]]:
+    """Shards of a run: their index, number of deals and seed."""
+    rng = random.Random(seed)
+    return [{'index': i, 'num_events': stop - start, 'seed': rng.getrandbits(32)}
+            for i, (start, stop) in enumerate(exhaustive.chunk_ranges(num_simulations, shards))]
+
+
+def run_shard(spec: Dict[str, Any], num_simulations: int, seed: int) -> Dict[str, Any]:
+    """
+    Worker side: deal and score one shard.
+
+    Returns:
+        'deals' evaluated and 'stats', the ResultStats state of their results.
+    """
+    # Only workers deal, so a coordinator runs without redeal
+    from . import comparison, sweep
+    from .simulator import SimulationRunner
+    from .strategies import DecisionStrategy
+    vulnerability = spec.get('vulnerability', 'none')
+    if vulnerability not in scoring.VULNERABILITIES:
+        raise ValueError(f"Invalid vulnerability: {vulnerability}")
+    generator_params = sweep.tuple_ranges(copy.deepcopy(spec.get('generator_params') or {}))
+    generator_params.pop('num_hands', None)
+    strategies = [DecisionStrategy(s) for s in spec.get('strategies', [])]
+    callback = comparison.strategy_callback(strategies, vulnerability)
+
+    # The shard's own generator: the module-level one is shared by the app's threads
+    runner = SimulationRunner()
+    results_accumulator, count = runner.collect(
+        runner.generator.yield_seeded_deals(random.Random(seed), num_hands=num_simulations, **generator_params),
+        callback)
+    stats = aggregation.ResultStats()
+    stats.add(results_accumulator)
+    return {'deals': count, 'stats': stats.to_state()}
+
+
+def post_json(url: str, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read().decode())
+
+
+class ShardRejected(ValueError):
+    """A worker refused a shard as invalid; retrying elsewhere would not help."""
+
+
+class Coordinator:
+    """Runs simulations over worker instances given by their base URLs."""
+
+    def __init__(self, workers: List[str], timeout: float = SHARD_TIMEOUT, max_attempts: int = MAX_ATTEMPTS):
+        if not workers:
+            raise ValueError("A coordinator needs at least one worker")
+        self.workers = [worker.rstrip('/') for worker in workers]
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+
+    def run(self, spec: Dict[str, Any], num_simulations: int = 100, shards: int = None,
+            seed: int = None) -> Dict[str, Any]:
+        """
+        Run a simulation spec ({'generator_params', 'strategies', 'vulnerability'})
+        over the workers.
+
+        Returns:
+            The usual 'simulations_run' and 'stats', plus the number of 'shards',
+            shards 'reassigned' after a failure, the shards each worker completed
+            and the 'lost_workers'.
+        """
+        shards = shards or SHARDS_PER_WORKER * len(self.workers)
+        seed = random.getrandbits(32) if seed is None else seed
+        pending = queue.Queue()
+        for shard in split(num_simulations, shards, seed):
+            pending.put(dict(shard, attempts=0))
+
+        self._lock = threading.Lock()
+        self._stats = aggregation.ResultStats()
+        self._count = 0
+        self._done = {worker: 0 for worker in self.workers}
+        self._lost = []
+        self._reassigned = 0
+        self._error = None
+
+        live = list(self.workers)
+        # Workers stop when the queue looks empty; a shard put back by a lost
+        # worker after that is picked up by another round of the live ones
+        while not pending.empty() and live and self._error is None:
+            threads = [threading.Thread(target=self._serve, args=(worker, spec, pending)) for worker in live]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            live = [worker for worker in live if worker not in self._lost]
+
+        if self._error is not None:
+            raise self._error
+        if not pending.empty():
+            raise RuntimeError(f"Every worker was lost with {pending.qsize()} shards left")
+
+        return {
+            'simulations_run': self._count,
+            'stats': self._stats.summary(),
+            'method': 'cluster',
+            'shards': shards,
+            'reassigned': self._reassigned,
+            'workers': self._done,
+            'lost_workers': self._lost,
+        }
+
+    def _serve(self, worker: str, spec: Dict[str, Any], pending: queue.Queue):
+        """Post shards to one worker until the queue is empty or the worker fails."""
+        while self._error is None:
+            try:
+                shard = pending.get_nowait()
+            except queue.Empty:
+                return
+            payload = {'spec': spec, 'num_events': shard['num_events'], 'seed': shard['seed']}
+            try:
+                partial = post_json(f"{worker}/api/shard", payload, self.timeout)
+            except urllib.error.HTTPError as e:
+                if 400 <= e.code < 500:
+                    with self._lock:
+                        self._error = ShardRejected(f"Worker {worker} rejected shard {shard['index']}: {e.read().decode()}")
+                    return
+                self._lose(worker, shard, pending, e)
+                return
+            except (urllib.error.URLError, OSError, ValueError) as e:
+                self._lose(worker, shard, pending, e)
+                return
+
+            stats = aggregation.ResultStats.from_state(partial['stats'])
+            with self._lock:
+                self._stats.merge(stats)
+                self._count += partial['deals']
+                self._done[worker] += 1
+
+    def _lose(self, worker: str, shard: Dict[str, int], pending: queue.Queue, error: Exception):
+        print(f"Worker {worker} lost on shard {shard['index']}: {error}")
+        with self._lock:
+            self._lost.append(worker)
+            shard['attempts'] += 1
+            if shard['attempts'] >= self.max_attempts:
+                self._error = RuntimeError(f"Shard {shard['index']} failed {shard['attempts']} times")
+                return
+            self._reassigned += 1
+        pending.put(shard)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a simulation sharded over worker instances.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help="Coordinate one simulation")
+    run_parser.add_argument('spec', help="JSON file with generator_params, strategies, vulnerability and num_events")
+    run_parser.add_argument('--workers', required=True, help="Comma-separated worker base URLs")
+    run_parser.add_argument('--shards', type=int, default=None)
+    run_parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    coordinator = Coordinator([url for url in args.workers.split(',') if url])
+    report = coordinator.run(spec, num_simulations=int(spec.get('num_events', 100)),
+                             shards=args.shards, seed=args.seed)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
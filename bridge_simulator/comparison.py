@@ -0,0 +1,265 @@
+"""
+Comparing DecisionStrategy trees on the same deals.
+
+strategy_callback() is the per-deal callback used by the Simulation Lab: it
+scores every strategy's contract double dummy and, for two strategies, adds
+the score difference and the winner.
+
+run_disagreement() gets the same report while spending the double dummy
+budget where it matters. Strategy trees only look at cheap hand features, so
+all deals are evaluated first. When every strategy picks the same contract and
+declarer, the difference is zero and the board is a tie without solving
+anything. Only the other deals are solved, plus a small random sample of the
+agreeing ones to estimate the strategies' mean scores.
+
+run_racing() compares any number of strategies and stops evaluating the ones
+that are significantly beaten as the run goes on.
+"""
+import random
+from statistics import NormalDist
+from typing import Any, Callable, Dict, List
+from . import aggregation, scoring
+from .aggregation import RunningStats
+from .double_dummy import DoubleDummySolver
+
+# Agreeing deals solved to estimate the absolute score means
+AGREEMENT_SAMPLE_SIZE = 20
+
+
+def strategy_callback(strategies: List, vulnerable=False) -> Callable:
+    """
+    Callback for SimulationRunner.run scoring each strategy's decision on a deal.
+    `vulnerable` is the declaring side's vulnerability (a bool) or the board's
+    ('none', 'NS', 'EW' or 'both').
+    """
+    def simulation_callback(deal, solver):
+        result = {}
+        scores = {}
+        for strategy in strategies:
+            decision = strategy.evaluate(deal)
+            contract = decision['contract']
+            declarer = decision['declarer']
+            score = solver.get_score(contract, declarer, vulnerable=vulnerable)
+            result[f"{strategy.name}_contract"] = contract
+            result[f"{strategy.name}_score"] = score
+            scores[strategy.name] = score
+
+        if len(strategies) == 2:
+            s1 = strategies[0].name
+            s2 = strategies[1].name
+            diff = scores[s1] - scores[s2]
+            result[f"diff_{s1}_minus_{s2}"] = diff
+
+            # Track winner for win percentage display
+            if diff > 0:
+                result["winner"] = "A_wins"
+            elif diff < 0:
+                result["winner"] = "B_wins"
+            else:
+                result["winner"] = "tie"
+
+        return result
+
+    return simulation_callback
+
+
+def run_disagreement(runner, strategies: List, num_simulations: int = 100,
+                     generator_params: Dict[str, Any] = None, vulnerable=False,
+                     agreement_sample: int = AGREEMENT_SAMPLE_SIZE) -> Dict[str, Any]:
+    """
+    Compare strategies on num_simulations deals, solving only where they disagree.
+
+    Contract counts, the score difference, IMPs, matchpoints and win/tie/loss
+    counts are exact over all deals, since agreeing deals contribute a zero
+    difference and a tie. Each strategy's mean score combines the solved disagreeing deals with
+    a sample of up to agreement_sample agreeing deals, weighted by the
+    agreement rate.
+
+    Args:
+        runner: SimulationRunner supplying the generator and the per-deal loop.
+
+    Returns:
+        The report of SimulationRunner.run, plus 'method': 'disagreement',
+        the 'agreement_rate' and the number of double dummy solver calls ('dds_solved').
+    """
+    scored = strategy_callback(strategies, vulnerable)
+    dds_calls = 0
+
+    def callback(deal, solver):
+        nonlocal dds_calls
+        try:
+            return scored(deal, solver)
+        finally:
+            dds_calls += solver.solves
+    deals = list(runner.generator.yield_deals(num_hands=num_simulations, **(generator_params or {})))
+
+    agreeing, disagreeing = [], []
+    contracts = {f"{strategy.name}_contract": [] for strategy in strategies}
+    for i, deal in enumerate(deals):
+        try:
+            decisions = [strategy.evaluate(deal) for strategy in strategies]
+        except Exception as e:
+            # Skipped like a failing deal in SimulationRunner.collect
+            print(f"Error in disagreement deal {i}: {e}")
+            continue
+        for strategy, decision in zip(strategies, decisions):
+            contracts[f"{strategy.name}_contract"].append(decision['contract'])
+        if len({(d['contract'], d['declarer']) for d in decisions}) == 1:
+            agreeing.append(deal)
+        else:
+            disagreeing.append(deal)
+
+    solved, _ = runner.collect(disagreeing, callback)
+    sample = random.sample(agreeing, min(agreement_sample, len(agreeing)))
+    sampled, _ = runner.collect(sample, callback)
+
+    stats = {key: aggregation.count_values(values) for key, values in contracts.items() if values}
+    if len(strategies) == 2:
+        s1, s2 = strategies[0].name, strategies[1].name
+        diff_key = f"diff_{s1}_minus_{s2}"
+        diffs = solved.get(diff_key, []) + [0] * len(agreeing)
+        winners = solved.get('winner', []) + ['tie'] * len(agreeing)
+        if diffs:
+            stats[diff_key] = aggregation.summarize(diffs)
+            stats['winner'] = aggregation.count_values(winners)
+            # Agreeing deals are a push: no IMPs and an even matchpoint split
+            imps_key = f"imps_{s1}_minus_{s2}"
+            stats[imps_key] = aggregation.summarize(solved.get(imps_key, []) + [0] * len(agreeing))
+            for name in (s1, s2):
+                mp_key = f"mp_{name}"
+                stats[mp_key] = aggregation.summarize(solved.get(mp_key, []) + [0.5] * len(agreeing))
+
+    total = len(disagreeing) + len(agreeing)
+    for strategy in strategies:
+        key = f"{strategy.name}_score"
+        strata = [(len(disagreeing) / total if total else 0, solved.get(key, [])),
+                  (len(agreeing) / total if total else 0, sampled.get(key, []))]
+        if any(values for _, values in strata):
+            stats[key] = aggregation.stratified(strata)
+
+    return {
+        'simulations_run': total,
+        'stats': stats,
+        'method': 'disagreement',
+        'agreement_rate': len(agreeing) / total if total else 0.0,
+        'dds_solved': dds_calls,
+    }
+
+
+# Racing: strategies are first compared after RACING_MIN_DEALS deals, then every
+# RACING_CHECK_EVERY deals; one is dropped when another beats it by more than
+# racing_z() standard errors of their paired score difference.
+RACING_MIN_DEALS = 30
+RACING_CHECK_EVERY = 10
+# Chance, over the whole run, of dropping any strategy that is not actually worse
+RACING_ALPHA = 0.01
+CONFIDENCE_Z = 1.96
+
+
+def racing_z(num_simulations: int, num_strategies: int, min_deals: int = RACING_MIN_DEALS,
+             alpha: float = RACING_ALPHA) -> float:
+    """
+    Elimination threshold, in standard errors, for a racing run.
+
+    Every pair of strategies is tested, in both directions, at every look from
+    min_deals on. A fixed threshold would be crossed by chance more often the
+    more looks and pairs there are, so alpha is split evenly over all of them
+    (Bonferroni): each two-sided test gets alpha / (looks * pairs). For a single
+    look at one pair and alpha = 0.01 this is the usual 2.576.
+    """
+    looks = max(1, (num_simulations - min_deals) // RACING_CHECK_EVERY + 1)
+    pairs = max(1, num_strategies * (num_strategies - 1) // 2)
+    return NormalDist().inv_cdf(1 - alpha / (2 * looks * pairs))
+
+
+def run_racing(runner, strategies: List, num_simulations: int = 100,
+               generator_params: Dict[str, Any] = None, vulnerable=False,
+               min_deals: int = RACING_MIN_DEALS, alpha: float = RACING_ALPHA) -> Dict[str, Any]:
+    """
+    Compare any number of strategies, dropping dominated ones as the run goes.
+
+    Every surviving strategy is scored on every deal. Strategies that choose
+    the same contract share one solve through the solver's per-deal cache.
+    Pairwise differences are kept from paired per-deal scores. Once a strategy
+    is significantly worse than another survivor, it stops being evaluated.
+    The threshold (racing_z) keeps the chance of any wrong elimination over
+    the whole run below alpha.
+
+    Returns:
+        'stats' with each strategy's score and contract counts and the
+        pairwise 'diff_<a>_minus_<b>' and 'imps_<a>_minus_<b>' summaries; 'ranking' of the survivors
+        by mean score with 95% confidence intervals; 'eliminated' mapping
+        dropped strategies to (deal number, strategy that beat them); and
+        'dds_solved', the number of double dummy solver calls; and the
+        elimination threshold 'z'.
+    """
+    z = racing_z(num_simulations, len(strategies), min_deals, alpha)
+    names = [strategy.name for strategy in strategies]
+    alive = list(range(len(strategies)))
+    scores = [RunningStats() for _ in strategies]
+    diffs = {(a, b): RunningStats() for a in range(len(strategies)) for b in range(a + 1, len(strategies))}
+    imps = {pair: RunningStats() for pair in diffs}
+    contracts = [{} for _ in strategies]
+    eliminated = {}
+    solved = 0
+    count = 0
+
+    for deal in runner.generator.yield_deals(num_hands=num_simulations, **(generator_params or {})):
+        solver = DoubleDummySolver(deal)
+        try:
+            decisions = {i: strategies[i].evaluate(deal) for i in alive}
+            deal_scores = {i: solver.get_score(d['contract'], d['declarer'], vulnerable=vulnerable)
+                           for i, d in decisions.items()}
+        except Exception as e:
+            print(f"Error in simulation iteration {count}: {e}")
+            continue
+        finally:
+            solved += solver.solves
+        count += 1
+        for i, decision in decisions.items():
+            contracts[i][decision['contract']] = contracts[i].get(decision['contract'], 0) + 1
+        for i in alive:
+            scores[i].add(deal_scores[i])
+        for a in alive:
+            for b in alive:
+                if a < b:
+                    diffs[(a, b)].add(deal_scores[a] - deal_scores[b])
+                    imps[(a, b)].add(int(scoring.imps(deal_scores[a] - deal_scores[b])))
+
+        if count >= min_deals and (count - min_deals) % RACING_CHECK_EVERY == 0 and len(alive) > 1:
+            for loser in list(alive):
+                for winner in alive:
+                    if winner == loser:
+                        continue
+                    pair = diffs[(min(winner, loser), max(winner, loser))]
+                    margin = pair.mean if winner < loser else -pair.mean
+                    if pair.n > 1 and margin > z * pair.stderr:
+                        eliminated[names[loser]] = {'after_deals': count, 'beaten_by': names[winner]}
+                        alive.remove(loser)
+                        break
+
+    stats = {}
+    for i, name in enumerate(names):
+        if scores[i].n:
+            stats[f"{name}_score"] = scores[i].summary()
+            stats[f"{name}_contract"] = contracts[i]
+    for (a, b), pair in diffs.items():
+        if pair.n:
+            stats[f"diff_{names[a]}_minus_{names[b]}"] = dict(pair.summary(), deals=pair.n)
+            stats[f"imps_{names[a]}_minus_{names[b]}"] = dict(imps[(a, b)].summary(), deals=pair.n)
+
+    ranking = []
+    for i in sorted(alive, key=lambda i: scores[i].mean, reverse=True):
+        half = CONFIDENCE_Z * scores[i].stderr
+        ranking.append({'strategy': names[i], 'mean': scores[i].mean,
+                        'ci95': [scores[i].mean - half, scores[i].mean + half], 'deals': scores[i].n})
+
+    return {
+        'simulations_run': count,
+        'stats': stats,
+        'method': 'racing',
+        'ranking': ranking,
+        'eliminated': eliminated,
+        'dds_solved': solved,
+        'z': z,
+    }
@@ -0,0 +1,273 @@
+"""
+Pre-solved deal corpus.
+
+A corpus is a SQLite file of deals dealt under fixed generator_params, each
+stored with its full double dummy trick table. Indexed columns hold every
+seat's HCP and suit lengths. A simulation that only adds constraints to the
+corpus's own (for example the same 15-17 NT opener plus a responder range)
+is answered by filtering the corpus: the matching deals follow exactly the
+distribution live dealing would give, and their tricks are already known.
+
+Build a corpus offline:
+
+    python -m bridge_simulator.corpus build corpus.db --deals 1000000 \\
+        --params '{"smart_stack": {"N": {"shape": "balanced", "hcp": [15, 17]}}}'
+
+and point the app at it with BRIDGE_CORPUS=corpus.db.
+"""
+import argparse
+import json
+import random
+import sqlite3
+from typing import Any, Dict, List, Optional
+from redeal.redeal import Deal, Hand
+from . import evaluators, exhaustive, frequency
+from .bitboard import SEATS, bitboard_for
+from .double_dummy import DoubleDummySolver
+from .hand_generator import BridgeHandGenerator
+
+STRAINS = 'CDHSN'
+
+# Deals generated, solved and written per transaction while building
+BATCH_SIZE = 1000
+
+# Constraint keys whose per-seat entries the corpus can filter on. A predeal is
+# not among them: fixing a hand the corpus left open would match almost no deal,
+# so it must be the corpus's own.
+FILTER_KEYS = ('suit_holding', 'hcp', 'hand_shape', 'hand_losers', 'controls', 'any_shape', 'smart_stack')
+
+# Rows read per query while sampling matches
+PAGE_SIZE = 1000
+
+_SUIT_COLUMNS = [f"{suit.lower()}_{seat.lower()}" for seat in SEATS for suit in 'SHDC']
+_HCP_COLUMNS = [f"hcp_{seat.lower()}" for seat in SEATS]
+
+# Column of each seat and (seat, suit), so query text never comes from request keys
+_HCP_COLUMN = dict(zip(SEATS, _HCP_COLUMNS))
+_SUIT_COLUMN = dict(zip([(seat, suit) for seat in SEATS for suit in 'SHDC'], _SUIT_COLUMNS))
+
+
+def _normalize(params: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON round trip, so tuples and lists compare equal."""
+    return json.loads(json.dumps(params or {}, sort_keys=True))
+
+
+def _encode_tricks(table: Dict) -> str:
+    """20 hex digits: strains C, D, H, S, N, each for declarers N, E, S, W."""
+    return ''.join(format(table[(strain, seat)], 'x') for strain in STRAINS for seat in SEATS)
+
+
+def _decode_tricks(text: str) -> Dict:
+    return {(strain, seat): int(text[i * 4 + j], 16)
+            for i, strain in enumerate(STRAINS) for j, seat in enumerate(SEATS)}
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path)
+    connection.execute(f"""CREATE TABLE IF NOT EXISTS deals (
+        id INTEGER PRIMARY KEY,
+        hands TEXT NOT NULL,
+        tricks TEXT NOT NULL,
+        {', '.join(f'{column} INTEGER NOT NULL' for column in _HCP_COLUMNS + _SUIT_COLUMNS)})""")
+    connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    for seat in SEATS:
+        s = seat.lower()
+        connection.execute(f"CREATE INDEX IF NOT EXISTS idx_hcp_{s} ON deals (hcp_{s}, s_{s}, h_{s}, d_{s}, c_{s})")
+        connection.execute(f"CREATE INDEX IF NOT EXISTS idx_shape_{s} ON deals (s_{s}, h_{s}, d_{s}, c_{s})")
+    return connection
+
+
+def build(path: str, num_deals: int, generator_params: Dict[str, Any] = None,
+          batch_size: int = BATCH_SIZE) -> int:
+    """
+    Deal and solve num_deals deals into the corpus at path (created if needed).
+    An existing corpus is extended, which requires the same generator_params.
+
+    Returns:
+        Number of deals added.
+    """
+    params = _normalize(generator_params)
+    generator = BridgeHandGenerator()
+    connection = _connect(path)
+    try:
+        row = connection.execute("SELECT value FROM meta WHERE key = 'generator_params'").fetchone()
+        if row is None:
+            connection.execute("INSERT INTO meta VALUES ('generator_params', ?)", (json.dumps(params, sort_keys=True),))
+        elif json.loads(row[0]) != params:
+            raise ValueError("The corpus was built with different generator_params")
+
+        added = 0
+        placeholders = ', '.join('?' * (2 + len(_HCP_COLUMNS) + len(_SUIT_COLUMNS)))
+        while added < num_deals:
+            rows = []
+            for deal in generator.yield_deals(num_hands=min(batch_size, num_deals - added), **(generator_params or {})):
+                masks = bitboard_for(deal).masks
+                table = DoubleDummySolver(deal).get_trick_table()
+                rows.append(('|'.join(exhaustive.hand_string(hand) for hand in masks), _encode_tricks(table))
+                            + tuple(evaluators.hcp(hand) for hand in masks)
+                            + tuple(mask.bit_count() for hand in masks for mask in hand))
+            if not rows:
+                break
+            with connection:
+                connection.executemany(f"INSERT INTO deals (hands, tricks, {', '.join(_HCP_COLUMNS + _SUIT_COLUMNS)}) "
+                                       f"VALUES ({placeholders})", rows)
+            added += len(rows)
+            print(f"Corpus {path}: {added}/{num_deals} deals")
+        return added
+    finally:
+        connection.close()
+
+
+def _attach_tricks(deal, table: Dict):
+    """Hand a deal's stored trick table to the solvers that will see it."""
+    try:
+        deal._trick_table = table
+    except AttributeError:
+        # Deals that take no attributes are solved again when asked
+        pass
+
+
+class Corpus:
+    """Read access to a corpus file. Every query opens its own connection, so one instance serves all threads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        connection = _connect(path)
+        try:
+            row = connection.execute("SELECT value FROM meta WHERE key = 'generator_params'").fetchone()
+            self.size = connection.execute("SELECT COUNT(*) FROM deals").fetchone()[0]
+        finally:
+            connection.close()
+        self.generator_params = json.loads(row[0]) if row else {}
+
+    def answerable(self, generator_params: Dict[str, Any]) -> bool:
+        """
+        Whether filtering the corpus gives the distribution of a live run: the
+        query must repeat every constraint the corpus was built with and may only
+        add constraints of the kinds the corpus can filter, on seats N, E, S, W
+        and suits S, H, D, C. Its predeal must be exactly the corpus's.
+        """
+        query = _normalize(generator_params)
+        for key, entries in self.generator_params.items():
+            for seat, value in (entries or {}).items():
+                if (query.get(key) or {}).get(seat) != value:
+                    return False
+        if (query.get('predeal') or {}) != (self.generator_params.get('predeal') or {}):
+            return False
+        for key in FILTER_KEYS:
+            entries = query.get(key) or {}
+            if not isinstance(entries, dict) or any(seat not in SEATS for seat in entries):
+                return False
+        for suits in (query.get('suit_holding') or {}).values():
+            if not isinstance(suits, dict) or any(suit not in ('S', 'H', 'D', 'C') for suit in suits):
+                return False
+        return all(key in FILTER_KEYS or key in ('max_attempts_param', 'predeal') or not value
+                   for key, value in query.items())
+
+    def _where(self, query: Dict[str, Any]):
+        """SQL conditions on the indexed columns implied by the query."""
+        clauses, args = [], []
+        ranges = dict(query.get('hcp') or {})
+        for seat, config in (query.get('smart_stack') or {}).items():
+            if config.get('hcp') and seat not in (query.get('predeal') or {}):
+                ranges.setdefault(seat, config['hcp'])
+        for seat, (low, high) in ranges.items():
+            clauses.append(f"{_HCP_COLUMN[seat]} BETWEEN ? AND ?")
+            args.extend([low, high])
+        for seat, shape in (query.get('hand_shape') or {}).items():
+            for suit, length in zip('SHDC', shape):
+                if length != -1:
+                    clauses.append(f"{_SUIT_COLUMN[seat, suit]} = ?")
+                    args.append(length)
+        for seat, suits in (query.get('suit_holding') or {}).items():
+            for suit, length in suits.items():
+                clauses.append(f"{_SUIT_COLUMN[seat, suit]} >= ?")
+                args.append(length)
+        return ' AND '.join(clauses) or '1', args
+
+    def matches(self, generator_params: Dict[str, Any], num_deals: int) -> Optional[List]:
+        """
+        num_deals random corpus deals satisfying generator_params, each carrying
+        its trick table (so DoubleDummySolver needs no solve), or None when the
+        query cannot be answered from the corpus or has too few matches.
+
+        Rows are checked on their suit masks, and a Deal is built only for
+        rows that match. Reading stops as soon as the rows left under the SQL
+        conditions could no longer make up num_deals.
+        """
+        if not self.answerable(generator_params):
+            return None
+        try:
+            matches = BridgeHandGenerator().masks_filter(**(generator_params or {}))
+        except ValueError:
+            return None
+
+        where, args = self._where(_normalize(generator_params))
+        deals = []
+        connection = sqlite3.connect(self.path)
+        try:
+            remaining = connection.execute(f"SELECT COUNT(*) FROM deals WHERE {where}", args).fetchone()[0]
+            for hands, tricks in self._sample(connection, where, args):
+                if remaining < num_deals - len(deals):
+                    break
+                remaining -= 1
+                hand_strings = hands.split('|')
+                masks = tuple(frequency.parse_hand(hand) for hand in hand_strings)
+                if not matches(masks):
+                    continue
+                deal = Deal.prepare({seat: Hand.from_str(hand) for seat, hand in zip(SEATS, hand_strings)})()
+                _attach_tricks(deal, _decode_tricks(tricks))
+                deals.append(deal)
+                if len(deals) == num_deals:
+                    return deals
+        finally:
+            connection.close()
+        return None
+
+
+    @staticmethod
+    def _sample(connection: sqlite3.Connection, where: str, args: List):
+        """
+        Rows satisfying `where` in id order, starting from a random id and
+        wrapping around once, read PAGE_SIZE at a time. Deals were dealt
+        independently, so consecutive rows are as random as any others and the
+        query stops after the rows it needs instead of sorting every match.
+        """
+        top = connection.execute("SELECT MAX(id) FROM deals").fetchone()[0]
+        if top is None:
+            return
+        start = random.randint(1, top)
+        for low, high in ((start, top), (1, start - 1)):
+            while low <= high:
+                rows = connection.execute(
+                    f"SELECT id, hands, tricks FROM deals WHERE id BETWEEN ? AND ? AND ({where}) ORDER BY id LIMIT ?",
+                    [low, high] + args + [PAGE_SIZE]).fetchall()
+                if not rows:
+                    break
+                for row in rows:
+                    yield row[1:]
+                low = rows[-1][0] + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a pre-solved deal corpus.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help="Deal, solve and store deals")
+    build_parser.add_argument('path')
+    build_parser.add_argument('--deals', type=int, default=100000)
+    build_parser.add_argument('--params', default='{}', help="generator_params as JSON")
+    build_parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    params = json.loads(args.params)
+    for config in (params.get('smart_stack') or {}).values():
+        if isinstance(config.get('hcp'), list):
+            config['hcp'] = tuple(config['hcp'])
+    added = build(args.path, args.deals, params)
+    print(f"Added {added} deals to {args.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,40 @@
+import ctypes
+import threading
+import time
 from redeal.redeal import Deal
+from . import metrics, par, scoring
+from .bitboard import bitboard_for
+
+# redeal drives libdds through a single set of solver buffers, so calls from
+# concurrent request threads must be serialized. ctypes releases the GIL while
+# a solve runs, so other threads keep serving light requests meanwhile.
+_dds_lock = threading.RLock()
+
+# Strain order of the rows of a DDS table (spades, hearts, diamonds, clubs, notrump)
+DDS_STRAINS = 'SHDCN'
+# CalcDDtable's return code on success (RETURN_NO_FAULT)
+DDS_NO_FAULT = 1
+
+
+class _DDTableDeal(ctypes.Structure):
+    """libdds ddTableDeal: cards[hand][suit] as rank bit masks, hands N, E, S, W."""
+    _fields_ = [('cards', ctypes.c_uint * 4 * 4)]
+
+
+class _DDTableResults(ctypes.Structure):
+    """libdds ddTableResults: declarer's tricks as resTable[strain][hand]."""
+    _fields_ = [('resTable', ctypes.c_int * 4 * 5)]
+
+
+def _table_library():
+    """The libdds handle loaded by redeal, or None if it cannot solve whole tables."""
+    try:
+        from redeal import dds
+    except ImportError:
+        return None
+    dll = getattr(dds, 'dll', None)
+    return dll if dll is not None and hasattr(dll, 'CalcDDtable') else None
+
 
 class DoubleDummySolver:
     """A solver for performing double dummy analysis on a bridge deal."""
@@ -13,6 +49,23 @@ class DoubleDummySolver:
         if not isinstance(deal, Deal):
             raise TypeError("Input must be a redeal.redeal.Deal object.")
         self.deal = deal
+        # Results already solved on this deal, so strategies that pick the same
+        # contract (or the same strain and declarer) share one solve. Deals read
+        # from a corpus arrive with their whole table.
+        self._tricks = dict(getattr(deal, '_trick_table', None) or {})
+        self._scores = {}
+        # DDS calls made for this deal; cache hits are not counted
+        self.solves = 0
+
+    def _timed(self, kind: str, func, *args, **kwargs):
+        """Run a DDS call under the solver lock and record its latency in the metrics registry."""
+        self.solves += 1
+        with _dds_lock:
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.record_dds_solve(kind, time.perf_counter() - start)
 
     def get_tricks(self, contract_str: str, declarer_char: str) -> int:
         """
@@ -30,10 +83,16 @@ class DoubleDummySolver:
         if declarer not in ['N', 'E', 'S', 'W']:
             raise ValueError("Invalid declarer. Must be one of 'N', 'E', 'S', 'W'.")
         
-        contract_with_declarer = f"{contract_str}{declarer}"
-        return self.deal.dd_tricks(contract_with_declarer)
+        # Tricks depend only on the strain and declarer, not the level
+        key = (contract_str.upper().replace('NT', 'N').rstrip('X')[-1:], declarer)
+        tricks = self._tricks.get(key)
+        metrics.record_cache('dd_tricks', tricks is not None)
+        if tricks is None:
+            contract_with_declarer = f"{contract_str}{declarer}"
+            tricks = self._tricks[key] = self._timed('tricks', self.deal.dd_tricks, contract_with_declarer)
+        return tricks
 
-    def get_score(self, contract_str: str, declarer_char: str, vulnerable: bool = False) -> int:
+    def get_score(self, contract_str: str, declarer_char: str, vulnerable=False) -> int:
         """
         Gets the double dummy score for a given deal, contract, and vulnerability.
         The contract string should not include the declarer (e.g., "4H", "3N", "1C").
@@ -41,7 +100,8 @@ class DoubleDummySolver:
         Args:
             contract_str: The contract string (e.g., "4H", "3N").
             declarer_char: The declarer as a character ('N', 'E', 'S', 'W').
-            vulnerable: Boolean indicating if the declaring side is vulnerable.
+            vulnerable: Boolean indicating if the declaring side is vulnerable, or the
+                        board's vulnerability ('none', 'NS', 'EW' or 'both').
 
         Returns:
             The score for the contract.
@@ -49,9 +109,28 @@ class DoubleDummySolver:
         declarer = declarer_char.upper()
         if declarer not in ['N', 'E', 'S', 'W']:
             raise ValueError("Invalid declarer. Must be one of 'N', 'E', 'S', 'W'.")
-            
-        contract_with_declarer = f"{contract_str}{declarer}"
-        return self.deal.dd_score(contract_with_declarer, vul=vulnerable)
+        vulnerable = scoring.side_vulnerable(vulnerable, declarer)
+
+        key = (contract_str.upper(), declarer, vulnerable)
+        score = self._scores.get(key)
+        metrics.record_cache('dd_score', score is not None)
+        if score is None:
+            # The score follows from the (cached) trick count through the score
+            # table, so every level and doubling of a strain shares one solve
+            level, strain, doubled = scoring.parse_contract(contract_str)
+            tricks = self.get_tricks(contract_str, declarer) if level else 0
+            score = self._scores[key] = int(scoring.SCORE_TABLE[level, strain, doubled, int(vulnerable), tricks])
+        return score
+
+    def get_scores(self, contract_str: str, declarer_char: str) -> dict:
+        """
+        Scores of a contract under every board vulnerability, from one solve.
+
+        Returns:
+            dict: Mapping of 'none', 'NS', 'EW' and 'both' to the score.
+        """
+        return {vulnerability: self.get_score(contract_str, declarer_char, vulnerability)
+                for vulnerability in scoring.VULNERABILITIES}
 
     def get_tricks_for_all_leads(self, strain_char: str, leader_char: str) -> dict:
         """
@@ -88,14 +167,64 @@ class DoubleDummySolver:
         # This implies dd_all_tricks returns tricks for the LEADER (Defense), not Declarer.
         # We want to return Declarer's tricks to be consistent.
         
-        raw_results = self.deal.dd_all_tricks(strain_char, leader_char)
+        raw_results = self._timed('all_leads', self.deal.dd_all_tricks, strain_char, leader_char)
         
         # Invert scores: Declarer Tricks = 13 - Defense Tricks
         return {card: 13 - tricks for card, tricks in raw_results.items()}
 
+    def get_trick_table(self) -> dict:
+        """
+        Gets the full double dummy table: declarer's tricks for every strain and
+        declarer. Entries already solved on this deal are reused; the rest come
+        from one batched DDS call (CalcDDtable) when libdds provides it, and from
+        single solves otherwise.
+
+        Returns:
+            dict: Mapping of (strain, declarer) to tricks, e.g. ('S', 'N'),
+                  with strains 'C', 'D', 'H', 'S', 'N'.
+        """
+        keys = [(strain, declarer) for strain in scoring.STRAINS for declarer in 'NESW']
+        missing = [key for key in keys if key not in self._tricks]
+        if len(missing) > 1:
+            table = self._solve_table()
+            if table is not None:
+                for key in missing:
+                    self._tricks[key] = table[key]
+        return {key: self._tricks[key] if key in self._tricks else self.get_tricks(f"1{key[0]}", key[1])
+                for key in keys}
+
+    def _solve_table(self):
+        """The whole trick table from one CalcDDtable call, or None if libdds cannot provide it."""
+        dll = _table_library()
+        if dll is None:
+            return None
+        table_deal = _DDTableDeal()
+        for seat, hand in enumerate(bitboard_for(self.deal).masks):
+            for suit, mask in enumerate(hand):
+                # DDS holds rank r (2..14) at bit r; our masks have the deuce at bit 0
+                table_deal.cards[seat][suit] = mask << 2
+        results = _DDTableResults()
+        code = self._timed('table', dll.CalcDDtable, table_deal, ctypes.byref(results))
+        if code != DDS_NO_FAULT:
+            print(f"CalcDDtable failed with code {code}; solving the table one entry at a time")
+            return None
+        return {(strain, declarer): results.resTable[DDS_STRAINS.index(strain)][seat]
+                for strain in scoring.STRAINS for seat, declarer in enumerate('NESW')}
+
+    def get_par_from_table(self, dealer_char: str = 'N', vulnerability: str = 'none') -> dict:
+        """
+        Gets the double dummy par from the (cached) trick table, with no further solves.
+
+        Returns:
+            dict: 'score' (from NS's point of view) and 'contract', e.g. '4SN' or '5HXE'.
+        """
+        result = par.par([self.get_trick_table()], dealer_char.upper(), vulnerability)
+        return {'score': result['score'][0], 'contract': result['contract'][0]}
+
     def get_par(self, dealer_char: str, nsvul: bool, ewvul: bool) -> list:
         """
-        Gets the double dummy par for the deal.
+        Gets the double dummy par for the deal. This asks redeal, which solves the
+        whole table again; get_par_from_table reuses the cached one.
         
         Args:
             dealer_char: Dealer ('N', 'E', 'S', 'W').
@@ -105,7 +234,7 @@ class DoubleDummySolver:
         Returns:
             list: List of ScoredContract objects representing the par.
         """
-        return self.deal.par(dealer_char, nsvul, ewvul)
+        return self._timed('par', self.deal.par, dealer_char, nsvul, ewvul)
 
     @staticmethod
     def solve(hands: dict, contract_str: str, declarer_char: str) -> int:
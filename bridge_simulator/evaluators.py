@@ -0,0 +1,120 @@
+"""
+Precomputed hand evaluators.
+
+A suit holding is encoded as a 13-bit mask with the ace in bit 12 and the
+deuce in bit 0. Every feature we filter or branch on depends only on the
+holdings, so each one is a lookup table over all 8192 possible masks and a
+hand's value is the sum of four lookups.
+"""
+from typing import List, Sequence, Tuple
+
+# Ranks from highest to lowest, matching hand_generator.RANKS
+RANK_ORDER = 'AKQJT98765432'
+RANK_BITS = {rank: 1 << (12 - i) for i, rank in enumerate(RANK_ORDER)}
+NUM_HOLDINGS = 1 << 13
+
+ACE, KING, QUEEN, JACK = (RANK_BITS[r] for r in 'AKQJ')
+
+
+def _holding_hcp(mask: int) -> int:
+    return (4 * bool(mask & ACE) + 3 * bool(mask & KING)
+            + 2 * bool(mask & QUEEN) + bool(mask & JACK))
+
+
+def _holding_controls(mask: int) -> int:
+    return 2 * bool(mask & ACE) + bool(mask & KING)
+
+
+def _holding_ltc(mask: int, length: int) -> int:
+    """Classic losing-trick count: missing A, K, Q among the top min(length, 3) cards."""
+    if length == 0:
+        return 0
+    if length == 1:
+        return 0 if mask & ACE else 1
+    if length == 2:
+        return 2 - bool(mask & ACE) - bool(mask & KING)
+    return 3 - bool(mask & ACE) - bool(mask & KING) - bool(mask & QUEEN)
+
+
+def _holding_nltc(mask: int, length: int) -> float:
+    """New losing-trick count: 1.5 per missing ace, 1 per missing king, 0.5 per missing queen."""
+    losers = 0.0
+    if length >= 1 and not mask & ACE:
+        losers += 1.5
+    if length >= 2 and not mask & KING:
+        losers += 1.0
+    if length >= 3 and not mask & QUEEN:
+        losers += 0.5
+    return losers
+
+
+def _holding_quick_tricks(mask: int, length: int) -> float:
+    if mask & ACE and mask & KING:
+        return 2.0
+    if mask & ACE and mask & QUEEN:
+        return 1.5
+    if mask & ACE:
+        return 1.0
+    if mask & KING and mask & QUEEN:
+        return 1.0
+    if mask & KING and length >= 2:
+        return 0.5
+    return 0.0
+
+
+HOLDING_LENGTH: List[int] = [bin(m).count('1') for m in range(NUM_HOLDINGS)]
+HOLDING_HCP: List[int] = [_holding_hcp(m) for m in range(NUM_HOLDINGS)]
+HOLDING_CONTROLS: List[int] = [_holding_controls(m) for m in range(NUM_HOLDINGS)]
+HOLDING_LTC: List[int] = [_holding_ltc(m, HOLDING_LENGTH[m]) for m in range(NUM_HOLDINGS)]
+HOLDING_NLTC: List[float] = [_holding_nltc(m, HOLDING_LENGTH[m]) for m in range(NUM_HOLDINGS)]
+HOLDING_QUICK_TRICKS: List[float] = [_holding_quick_tricks(m, HOLDING_LENGTH[m]) for m in range(NUM_HOLDINGS)]
+
+# Masks = one 13-bit holding per suit in S, H, D, C order
+Masks = Tuple[int, int, int, int]
+
+# redeal Rank members are mapped to bits on first sight (str(rank) is 'A', 'K', ...)
+_rank_bit_cache = {}
+
+
+def holding_mask(holding) -> int:
+    """Mask of an iterable of ranks (a redeal Holding, or rank strings)."""
+    mask = 0
+    for rank in holding:
+        bit = _rank_bit_cache.get(rank)
+        if bit is None:
+            bit = _rank_bit_cache[rank] = RANK_BITS[str(rank)]
+        mask |= bit
+    return mask
+
+
+def hand_masks(hand) -> Masks:
+    """Masks of a hand given as four holdings in S, H, D, C order (e.g. a redeal Hand)."""
+    return tuple(holding_mask(holding) for holding in hand)
+
+
+def hcp(masks: Sequence[int]) -> int:
+    return HOLDING_HCP[masks[0]] + HOLDING_HCP[masks[1]] + HOLDING_HCP[masks[2]] + HOLDING_HCP[masks[3]]
+
+
+def controls(masks: Sequence[int]) -> int:
+    return (HOLDING_CONTROLS[masks[0]] + HOLDING_CONTROLS[masks[1]]
+            + HOLDING_CONTROLS[masks[2]] + HOLDING_CONTROLS[masks[3]])
+
+
+def losers(masks: Sequence[int]) -> int:
+    return HOLDING_LTC[masks[0]] + HOLDING_LTC[masks[1]] + HOLDING_LTC[masks[2]] + HOLDING_LTC[masks[3]]
+
+
+def new_losers(masks: Sequence[int]) -> float:
+    return HOLDING_NLTC[masks[0]] + HOLDING_NLTC[masks[1]] + HOLDING_NLTC[masks[2]] + HOLDING_NLTC[masks[3]]
+
+
+def quick_tricks(masks: Sequence[int]) -> float:
+    return (HOLDING_QUICK_TRICKS[masks[0]] + HOLDING_QUICK_TRICKS[masks[1]]
+            + HOLDING_QUICK_TRICKS[masks[2]] + HOLDING_QUICK_TRICKS[masks[3]])
+
+
+def shape(masks: Sequence[int]) -> Tuple[int, int, int, int]:
+    """Suit lengths in S, H, D, C order."""
+    return (HOLDING_LENGTH[masks[0]], HOLDING_LENGTH[masks[1]],
+            HOLDING_LENGTH[masks[2]], HOLDING_LENGTH[masks[3]])
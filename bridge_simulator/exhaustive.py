@@ -0,0 +1,149 @@
+"""
+Exhaustive enumeration of the layouts left open by a predeal.
+
+When predeal fixes most of the deck, the remaining cards can be distributed
+in only a few ways: with U unknown cards and seats needing k_N, k_E, k_S, k_W
+of them there are U! / (k_N! k_E! k_S! k_W!) layouts, each equally likely.
+Walking every one of them once gives exact answers where sampling would
+return duplicates and miss rare layouts.
+
+Layouts are numbered in a fixed order so a range [start, stop) can be handed
+to a worker as an independent chunk. A chunk starts directly at its first
+layout (unranked through the combinatorial number system), so walking it
+costs only its own layouts.
+"""
+from itertools import islice
+from math import comb
+from typing import Dict, Iterator, List, Optional, Tuple
+from . import evaluators
+from .frequency import SEATS, predeal_masks, unknown_masks
+
+Masks = Tuple[int, int, int, int]
+RANK_FOR_BIT = {bit: rank for rank, bit in evaluators.RANK_BITS.items()}
+
+
+def _open_cards(predealt) -> List[Tuple[int, int]]:
+    """Unknown cards as (suit index, rank bit)."""
+    pool = unknown_masks(predealt)
+    return [(suit, bit) for suit in range(4) for bit in sorted(RANK_FOR_BIT, reverse=True)
+            if pool[suit] & bit]
+
+
+def _needs(predealt) -> List[int]:
+    return [13 - sum(mask.bit_count() for mask in hand) for hand in predealt]
+
+
+def count_layouts(predeal: Optional[Dict[str, str]]) -> int:
+    """Number of distinct deals consistent with the predeal."""
+    predealt = predeal_masks(predeal)
+    remaining = len(_open_cards(predealt))
+    total = 1
+    for need in _needs(predealt):
+        total *= comb(remaining, need)
+        remaining -= need
+    return total
+
+
+def _unrank(n: int, k: int, rank: int) -> Optional[List[int]]:
+    """Indices of the rank-th k-combination of range(n) in lexicographic order, or None past the end."""
+    if rank >= comb(n, k):
+        return None
+    indices = []
+    x = 0
+    for slot in range(k):
+        # Combinations whose next index is x
+        while rank >= comb(n - x - 1, k - slot - 1):
+            rank -= comb(n - x - 1, k - slot - 1)
+            x += 1
+        indices.append(x)
+        x += 1
+    return indices
+
+
+def _combinations_from(pool: List, k: int, rank: int):
+    """itertools.combinations(pool, k), starting at the rank-th combination."""
+    n = len(pool)
+    indices = _unrank(n, k, rank)
+    if indices is None:
+        return
+    while True:
+        yield tuple(pool[i] for i in indices)
+        for i in reversed(range(k)):
+            if indices[i] != i + n - k:
+                break
+        else:
+            return
+        indices[i] += 1
+        for j in range(i + 1, k):
+            indices[j] = indices[j - 1] + 1
+
+
+def iter_layouts(predeal: Optional[Dict[str, str]], start: int = 0,
+                 stop: Optional[int] = None) -> Iterator[Tuple[Masks, ...]]:
+    """
+    Yield the layouts numbered start..stop-1 as per-seat suit masks (N, E, S, W).
+
+    Layouts are produced by choosing North's missing cards, then East's from
+    what is left, then South's; West gets the rest.
+    """
+    predealt = predeal_masks(predeal)
+    cards = _open_cards(predealt)
+    needs = _needs(predealt)
+
+    def later_layouts(seat: int, remaining: int) -> int:
+        """Layouts of the seats after `seat` once it has taken its cards."""
+        total = 1
+        remaining -= needs[seat]
+        for need in needs[seat + 1:3]:
+            total *= comb(remaining, need)
+            remaining -= need
+        return total
+
+    def deal_seat(seat: int, remaining: List[Tuple[int, int]], skip: int):
+        """Layouts of seats seat.. in order, from the skip-th one."""
+        if seat == 3:
+            if skip == 0:
+                yield (remaining,)
+            return
+        first, skip = divmod(skip, later_layouts(seat, len(remaining)))
+        for chosen in _combinations_from(remaining, needs[seat], first):
+            taken = set(chosen)
+            rest = [card for card in remaining if card not in taken]
+            for tail in deal_seat(seat + 1, rest, skip):
+                yield (chosen,) + tail
+            skip = 0
+
+    for layout in islice(deal_seat(0, cards, start), None if stop is None else max(0, stop - start)):
+        hands = []
+        for seat, seat_cards in enumerate(layout):
+            masks = list(predealt[seat])
+            for suit, bit in seat_cards:
+                masks[suit] |= bit
+            hands.append(tuple(masks))
+        yield tuple(hands)
+
+
+def hand_string(masks: Masks) -> str:
+    """Predeal-style string ('AK2 QJ - T98...') of a hand's suit masks."""
+    return ' '.join(
+        ''.join(rank for rank in evaluators.RANK_ORDER if mask & evaluators.RANK_BITS[rank]) or '-'
+        for mask in masks
+    )
+
+
+def layout_predeal(layout: Tuple[Masks, ...]) -> Dict[str, str]:
+    """Full predeal dict describing one layout."""
+    return {seat: hand_string(masks) for seat, masks in zip(SEATS, layout)}
+
+
+def chunk_ranges(total: int, chunks: int) -> List[Tuple[int, int]]:
+    """Split range(total) into at most `chunks` contiguous, near-equal ranges."""
+    chunks = max(1, min(chunks, total))
+    size, extra = divmod(total, chunks)
+    ranges = []
+    start = 0
+    for i in range(chunks):
+        stop = start + size + (1 if i < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
@@ -0,0 +1,386 @@
+"""
+Exact frequencies of generator constraints, without dealing.
+
+Given the predealt cards, the random part of one seat's hand is a uniform
+subset of the unknown cards. Every constraint the generator understands
+(hcp, controls, hand_losers, suit_holding, hand_shape, any_shape and a
+single-seat smart_stack) depends only on each suit's length and which of
+A, K, Q, J the seat holds. So the number of hands satisfying a constraint
+can be counted suit by suit: per suit we enumerate honor subsets and spot
+counts, and across suits a memoized dynamic program combines
+(cards taken, length prefix, hcp, controls, losers).
+
+Constraints on more than one seat are not independent and are rejected
+with a ValueError.
+"""
+from functools import lru_cache
+from math import comb
+from typing import Dict, FrozenSet, Optional, Tuple
+from . import evaluators
+
+SEATS = ['N', 'E', 'S', 'W']
+SUITS = ['S', 'H', 'D', 'C']
+FULL_SUIT = (1 << 13) - 1
+HONORS = evaluators.ACE | evaluators.KING | evaluators.QUEEN | evaluators.JACK
+
+# Every (S, H, D, C) length tuple of a 13-card hand
+ALL_SHAPES = tuple(
+    (s, h, d, 13 - s - h - d)
+    for s in range(14) for h in range(14 - s) for d in range(14 - s - h)
+)
+
+# Named shapes, as defined by redeal
+SHAPE_KEYWORDS = {
+    'balanced': ['(4333)', '(4432)', '(5332)'],
+    'semibalanced': ['(4333)', '(4432)', '(5332)', '(5422)', '(6322)'],
+}
+
+Shape4 = Tuple[int, int, int, int]
+
+
+def _tokenize(pattern: str):
+    """Split a shape pattern into positions: a digit, 'x', or a parenthesized group."""
+    tokens = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '(':
+            end = pattern.index(')', i)
+            group = pattern[i + 1:end]
+            if not group or any(c not in '0123456789x' for c in group):
+                raise ValueError(f"Invalid shape pattern: {pattern}")
+            tokens.append(('group', group))
+            i = end + 1
+        elif char in '0123456789x':
+            tokens.append(('single', char))
+            i += 1
+        else:
+            raise ValueError(f"Invalid shape pattern: {pattern}")
+    if sum(len(t[1]) for t in tokens) != 4:
+        raise ValueError(f"Shape pattern must describe 4 suits: {pattern}")
+    return tokens
+
+
+def _pattern_matches(tokens, lengths: Shape4) -> bool:
+    position = 0
+    for kind, text in tokens:
+        actual = list(lengths[position:position + len(text)])
+        position += len(text)
+        if kind == 'single':
+            if text != 'x' and int(text) != actual[0]:
+                return False
+            continue
+        # A group matches any permutation of its lengths over its positions
+        for char in text:
+            if char == 'x':
+                continue
+            if int(char) not in actual:
+                return False
+            actual.remove(int(char))
+    return True
+
+
+@lru_cache(maxsize=None)
+def shape_lengths(pattern: str) -> FrozenSet[Shape4]:
+    """
+    Set of (S, H, D, C) lengths matched by a redeal-style shape pattern,
+    e.g. '5xxx', '(4432)', '(55)xx', or the keywords 'balanced' / 'semibalanced'.
+    """
+    keyword = pattern.lower()
+    if keyword in SHAPE_KEYWORDS:
+        return frozenset().union(*(shape_lengths(p) for p in SHAPE_KEYWORDS[keyword]))
+    tokens = _tokenize(pattern)
+    return frozenset(lengths for lengths in ALL_SHAPES if _pattern_matches(tokens, lengths))
+
+
+def parse_hand(hand_str: str) -> Tuple[int, int, int, int]:
+    """Suit masks of a predeal string such as 'AKT KJ84 QJ5 432' or '- - - -'."""
+    suits = hand_str.split()
+    if len(suits) != 4:
+        raise ValueError(f"Invalid hand format: {hand_str}. Must have 4 suits.")
+    masks = []
+    for suit in suits:
+        if suit == '-':
+            masks.append(0)
+            continue
+        if not all(c in evaluators.RANK_BITS for c in suit):
+            raise ValueError(f"Invalid cards in {hand_str}: {suit}. Must be valid card ranks.")
+        masks.append(evaluators.holding_mask(suit))
+    return tuple(masks)
+
+
+def unknown_masks(predealt) -> Tuple[int, int, int, int]:
+    """Per-suit masks of the cards no seat has been predealt."""
+    return tuple(FULL_SUIT & ~(predealt[0][s] | predealt[1][s] | predealt[2][s] | predealt[3][s])
+                 for s in range(4))
+
+
+def _range(value, default_hi):
+    if value is None:
+        return None
+    lo, hi = value
+    return (max(lo, 0), min(hi, default_hi))
+
+
+def _intersect(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return (max(a[0], b[0]), min(a[1], b[1]))
+
+
+def _seat_spec(seat, suit_holding, hcp, hand_shape, hand_losers, controls, any_shape, smart_stack, predealt):
+    """Collect every constraint on one seat into ranges plus one set of allowed shapes."""
+    hcp_range = _range((hcp or {}).get(seat), 37)
+    controls_range = _range((controls or {}).get(seat), 12)
+    losers_range = _range((hand_losers or {}).get(seat), 13)
+    allowed = set(ALL_SHAPES)
+    shaped = False
+
+    if suit_holding and seat in suit_holding:
+        mins = [suit_holding[seat].get(s, 0) for s in SUITS]
+        allowed = {l for l in allowed if all(a >= m for a, m in zip(l, mins))}
+        shaped = True
+    if hand_shape and seat in hand_shape:
+        target = list(hand_shape[seat])
+        if len(target) != 4:
+            allowed = set()
+        else:
+            allowed = {l for l in allowed if all(t == -1 or a == t for a, t in zip(l, target))}
+        shaped = True
+    if any_shape and seat in any_shape:
+        allowed &= shape_lengths(any_shape[seat])
+        shaped = True
+    # SmartStack is ignored by the generator when the seat already has predealt cards
+    if smart_stack and seat in smart_stack and not predealt:
+        config = smart_stack[seat]
+        shape_val = config.get('shape')
+        if shape_val is not None:
+            if not isinstance(shape_val, str):
+                raise ValueError("Exact frequencies need SmartStack shapes given as strings")
+            allowed &= shape_lengths(shape_val)
+            shaped = True
+        if config.get('hcp'):
+            hcp_range = _intersect(hcp_range, tuple(config['hcp']))
+
+    return (hcp_range, controls_range, losers_range, frozenset(allowed) if shaped else None)
+
+
+def _constrained_seats(suit_holding, hcp, hand_shape, hand_losers, controls, any_shape, smart_stack, predealt):
+    seats = set()
+    for constraint in (suit_holding, hcp, hand_shape, hand_losers, controls, any_shape):
+        seats.update((constraint or {}).keys())
+    for seat in (smart_stack or {}):
+        if not any(predealt[SEATS.index(seat)]):
+            seats.add(seat)
+    return sorted(seats, key=SEATS.index)
+
+
+def predeal_masks(predeal: Optional[Dict[str, str]]):
+    """Validated suit masks of every seat's predealt cards, in N, E, S, W order."""
+    masks = [(0, 0, 0, 0)] * 4
+    for seat, hand_str in (predeal or {}).items():
+        if seat not in SEATS:
+            raise ValueError(f"Invalid direction: {seat}. Must be one of N, E, S, W")
+        masks[SEATS.index(seat)] = parse_hand(hand_str)
+    for suit in range(4):
+        held = [m[suit] for m in masks]
+        if sum(m.bit_count() for m in held) != (held[0] | held[1] | held[2] | held[3]).bit_count():
+            raise ValueError(f"Predeal gives the same {SUITS[suit]} card to two seats")
+    for seat, hand in zip(SEATS, masks):
+        if sum(m.bit_count() for m in hand) > 13:
+            raise ValueError(f"Predeal gives {seat} more than 13 cards")
+    return tuple(masks)
+
+
+@lru_cache(maxsize=4096)
+def _suit_options(known: int, pool: int):
+    """
+    Ways to complete one suit of the seat: {(taken, hcp, controls, losers): count}.
+
+    Only the honors drawn matter individually; spot cards are counted with a
+    binomial coefficient since any of them gives the same features.
+    """
+    pool_honors = pool & HONORS
+    spots = (pool & ~HONORS).bit_count()
+    known_len = known.bit_count()
+    options = {}
+    subset = pool_honors
+    while True:
+        honors = (known | subset) & HONORS
+        drawn_honors = subset.bit_count()
+        for drawn_spots in range(spots + 1):
+            length = known_len + drawn_honors + drawn_spots
+            # Any mask with these honors and this length has the same features
+            rep = honors | ((1 << (length - honors.bit_count())) - 1)
+            key = (drawn_honors + drawn_spots, evaluators.HOLDING_HCP[rep],
+                   evaluators.HOLDING_CONTROLS[rep], evaluators.HOLDING_LTC[rep])
+            options[key] = options.get(key, 0) + comb(spots, drawn_spots)
+        if subset == 0:
+            break
+        subset = (subset - 1) & pool_honors
+    return tuple(options.items())
+
+
+@lru_cache(maxsize=1024)
+def _joint_counts(known: Tuple[int, ...], pool: Tuple[int, ...], spec, by: Optional[str]):
+    """
+    Count completions of the seat that satisfy `spec`, grouped by `by`
+    ('hcp', 'shape', 'pattern' or None). Returns ({key: count}, total completions).
+    """
+    hcp_range, controls_range, losers_range, allowed = spec
+    need = 13 - sum(m.bit_count() for m in known)
+    pool_size = sum(m.bit_count() for m in pool)
+    total = comb(pool_size, need)
+
+    track_shape = allowed is not None or by in ('shape', 'pattern')
+    track_hcp = hcp_range is not None or by == 'hcp'
+    prefixes = None
+    if allowed is not None:
+        prefixes = [{l[:i + 1] for l in allowed} for i in range(4)]
+
+    # (taken, length prefix, hcp, controls, losers) -> count
+    states = {(0, (), 0, 0, 0): 1}
+    for suit in range(4):
+        known_len = known[suit].bit_count()
+        last = suit == 3
+        next_states = {}
+        for (taken, lengths, hcp, ctrl, losers), count in states.items():
+            for (drawn, s_hcp, s_ctrl, s_losers), ways in _suit_options(known[suit], pool[suit]):
+                new_taken = taken + drawn
+                if new_taken > need or (last and new_taken != need):
+                    continue
+                new_lengths = lengths + (known_len + drawn,) if track_shape else ()
+                if prefixes is not None and new_lengths not in prefixes[suit]:
+                    continue
+                new_hcp = hcp + s_hcp if track_hcp else 0
+                if hcp_range is not None and new_hcp > hcp_range[1]:
+                    continue
+                new_ctrl = ctrl + s_ctrl if controls_range is not None else 0
+                if controls_range is not None and new_ctrl > controls_range[1]:
+                    continue
+                new_losers = losers + s_losers if losers_range is not None else 0
+                if losers_range is not None and new_losers > losers_range[1]:
+                    continue
+                key = (new_taken, new_lengths, new_hcp, new_ctrl, new_losers)
+                next_states[key] = next_states.get(key, 0) + count * ways
+        states = next_states
+
+    grouped = {}
+    for (taken, lengths, hcp, ctrl, losers), count in states.items():
+        if hcp_range is not None and hcp < hcp_range[0]:
+            continue
+        if controls_range is not None and ctrl < controls_range[0]:
+            continue
+        if losers_range is not None and losers < losers_range[0]:
+            continue
+        if by == 'hcp':
+            key = hcp
+        elif by == 'shape':
+            key = lengths
+        elif by == 'pattern':
+            key = tuple(sorted(lengths, reverse=True))
+        else:
+            key = None
+        grouped[key] = grouped.get(key, 0) + count
+    return grouped, total
+
+
+def _prepare(suit_holding=None, hcp=None, hand_shape=None, hand_losers=None, controls=None,
+             any_shape=None, smart_stack=None, predeal=None, seat=None):
+    predealt = predeal_masks(predeal)
+    seats = _constrained_seats(suit_holding, hcp, hand_shape, hand_losers, controls, any_shape,
+                               smart_stack, predealt)
+    if len(seats) > 1:
+        raise ValueError(f"Exact frequencies support constraints on one seat only; got {', '.join(seats)}")
+    if seat is None:
+        seat = seats[0] if seats else 'N'
+    elif seats and seats != [seat]:
+        raise ValueError(f"Constraints are on {seats[0]}, not {seat}")
+    index = SEATS.index(seat)
+    known = predealt[index]
+    pool = unknown_masks(predealt)
+    spec = _seat_spec(seat, suit_holding, hcp, hand_shape, hand_losers, controls, any_shape,
+                      smart_stack, any(known))
+    return seat, known, pool, spec
+
+
+def seat_region(seat: str, **constraints):
+    """
+    The hcp range and set of allowed (S, H, D, C) lengths that the constraints
+    impose on one seat (None for the shapes when its shape is unconstrained).
+    Controls and losing-trick constraints are not part of the region.
+    """
+    constraints.pop('num_hands', None)
+    constraints.pop('max_attempts_param', None)
+    _, _, _, spec = _prepare(seat=seat, **constraints)
+    hcp_range, _, _, allowed = spec
+    return hcp_range or (0, 37), allowed
+
+
+def probability(**constraints) -> float:
+    """
+    Exact probability that a random deal (given `predeal`) satisfies the constraints.
+
+    Accepts the keyword arguments of BridgeHandGenerator.generate_hands
+    (num_hands and max_attempts_param are ignored).
+
+    Raises:
+        ValueError: if constraints involve more than one seat, or are malformed.
+    """
+    constraints.pop('num_hands', None)
+    constraints.pop('max_attempts_param', None)
+    _, known, pool, spec = _prepare(**constraints)
+    counts, total = _joint_counts(known, pool, spec, None)
+    return counts.get(None, 0) / total if total else 0.0
+
+
+def distribution(by: str, seat: str = None, **constraints) -> Dict:
+    """
+    Exact joint probabilities P(constraints and feature == value) for one seat.
+
+    Args:
+        by: 'hcp', 'shape' (S, H, D, C lengths) or 'pattern' (sorted lengths, e.g. (4, 4, 3, 2)).
+        seat: Seat to describe; defaults to the constrained seat.
+
+    Returns:
+        Dict mapping each feature value to its probability. The values sum to
+        probability(**constraints).
+    """
+    if by not in ('hcp', 'shape', 'pattern'):
+        raise ValueError("by must be 'hcp', 'shape' or 'pattern'")
+    constraints.pop('num_hands', None)
+    constraints.pop('max_attempts_param', None)
+    _, known, pool, spec = _prepare(seat=seat, **constraints)
+    counts, total = _joint_counts(known, pool, spec, by)
+    return {key: count / total for key, count in sorted(counts.items())}
+
+
+def expected_hcp(seat: str, **constraints) -> float:
+    """
+    Exact expected HCP of any seat given the constraints (on one seat) and predeal.
+
+    The constrained seat's expectation comes from its HCP distribution. The
+    honors it does not take are spread evenly over the other seats' open slots,
+    by symmetry, so every other seat gets its predealt HCP plus a share
+    proportional to the number of cards it still needs.
+    """
+    constraints.pop('num_hands', None)
+    constraints.pop('max_attempts_param', None)
+    constrained, known, pool, spec = _prepare(**constraints)
+    counts, total = _joint_counts(known, pool, spec, 'hcp')
+    matching = sum(counts.values())
+    if not matching:
+        raise ValueError("Constraints cannot be satisfied")
+    drawn = sum(h * c for h, c in counts.items()) / matching - evaluators.hcp(known)
+    if seat == constrained:
+        return evaluators.hcp(known) + drawn
+
+    predealt = predeal_masks(constraints.get('predeal'))
+    own = predealt[SEATS.index(seat)]
+    open_after = sum(m.bit_count() for m in pool) - (13 - sum(m.bit_count() for m in known))
+    if open_after == 0:
+        return float(evaluators.hcp(own))
+    need = 13 - sum(m.bit_count() for m in own)
+    return evaluators.hcp(own) + (evaluators.hcp(pool) - drawn) * need / open_after
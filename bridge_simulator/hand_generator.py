@@ -1,5 +1,12 @@
+import bisect
+import math
+import random
+import threading
 import redeal
+from collections import OrderedDict
 from typing import Dict, List, Tuple
+from . import evaluators, exhaustive, frequency, metrics
+from .bitboard import bitboard_for
 from redeal.redeal import Hand, Card, Suit, Rank, Deal, Shape, balanced, semibalanced, SmartStack, hcp as hcp_eval
 
 # Define the suits in order of importance (from highest to lowest)
@@ -8,9 +15,43 @@ SUITS = ['S', 'H', 'D', 'C']
 # Define the ranks in order of importance (from highest to lowest)
 RANKS = ['A', 'K', 'Q', 'J', 'T', '9', '8', '7', '6', '5', '4', '3', '2']
 
+# Number of dealer attempts between two metrics updates in yield_deals
+METRICS_BATCH_SIZE = 1000
+
+# Attempt budget for constrained generation. When the exact acceptance rate is
+# known (see frequency.py) we allow ATTEMPT_SAFETY_FACTOR times the expected
+# number of attempts, never fewer than DEFAULT_MAX_ATTEMPTS nor more than
+# MAX_ATTEMPTS; impossible constraints get no attempts at all.
+DEFAULT_MAX_ATTEMPTS = 20000
+MAX_ATTEMPTS = 200000
+ATTEMPT_SAFETY_FACTOR = 3
+
+# Importance sampling (yield_weighted_deals): the proposal splits the rarest
+# seat's HCP range into up to IMPORTANCE_HCP_BINS bins and picks bin b with
+# probability proportional to p_b ** temper. The default of 1 keeps the natural
+# rates (every weight is 1); callers opt into a lower temper to visit the rare
+# end of the range more often, at the cost of a smaller effective sample size.
+IMPORTANCE_HCP_BINS = 4
+IMPORTANCE_TEMPER = 1.0
+
+CONSTRAINT_KEYS = ('suit_holding', 'hcp', 'hand_shape', 'hand_losers', 'controls', 'any_shape', 'smart_stack')
+
+# SmartStack objects keyed by (shape string, hcp range, predealt cards). Building
+# one is the most expensive part of preparing a dealer and redeal keeps its
+# precomputed tables between prepare calls, so identical configs share a single
+# instance. Keying on the predealt cards means a cached instance is only ever
+# prepared once and is read-only while dealing; the lock covers lookups and
+# that one preparation so concurrent request threads can share the cache.
+# Every distinct predeal adds an entry, so the cache is a bounded LRU.
+SMART_STACK_CACHE_SIZE = 32
+_smart_stack_cache = OrderedDict()
+_smart_stack_lock = threading.Lock()
+
 class BridgeHandGenerator:
-    def __init__(self):
-        self.deals = []
+    """
+    Stateless hand generator: every call builds its own dealer and returns its
+    results, so one instance can be shared by concurrent request threads.
+    """
 
     def generate_hands(self, num_hands: int = 100,
                        suit_holding: Dict[str, Dict[str, int]] = None,
@@ -36,7 +77,7 @@ class BridgeHandGenerator:
                  Example: {'N': (11, 15)} means North has 11-15 HCP.
             hand_shape: Optional. Dictionary specifying exact hand shape (lengths of S,H,D,C).
                         Example: {'N': [5,4,3,1]} for North.
-            hand_losers: Optional. Dictionary specifying loser count range (min, max) for a hand.
+            hand_losers: Optional. Dictionary specifying losing-trick count range (min, max) for a hand.
                          Example: {'S': (6, 7)} means South has 6-7 losers.
             controls: Optional. Dictionary specifying controls range (min, max) for a hand.
                       Example: {'E': (4, 6)} means East has 4-6 controls.
@@ -49,109 +90,7 @@ class BridgeHandGenerator:
             List[Dict]: List of dictionaries containing cards for each player, organized by suit.
         """
         
-        # Helper to get suit attribute from hand object (e.g., deal.north.spades)
-        def get_suit_attr(hand_obj, suit_char):
-            if suit_char == 'S': return hand_obj.spades
-            if suit_char == 'H': return hand_obj.hearts
-            if suit_char == 'D': return hand_obj.diamonds
-            if suit_char == 'C': return hand_obj.clubs
-            return []
-
-        def accept(deal) -> bool:
-            """
-            Accept a deal if it meets all the specified criteria.
-            """
-            # Create a dictionary of player hands
-            player_hands = {
-                'N': deal.north,
-                'E': deal.east,
-                'S': deal.south,
-                'W': deal.west
-            }
-
-            # Check suit holding requirements
-            if suit_holding:
-                for player, suits in suit_holding.items():
-                    hand = player_hands.get(player)
-                    if not hand: continue
-                    for suit_char, min_len in suits.items():
-                        suit = {'S': Suit.S, 'H': Suit.H, 'D': Suit.D, 'C': Suit.C}[suit_char]
-                        # Get cards in the suit directly
-                        if len([card for card in hand.cards() if card.suit == suit]) < min_len:
-                            return False
-
-            # Check hand shape requirements
-            if hand_shape:
-                for player, shape in hand_shape.items():
-                    hand = player_hands.get(player)
-                    if not hand: continue
-                    # Get the shape as a list of lengths in redeal's order (S,H,D,C)
-                    actual_shape = list(hand.shape)
-                    
-                    # Check for mismatch, allowing -1 as wildcard in target shape
-                    is_match = True
-                    if len(actual_shape) != len(shape):
-                        is_match = False
-                    else:
-                        for actual, target in zip(actual_shape, shape):
-                            if target != -1 and actual != target:
-                                is_match = False
-                                break
-                    
-                    if not is_match:
-                        return False
-
-            # Check HCP requirements
-            if hcp:
-                for player, (min_hcp, max_hcp) in hcp.items():
-                    hand = player_hands.get(player)
-                    if not hand: continue
-                    if not (min_hcp <= hand.hcp <= max_hcp):
-                        return False
-
-            # Check controls requirements
-            if controls:
-                for player, (min_controls, max_controls) in controls.items():
-                    hand = player_hands.get(player)
-                    if not hand: continue
-                    # Use redeal's direct 'controls' property
-                    if not (min_controls <= hand.controls <= max_controls):
-                        return False
-
-            # Check advanced shape requirements
-            if any_shape:
-                for player, shape_str in any_shape.items():
-                    hand = player_hands.get(player)
-                    if not hand: continue
-                    
-                    try:
-                        # Handle keywords
-                        if shape_str.lower() == 'balanced':
-                            shape_obj = balanced
-                        elif shape_str.lower() == 'semibalanced': 
-                            shape_obj = semibalanced
-                        else:
-                            # Parse string into Shape object
-                            shape_obj = Shape(shape_str)
-                            
-                        # Check if hand matches shape
-                        if not shape_obj(hand):
-                            return False
-                    except Exception:
-                        # If invalid shape string provided, treat as mismatch or log error
-                        # For now, return False to be safe
-                        return False
-
-            # For losers checks (currently disabled)
-            # if hand_losers:
-            #     for player, losers_range in hand_losers.items():
-            #         hand = player_hands.get(player)
-            #         # Ensure _calculate_losers is accessible or use hand.losers if available
-            #         # current_losers = self._calculate_losers(hand) # This would cause error if accept is nested
-            #         # For now, assuming hand_losers constraint is not actively used or will be fixed later
-            #         pass # Placeholder if hand_losers logic needs to be re-evaluated
-
-            return True
+        accept = self._build_accept(suit_holding, hcp, hand_shape, hand_losers, controls, any_shape)
 
         # Use helper to prepare dealer
         dealer = self._prepare_dealer(
@@ -162,8 +101,6 @@ class BridgeHandGenerator:
         generated_count = 0
         generation_attempts = 0
         
-        # Determine max attempts (logic simplified/duplicated for now, better to extract if complex)
-        DEFAULT_MAX_ATTEMPTS_WITH_CONSTRAINTS = 20000 
         actual_max_attempts = max_attempts_param
         if actual_max_attempts is None:
              # Basic check for constraints
@@ -183,7 +120,9 @@ class BridgeHandGenerator:
              if not has_constraints and is_predeal_empty:
                  actual_max_attempts = num_hands if num_hands > 0 else 1
              else:
-                 actual_max_attempts = DEFAULT_MAX_ATTEMPTS_WITH_CONSTRAINTS
+                 actual_max_attempts = self._attempt_budget(
+                     num_hands, suit_holding, hcp, hand_shape, hand_losers, controls, any_shape, smart_stack, predeal
+                 )
 
         if num_hands == 0:
             return formatted_hands
@@ -195,6 +134,7 @@ class BridgeHandGenerator:
                 formatted_hands.append(self._format_hand(deal))
                 generated_count += 1
         
+        metrics.record_deals(generation_attempts, generated_count)
         return formatted_hands
 
     def yield_deals(self, num_hands: int = 100,
@@ -216,105 +156,550 @@ class BridgeHandGenerator:
             suit_holding, hcp, hand_shape, hand_losers, controls, any_shape, smart_stack, predeal
         )
         
-        # Define internal accept function (duplicated from generate_hands for isolation)
-        def accept(deal) -> bool:
-            # Create a dictionary of player hands
-            player_hands = {
-                'N': deal.north,
-                'E': deal.east,
-                'S': deal.south,
-                'W': deal.west
-            }
-
-            # Check suit holding requirements
-            if suit_holding:
-                for player, suits in suit_holding.items():
-                    hand = player_hands.get(player)
-                    if not hand: continue
-                    for suit_char, min_len in suits.items():
-                        suit = {'S': Suit.S, 'H': Suit.H, 'D': Suit.D, 'C': Suit.C}[suit_char]
-                        # Get cards in the suit directly
-                        if len([card for card in hand.cards() if card.suit == suit]) < min_len:
-                            return False
-
-            # Check hand shape requirements
-            if hand_shape:
-                for player, shape in hand_shape.items():
-                    hand = player_hands.get(player)
-                    if not hand: continue
-                    # Get the shape as a list of lengths in redeal's order (S,H,D,C)
-                    actual_shape = list(hand.shape)
-                    
-                    # Check for mismatch, allowing -1 as wildcard in target shape
-                    is_match = True
-                    if len(actual_shape) != len(shape):
-                        is_match = False
-                    else:
-                        for actual, target in zip(actual_shape, shape):
-                            if target != -1 and actual != target:
-                                is_match = False
-                                break
-                    
-                    if not is_match:
-                        return False
-
-            # Check HCP requirements
-            if hcp:
-                for player, (min_hcp, max_hcp) in hcp.items():
-                    hand = player_hands.get(player)
-                    if not hand: continue
-                    if not (min_hcp <= hand.hcp <= max_hcp):
-                        return False
-
-            # Check controls requirements
-            if controls:
-                for player, (min_controls, max_controls) in controls.items():
-                    hand = player_hands.get(player)
-                    if not hand: continue
-                    # Use redeal's direct 'controls' property
-                    if not (min_controls <= hand.controls <= max_controls):
-                        return False
-
-            # Check advanced shape requirements
-            if any_shape:
-                for player, shape_str in any_shape.items():
-                    hand = player_hands.get(player)
-                    if not hand: continue
-                    
-                    try:
-                        # Handle keywords
-                        if shape_str.lower() == 'balanced':
-                            shape_obj = balanced
-                        elif shape_str.lower() == 'semibalanced': 
-                            shape_obj = semibalanced
-                        else:
-                            # Parse string into Shape object
-                            shape_obj = Shape(shape_str)
-                            
-                        # Check if hand matches shape
-                        if not shape_obj(hand):
-                            return False
-                    except Exception:
-                        return False
-
-            return True
+        accept = self._build_accept(suit_holding, hcp, hand_shape, hand_losers, controls, any_shape)
 
         generated_count = 0
         generation_attempts = 0
         
-        DEFAULT_MAX_ATTEMPTS = 20000
-        actual_max_attempts = max_attempts_param or DEFAULT_MAX_ATTEMPTS
+        actual_max_attempts = max_attempts_param
+        if not actual_max_attempts:
+            actual_max_attempts = self._attempt_budget(
+                num_hands, suit_holding, hcp, hand_shape, hand_losers, controls, any_shape, smart_stack, predeal
+            )
         
         # Simple attempt limit logic if no num_hands
         if num_hands <= 0:
              return
 
-        while generated_count < num_hands and generation_attempts < actual_max_attempts:
-            deal = dealer()
-            generation_attempts += 1
-            if accept(deal):
-                yield deal
-                generated_count += 1
+        # Metrics are reported in batches so the hot loop stays cheap
+        reported_attempts = 0
+        reported_count = 0
+        try:
+            while generated_count < num_hands and generation_attempts < actual_max_attempts:
+                deal = dealer()
+                generation_attempts += 1
+                if accept(deal):
+                    yield deal
+                    generated_count += 1
+                if generation_attempts - reported_attempts >= METRICS_BATCH_SIZE:
+                    metrics.record_deals(generation_attempts - reported_attempts,
+                                         generated_count - reported_count)
+                    reported_attempts, reported_count = generation_attempts, generated_count
+        finally:
+            metrics.record_deals(generation_attempts - reported_attempts,
+                                 generated_count - reported_count)
+
+    def yield_seeded_deals(self, rng: random.Random, num_hands: int = 100,
+                           suit_holding: Dict[str, Dict[str, int]] = None,
+                           hcp: Dict[str, Tuple[int, int]] = None,
+                           hand_shape: Dict[str, List[int]] = None,
+                           hand_losers: Dict[str, Tuple[int, int]] = None,
+                           controls: Dict[str, Tuple[int, int]] = None,
+                           any_shape: Dict[str, str] = None,
+                           smart_stack: Dict[str, Dict] = None,
+                           predeal: Dict[str, str] = None,
+                           max_attempts_param: int = None
+                           ):
+        """
+        Like yield_deals, but every card is dealt from rng, so the deals follow
+        from its state alone and the module-level random generator (which
+        redeal's dealers share between request threads) is left untouched.
+
+        The first SmartStack seat without predealt cards is drawn from rng
+        directly: a shape of its region with its natural probability, then
+        its cards suit by suit, rejected when their hcp miss the range, so
+        every hand of the region is equally likely. The other open cards are shuffled with rng
+        and handed out after the predeal. Further SmartStack entries become
+        shape and hcp filters (their shapes must be strings). Every layout is
+        checked on its masks before a Deal is built.
+
+        Args:
+            rng: The job's own random.Random; saving rng.getstate() saves the
+                 position in the deal sequence.
+            Other arguments as in yield_deals.
+        """
+        predealt = frequency.predeal_masks(predeal)
+        stack = self._seeded_stack(smart_stack, predeal, predealt)
+        stack_filters = self._smart_stack_filters(smart_stack, predealt, skip_seat=stack and stack[0])
+        try:
+            accept_masks = self._build_accept(suit_holding, hcp, hand_shape, hand_losers, controls, any_shape,
+                                              masks_only=True)
+            accept = None
+        except ValueError:
+            # Shapes only redeal can read are checked on the finished deal
+            accept_masks = None
+            accept = self._build_accept(suit_holding, hcp, hand_shape, hand_losers, controls, any_shape)
+        open_cards = [(suit, bit) for suit, mask in enumerate(frequency.unknown_masks(predealt))
+                      for bit in evaluators.RANK_BITS.values() if mask & bit]
+        needs = [13 - sum(mask.bit_count() for mask in hand) for hand in predealt]
+
+        max_attempts = max_attempts_param
+        if not max_attempts:
+            max_attempts = self._attempt_budget(
+                num_hands, suit_holding, hcp, hand_shape, hand_losers, controls, any_shape, smart_stack, predeal
+            )
+            # The budget assumes every SmartStack seat lands in its region; here
+            # a drawn seat misses its hcp range and a filtered one its region
+            rate = stack[4] if stack else 1.0
+            filtered = {player: config for player, config in (smart_stack or {}).items()
+                        if not stack or player != stack[0]}
+            if filtered and max_attempts:
+                try:
+                    rate *= frequency.probability(smart_stack=filtered, predeal=predeal)
+                except ValueError:
+                    pass
+            if rate > 0 and max_attempts:
+                max_attempts = min(MAX_ATTEMPTS, math.ceil(max_attempts / rate))
+        if num_hands <= 0:
+            return
+
+        attempts = 0
+        accepted = 0
+        reported_attempts = 0
+        reported_count = 0
+        try:
+            while accepted < num_hands and attempts < max_attempts:
+                attempts += 1
+                layout = self._seeded_layout(rng, predealt, open_cards, needs, stack)
+                if (layout is not None and self._passes_smart_stack_filters(layout, stack_filters)
+                        and (accept_masks is None or accept_masks(layout))):
+                    hands = {player: Hand.from_str(hand_str)
+                             for player, hand_str in exhaustive.layout_predeal(layout).items()}
+                    deal = Deal.prepare(hands)()
+                    if accept is None or accept(deal):
+                        accepted += 1
+                        yield deal
+                if attempts - reported_attempts >= METRICS_BATCH_SIZE:
+                    metrics.record_deals(attempts - reported_attempts, accepted - reported_count)
+                    reported_attempts, reported_count = attempts, accepted
+        finally:
+            metrics.record_deals(attempts - reported_attempts, accepted - reported_count)
+
+    def _seeded_stack(self, smart_stack, predeal, predealt):
+        """
+        The SmartStack seat yield_seeded_deals draws directly, as (player, shapes,
+        cumulative shape probabilities, hcp range, rate at which a drawn hand's
+        hcp fall in the range, open cards of each suit), or None when no
+        SmartStack seat is open.
+
+        A shape of the region is picked with its natural probability P(shape)
+        and a hand of that shape is drawn uniformly; hands whose hcp miss the
+        range are rejected. Shape s is then accepted with probability
+        P(s, hcp in range), so every hand of the region is equally likely.
+        """
+        for player, config in (smart_stack or {}).items():
+            if any(predealt[exhaustive.SEATS.index(player)]):
+                continue
+            region = frequency.distribution('shape', seat=player, smart_stack={player: config}, predeal=predeal)
+            if not region:
+                return None
+            shape_only = {player: {'shape': config['shape']} if config.get('shape') is not None else {}}
+            natural = frequency.distribution('shape', seat=player, smart_stack=shape_only, predeal=predeal)
+            cumulative = []
+            running = 0.0
+            for shape in region:
+                running += natural[shape]
+                cumulative.append(running)
+            rate = sum(region.values()) / running
+            open_by_suit = [[bit for bit in evaluators.RANK_BITS.values() if mask & bit]
+                            for mask in frequency.unknown_masks(predealt)]
+            return player, list(region), cumulative, tuple(config.get('hcp') or (0, 37)), rate, open_by_suit
+        return None
+
+    def _seeded_layout(self, rng, predealt, open_cards, needs, stack):
+        """
+        One layout of the open cards after the predeal, drawn from rng, with the
+        SmartStack seat of _seeded_stack drawn first. None when that seat's hcp
+        miss its range.
+        """
+        drawn = None
+        if stack is None:
+            rng.shuffle(open_cards)
+            rest = open_cards
+        else:
+            player, shapes, cumulative, (low, high), _, open_by_suit = stack
+            drawn_seat = exhaustive.SEATS.index(player)
+            choice = min(bisect.bisect_right(cumulative, rng.random() * cumulative[-1]), len(shapes) - 1)
+            drawn = [0, 0, 0, 0]
+            for suit, length in enumerate(shapes[choice]):
+                for bit in rng.sample(open_by_suit[suit], length):
+                    drawn[suit] |= bit
+            if not low <= evaluators.hcp(drawn) <= high:
+                return None
+            rest = [(suit, bit) for suit, bit in open_cards if not drawn[suit] & bit]
+            rng.shuffle(rest)
+
+        layout = []
+        dealt = 0
+        for seat, hand in enumerate(predealt):
+            if drawn is not None and seat == drawn_seat:
+                layout.append(tuple(drawn))
+                continue
+            masks = list(hand)
+            for suit, bit in rest[dealt:dealt + needs[seat]]:
+                masks[suit] |= bit
+            dealt += needs[seat]
+            layout.append(tuple(masks))
+        return layout
+
+    def enumerate_deals(self, start: int = 0, stop: int = None,
+                        suit_holding: Dict[str, Dict[str, int]] = None,
+                        hcp: Dict[str, Tuple[int, int]] = None,
+                        hand_shape: Dict[str, List[int]] = None,
+                        hand_losers: Dict[str, Tuple[int, int]] = None,
+                        controls: Dict[str, Tuple[int, int]] = None,
+                        any_shape: Dict[str, str] = None,
+                        smart_stack: Dict[str, Dict] = None,
+                        predeal: Dict[str, str] = None,
+                        num_hands: int = None,
+                        max_attempts_param: int = None
+                        ):
+        """
+        Yield every deal consistent with predeal that satisfies the constraints,
+        each exactly once. Every layout is equally likely, so the accepted deals
+        are the exact conditional distribution.
+
+        Args:
+            start, stop: Range of layout numbers to walk (see exhaustive.iter_layouts),
+                         so callers can split the work into chunks.
+            Constraints as in generate_hands. SmartStack entries are applied as
+            filters (shape and hcp range); their shapes must be strings.
+            num_hands and max_attempts_param are accepted for signature
+            compatibility and ignored.
+        """
+        accept = self._build_accept(suit_holding, hcp, hand_shape, hand_losers, controls, any_shape)
+        predealt = frequency.predeal_masks(predeal)
+
+        # SmartStack seats without predealt cards become shape/hcp filters
+        stack_filters = self._smart_stack_filters(smart_stack, predealt)
+
+        attempts = 0
+        accepted = 0
+        try:
+            for layout in exhaustive.iter_layouts(predeal, start, stop):
+                attempts += 1
+                if not self._passes_smart_stack_filters(layout, stack_filters):
+                    continue
+                hands = {player: Hand.from_str(hand_str)
+                         for player, hand_str in exhaustive.layout_predeal(layout).items()}
+                deal = Deal.prepare(hands)()
+                if accept(deal):
+                    accepted += 1
+                    yield deal
+        finally:
+            metrics.record_deals(attempts, accepted)
+
+    def yield_weighted_deals(self, num_hands: int = 100,
+                             suit_holding: Dict[str, Dict[str, int]] = None,
+                             hcp: Dict[str, Tuple[int, int]] = None,
+                             hand_shape: Dict[str, List[int]] = None,
+                             hand_losers: Dict[str, Tuple[int, int]] = None,
+                             controls: Dict[str, Tuple[int, int]] = None,
+                             any_shape: Dict[str, str] = None,
+                             smart_stack: Dict[str, Dict] = None,
+                             predeal: Dict[str, str] = None,
+                             max_attempts_param: int = None,
+                             temper: float = IMPORTANCE_TEMPER
+                             ):
+        """
+        Importance sampling: yield (deal, weight) pairs for constraints that
+        plain rejection rarely satisfies (e.g. N 22+ HCP, E 6-5).
+
+        The proposal deals the rarest constrained seat from SmartStacks over
+        its shape and HCP region, split into HCP bins. Bin b is chosen with
+        probability q_b proportional to p_b ** temper, where p_b is the bin's
+        exact natural probability. Constraints on other seats (and the seat's
+        controls or losers) are then checked as usual. An accepted deal's
+        weight is p_b / q_b (normalized so a natural draw has weight 1), so
+        weighted averages estimate the constrained distribution without bias.
+
+        Args:
+            temper: 1 (default) samples bins at their natural rates; lower values
+                    over-sample the rare bins, and 0 spreads deals evenly over bins.
+            Other arguments as in yield_deals. SmartStack entries define the
+            region of their seat.
+        """
+        constraints = dict(suit_holding=suit_holding, hcp=hcp, hand_shape=hand_shape,
+                           hand_losers=hand_losers, controls=controls, any_shape=any_shape,
+                           smart_stack=smart_stack)
+        predealt = frequency.predeal_masks(predeal)
+        seat = self._rarest_seat(constraints, predeal, predealt)
+        own = {key: {seat: value[seat]} for key, value in constraints.items() if value and seat in value}
+        hcp_range, allowed = frequency.seat_region(seat, predeal=predeal, **own)
+
+        # Natural probability of each HCP value inside the seat's shape region
+        region = {key: value for key, value in own.items() if key not in ('controls', 'hand_losers')}
+        by_hcp = frequency.distribution('hcp', seat=seat, predeal=predeal, **region)
+        values = [h for h in range(hcp_range[0], hcp_range[1] + 1) if by_hcp.get(h, 0) > 0]
+        if not values or num_hands <= 0:
+            return
+        size = math.ceil(len(values) / min(IMPORTANCE_HCP_BINS, len(values)))
+        bins = [values[i:i + size] for i in range(0, len(values), size)]
+        p = [sum(by_hcp[h] for h in b) for b in bins]
+        q = [pb ** temper for pb in p]
+        p_total, q_total = sum(p), sum(q)
+        weights = [(pb / p_total) / (qb / q_total) for pb, qb in zip(p, q)]
+        cumulative = []
+        running = 0.0
+        for qb in q:
+            running += qb / q_total
+            cumulative.append(running)
+
+        if allowed is None:
+            shape_obj = Shape.from_cond(lambda s, h, d, c: True)
+        else:
+            shape_obj = Shape.from_cond(lambda s, h, d, c: (s, h, d, c) in allowed)
+        dealers = [
+            self._prepare_dealer(None, None, None, None, None, None,
+                                 {seat: {'shape': shape_obj, 'hcp': (b[0], b[-1])}}, predeal)
+            for b in bins
+        ]
+        others = {key: value for key, value in constraints.items() if key != 'smart_stack'}
+        accept = self._build_accept(**others)
+        stack_filters = self._smart_stack_filters(smart_stack, predealt, skip_seat=seat)
+
+        max_attempts = max_attempts_param or MAX_ATTEMPTS
+        attempts = 0
+        accepted = 0
+        try:
+            while accepted < num_hands and attempts < max_attempts:
+                attempts += 1
+                choice = bisect.bisect_left(cumulative, random.random())
+                choice = min(choice, len(bins) - 1)
+                deal = dealers[choice]()
+                if accept(deal) and self._passes_smart_stack_filters(bitboard_for(deal).masks, stack_filters):
+                    accepted += 1
+                    yield deal, weights[choice]
+        finally:
+            metrics.record_deals(attempts, accepted)
+
+    def _smart_stack_filters(self, smart_stack, predealt, skip_seat: str = None):
+        """
+        SmartStack entries as (seat index, allowed shapes, hcp range) filters, for
+        dealers that do not draw those seats from a SmartStack. Seats with
+        predealt cards are skipped, as _prepare_dealer ignores them too.
+        """
+        filters = []
+        for player, config in (smart_stack or {}).items():
+            seat = exhaustive.SEATS.index(player)
+            if player == skip_seat or any(predealt[seat]):
+                continue
+            shape_val = config.get('shape')
+            if shape_val is not None and not isinstance(shape_val, str):
+                raise ValueError("SmartStack shapes must be strings to be used as filters")
+            shapes = frequency.shape_lengths(shape_val) if shape_val is not None else None
+            filters.append((seat, shapes, config.get('hcp')))
+        return filters
+
+    def _passes_smart_stack_filters(self, masks, filters) -> bool:
+        """Check per-seat suit masks (N, E, S, W) against _smart_stack_filters."""
+        for seat, shapes, hcp_range in filters:
+            if shapes is not None and evaluators.shape(masks[seat]) not in shapes:
+                return False
+            if hcp_range and not hcp_range[0] <= evaluators.hcp(masks[seat]) <= hcp_range[1]:
+                return False
+        return True
+
+    def constraint_filter(self, suit_holding: Dict[str, Dict[str, int]] = None,
+                          hcp: Dict[str, Tuple[int, int]] = None,
+                          hand_shape: Dict[str, List[int]] = None,
+                          hand_losers: Dict[str, Tuple[int, int]] = None,
+                          controls: Dict[str, Tuple[int, int]] = None,
+                          any_shape: Dict[str, str] = None,
+                          smart_stack: Dict[str, Dict] = None,
+                          predeal: Dict[str, str] = None,
+                          num_hands: int = None,
+                          max_attempts_param: int = None):
+        """
+        Predicate telling whether a finished deal satisfies generator_params:
+        predealt cards, SmartStack shape and hcp (shapes must be strings) and
+        the other constraints. Used to partition deals that were dealt under
+        looser constraints.
+        """
+        predealt = frequency.predeal_masks(predeal)
+        stack_filters = self._smart_stack_filters(smart_stack, predealt)
+        accept = self._build_accept(suit_holding, hcp, hand_shape, hand_losers, controls, any_shape)
+
+        def matches(deal) -> bool:
+            masks = bitboard_for(deal).masks
+            for hand, known_hand in zip(masks, predealt):
+                if any(have & known != known for have, known in zip(hand, known_hand)):
+                    return False
+            return self._passes_smart_stack_filters(masks, stack_filters) and accept(deal)
+
+        return matches
+
+    def masks_filter(self, suit_holding: Dict[str, Dict[str, int]] = None,
+                     hcp: Dict[str, Tuple[int, int]] = None,
+                     hand_shape: Dict[str, List[int]] = None,
+                     hand_losers: Dict[str, Tuple[int, int]] = None,
+                     controls: Dict[str, Tuple[int, int]] = None,
+                     any_shape: Dict[str, str] = None,
+                     smart_stack: Dict[str, Dict] = None,
+                     predeal: Dict[str, str] = None,
+                     num_hands: int = None,
+                     max_attempts_param: int = None):
+        """
+        Like constraint_filter, but the predicate takes per-seat suit masks
+        (N, E, S, W) instead of a Deal, so stored deals can be checked before
+        one is built. Raises ValueError for any_shape patterns that only redeal
+        can read.
+        """
+        predealt = frequency.predeal_masks(predeal)
+        stack_filters = self._smart_stack_filters(smart_stack, predealt)
+        accept = self._build_accept(suit_holding, hcp, hand_shape, hand_losers, controls, any_shape,
+                                    masks_only=True)
+
+        def matches(masks) -> bool:
+            for hand, known_hand in zip(masks, predealt):
+                if any(have & known != known for have, known in zip(hand, known_hand)):
+                    return False
+            return self._passes_smart_stack_filters(masks, stack_filters) and accept(masks)
+
+        return matches
+
+    def _rarest_seat(self, constraints, predeal, predealt) -> str:
+        """The constrained seat (without predealt cards) whose own constraints are least likely."""
+        best, best_p = None, None
+        for seat in exhaustive.SEATS:
+            if any(predealt[exhaustive.SEATS.index(seat)]):
+                continue
+            own = {key: {seat: value[seat]} for key, value in constraints.items() if value and seat in value}
+            if not own:
+                continue
+            p = frequency.probability(predeal=predeal, **own)
+            if best is None or p < best_p:
+                best, best_p = seat, p
+        if best is None:
+            raise ValueError("Weighted sampling needs a constrained seat without predealt cards")
+        return best
+
+    def _attempt_budget(self, num_hands, suit_holding, hcp, hand_shape, hand_losers, controls,
+                        any_shape, smart_stack, predeal) -> int:
+        """
+        Number of dealer attempts to allow for num_hands accepted deals.
+
+        Uses the exact acceptance rate from the frequency module. A SmartStack
+        seat is dealt from its constrained region directly, so the rate the
+        filter sees is P(all constraints) / P(SmartStack constraint). Falls
+        back to DEFAULT_MAX_ATTEMPTS when the rate cannot be computed exactly
+        (constraints on several seats, non-string SmartStack shapes).
+        """
+        try:
+            p_all = frequency.probability(
+                suit_holding=suit_holding, hcp=hcp, hand_shape=hand_shape, hand_losers=hand_losers,
+                controls=controls, any_shape=any_shape, smart_stack=smart_stack, predeal=predeal
+            )
+            p_stack = frequency.probability(smart_stack=smart_stack, predeal=predeal) if smart_stack else 1.0
+        except ValueError:
+            return DEFAULT_MAX_ATTEMPTS
+        if p_all == 0 or p_stack == 0:
+            return 0
+        expected_attempts = num_hands * p_stack / p_all
+        return int(min(MAX_ATTEMPTS, max(DEFAULT_MAX_ATTEMPTS, math.ceil(ATTEMPT_SAFETY_FACTOR * expected_attempts))))
+
+    def _build_accept(self, suit_holding, hcp, hand_shape, hand_losers, controls, any_shape,
+                      masks_only: bool = False):
+        """
+        Build the accept(deal) filter shared by generate_hands and yield_deals.
+
+        Constraints are normalized once (seat and suit indices, parsed Shape
+        objects), so the per-deal work is one mask computation per constrained
+        hand followed by table lookups from the evaluators module. With
+        masks_only the filter takes per-seat suit masks instead of a deal, and
+        any_shape patterns are read by frequency.shape_lengths.
+        """
+        seat_index = {'N': 0, 'E': 1, 'S': 2, 'W': 3}
+        suit_index = {'S': 0, 'H': 1, 'D': 2, 'C': 3}
+        checks = {}  # seat index -> list of (kind, argument)
+        invalid = False
+
+        def add(player, kind, argument):
+            if player in seat_index:
+                checks.setdefault(seat_index[player], []).append((kind, argument))
+
+        # Check suit holding requirements (minimum length per suit)
+        for player, suits in (suit_holding or {}).items():
+            add(player, 'suit_holding', [(suit_index[s], min_len) for s, min_len in suits.items()])
+
+        # Check hand shape requirements, allowing -1 as wildcard in target shape
+        for player, shape in (hand_shape or {}).items():
+            if len(shape) != 4:
+                invalid = True
+            add(player, 'hand_shape', [(i, target) for i, target in enumerate(shape) if target != -1])
+
+        for player, (min_hcp, max_hcp) in (hcp or {}).items():
+            add(player, 'hcp', (min_hcp, max_hcp))
+
+        for player, (min_controls, max_controls) in (controls or {}).items():
+            add(player, 'controls', (min_controls, max_controls))
+
+        for player, (min_losers, max_losers) in (hand_losers or {}).items():
+            add(player, 'losers', (min_losers, max_losers))
+
+        # Check advanced shape requirements with redeal Shape objects
+        for player, shape_str in (any_shape or {}).items():
+            if masks_only:
+                add(player, 'shape_lengths', frequency.shape_lengths(shape_str))
+                continue
+            try:
+                # Handle keywords
+                if shape_str.lower() == 'balanced':
+                    shape_obj = balanced
+                elif shape_str.lower() == 'semibalanced':
+                    shape_obj = semibalanced
+                else:
+                    # Parse string into Shape object
+                    shape_obj = Shape(shape_str)
+            except Exception:
+                # An invalid shape string can never be matched
+                invalid = True
+                continue
+            add(player, 'any_shape', shape_obj)
+
+        seat_checks = sorted(checks.items())
+
+        def accept_masks(board_masks, deal=None) -> bool:
+            """
+            Accept a deal if it meets all the specified criteria.
+            """
+            if invalid:
+                return False
+            for seat, seat_constraints in seat_checks:
+                masks = board_masks[seat]
+                for kind, argument in seat_constraints:
+                    if kind == 'suit_holding' or kind == 'hand_shape':
+                        for suit, target in argument:
+                            actual = masks[suit].bit_count()
+                            if actual < target if kind == 'suit_holding' else actual != target:
+                                return False
+                    elif kind == 'hcp':
+                        if not (argument[0] <= evaluators.hcp(masks) <= argument[1]):
+                            return False
+                    elif kind == 'controls':
+                        if not (argument[0] <= evaluators.controls(masks) <= argument[1]):
+                            return False
+                    elif kind == 'losers':
+                        if not (argument[0] <= evaluators.losers(masks) <= argument[1]):
+                            return False
+                    elif kind == 'shape_lengths':
+                        if evaluators.shape(masks) not in argument:
+                            return False
+                    elif kind == 'any_shape':
+                        try:
+                            if not argument(deal[seat]):
+                                return False
+                        except Exception:
+                            return False
+            return True
+
+        if masks_only:
+            return accept_masks
+
+        def accept(deal) -> bool:
+            return accept_masks(bitboard_for(deal).masks, deal)
+
+        return accept
 
     def _prepare_dealer(self, suit_holding, hcp, hand_shape, hand_losers, controls, any_shape, smart_stack, predeal):
         # Prepare the predeal dictionary
@@ -338,6 +723,7 @@ class BridgeHandGenerator:
             predeal_hands[direction] = Hand.from_str(hand_str)
         
         # Process SmartStack constraints
+        uses_smart_stack = False
         if smart_stack:
             for player, config in smart_stack.items():
                 if player in predeal_hands and len(predeal_hands[player].cards()) > 0:
@@ -366,14 +752,38 @@ class BridgeHandGenerator:
                 # Create SmartStack
                 # Usage: SmartStack(shape, evaluator, values)
                 # We use the built-in 'hcp' evaluator from redeal (imported as hcp_eval)
-                ss = SmartStack(shape_obj, hcp_eval, hcp_range)
+                cache_key = None
+                if isinstance(shape_val, str):
+                    predealt = tuple(sorted((d, h) for d, h in predeal_dict.items()
+                                            if d != player and h != "- - - -"))
+                    cache_key = (shape_val.lower(), hcp_range.start, hcp_range.stop, predealt)
+                with _smart_stack_lock:
+                    ss = _smart_stack_cache.get(cache_key) if cache_key else None
+                    if cache_key:
+                        metrics.record_cache('smart_stack', ss is not None)
+                    if ss is None:
+                        ss = SmartStack(shape_obj, hcp_eval, hcp_range)
+                        if cache_key:
+                            _smart_stack_cache[cache_key] = ss
+                            while len(_smart_stack_cache) > SMART_STACK_CACHE_SIZE:
+                                _smart_stack_cache.popitem(last=False)
+                                metrics.record_eviction('smart_stack')
+                    if cache_key:
+                        _smart_stack_cache.move_to_end(cache_key)
                 predeal_hands[player] = ss
+                uses_smart_stack = True
 
+        if uses_smart_stack:
+            # Deal.prepare runs the SmartStack precomputation, which mutates the instance
+            with _smart_stack_lock:
+                return Deal.prepare(predeal_hands)
         return Deal.prepare(predeal_hands)
 
     def generate_hand(self) -> Dict[str, Dict[str, List[str]]]:
         """
         Generate a new bridge hand using redeal's simulation capabilities.
+        Nothing is stored on the generator; use yield_deals and get_hand_summary(deal)
+        when the Deal object itself is needed.
         
         Returns:
             Dict: A dictionary containing the cards for each player, organized by suit.
@@ -394,9 +804,6 @@ class BridgeHandGenerator:
         # Add the accept function to the deal
         deal.accept = accept
         
-        # Store the deal
-        self.deal = deal
-        
         return self._format_hand(deal)
 
     def _calculate_controls(self, hand: Hand) -> int:
@@ -407,22 +814,13 @@ class BridgeHandGenerator:
 
     def _calculate_losers(self, hand: Hand) -> int:
         """
-        Calculate losers for a hand using redeal's Hand class.
-        
-        Note: This method is currently commented out due to issues with redeal's implementation.
+        Calculate the losing-trick count of a hand from the precomputed holding tables.
         """
-        # return round(sum(holding.newltc for holding in hand))
-        return 0  # Placeholder return value
-
-    # def _calculate_losers(self, hand: Hand) -> int:
-    #     """
-    #     Calculate losers for a hand using redeal's Hand class.
-    #     """
-    #     return round(hand.newltc)
+        return evaluators.losers(evaluators.hand_masks(hand))
 
     def _format_hand(self, deal):
         """
-        Format a deal into a more user-friendly structure using redeal's built-in formatting.
+        Format a deal into a more user-friendly structure.
         
         Args:
             deal: Deal object to format
@@ -432,44 +830,22 @@ class BridgeHandGenerator:
         """
         formatted_hand = {}
         
-        # Map our suit symbols to redeal's suit order
-        suit_map = {
-            'S': Suit.S,  # Spades
-            'H': Suit.H,  # Hearts
-            'D': Suit.D,  # Diamonds
-            'C': Suit.C   # Clubs
-        }
-        
-        # Create dictionary for each player
-        for player in ['N', 'E', 'S', 'W']:
+        # Read the ranks from the deal's bitboard instead of materializing Card objects
+        board = bitboard_for(deal)
+        for player_idx, player in enumerate(['N', 'E', 'S', 'W']):
             formatted_hand[player] = {}
-            
-            # Get the player's hand using Deal's tuple indexing
-            player_idx = {'N': 0, 'E': 1, 'S': 2, 'W': 3}[player]
-            hand = deal[player_idx]
-            
-            # Get cards for each suit
-            for suit_char, suit in suit_map.items():
-                # Initialize suit as empty list
-                formatted_hand[player][suit_char] = []
-                
-                # Get cards in this suit using Hand's cards() method
-                for card in hand.cards():
-                    if card.suit == suit:
-                        formatted_hand[player][suit_char].append(str(card.rank))
-                
-                # Sort cards within each suit by rank if we have any cards
-                if formatted_hand[player][suit_char]:
-                    formatted_hand[player][suit_char].sort(
-                        key=lambda x: RANKS.index(x),
-                        reverse=True
-                    )
+            for suit_idx, suit_char in enumerate(SUITS):
+                # Ranks are listed from lowest to highest, as before
+                formatted_hand[player][suit_char] = board.ranks(player_idx, suit_idx)[::-1]
         
         return formatted_hand
 
-    def get_hand_summary(self) -> Dict[str, Dict[str, int]]:
+    def get_hand_summary(self, deal: Deal) -> Dict[str, Dict[str, int]]:
         """
-        Get a summary of each player's hand showing the number of cards in each suit using redeal's shape property.
+        Get a summary of each player's hand showing the number of cards in each suit.
+
+        Args:
+            deal: Deal object to summarize.
 
         Returns:
             Dict: A dictionary containing the number of cards in each suit for each player.
@@ -478,17 +854,15 @@ class BridgeHandGenerator:
         for player in ['N', 'E', 'S', 'W']:
             # Get the player's hand using Deal's tuple indexing
             player_idx = {'N': 0, 'E': 1, 'S': 2, 'W': 3}[player]
-            hand = self.deal[player_idx]
-            
-            # Get the shape (lengths of each suit)
-            shape = hand.shape
+            # Get the shape (lengths of each suit) from the deal's bitboard
+            shape = bitboard_for(deal).shape(player_idx)
             
             # Map our suit symbols to redeal's suit order
             suit_map = {
-                '♠': 0,  # Spades
-                '♥': 1,  # Hearts
-                '♦': 2,  # Diamonds
-                '♣': 3   # Clubs
+                'S': 0,  # Spades
+                'H': 1,  # Hearts
+                'D': 2,  # Diamonds
+                'C': 3   # Clubs
             }
             
             # Create summary using redeal's shape
@@ -0,0 +1,120 @@
+"""
+Opening lead studies.
+
+The leader's hand is fixed by predeal, so cards of touching rank in one suit
+(say KQJ) are equivalent on every deal: whichever is led, the double dummy
+result is the same. Leads are grouped that way and each group is scored
+through its highest card, its representative.
+
+Each deal is solved for all leads at once (DoubleDummySolver.get_tricks_for_all_leads).
+Batches of deals travel to worker processes as predeal strings, since the
+workers rebuild the deals themselves.
+"""
+import math
+from typing import Any, Dict, List, Sequence, Tuple
+from redeal.redeal import Deal, Hand
+from . import aggregation, evaluators
+from .double_dummy import DoubleDummySolver
+from .frequency import SUITS, parse_hand
+
+# redeal may print suits as symbols
+SUIT_SYMBOLS = {'♠': 'S', '♥': 'H', '♦': 'D', '♣': 'C'}
+
+
+def card_name(card) -> str:
+    """Suit letter and rank of a redeal Card, e.g. 'SK' or 'HT'."""
+    text = str(card).strip()
+    suit = SUIT_SYMBOLS.get(text[0], text[0]).upper()
+    return suit + text[1:].upper().replace('10', 'T')
+
+
+def lead_groups(hand_str: str) -> Dict[str, List[str]]:
+    """
+    Groups of equivalent leads from a 13-card predeal string, keyed by their
+    representative (highest) card: 'KQJ72 ...' gives 'SK': ['SK', 'SQ', 'SJ'],
+    'S7': ['S7'], 'S2': ['S2'], ...
+    """
+    masks = parse_hand(hand_str)
+    if sum(mask.bit_count() for mask in masks) != 13:
+        raise ValueError(f"The leader's hand must have 13 cards: {hand_str}")
+    groups = {}
+    for suit, mask in zip(SUITS, masks):
+        group = []
+        for rank in evaluators.RANK_ORDER:
+            if mask & evaluators.RANK_BITS[rank]:
+                group.append(suit + rank)
+            elif group:
+                groups[group[0]] = group
+                group = []
+        if group:
+            groups[group[0]] = group
+    return groups
+
+
+def solve_leads(deal, strain: str, leader: str, groups: Dict[str, List[str]]) -> Dict[str, int]:
+    """Declarer's tricks after each representative lead on one deal."""
+    results = {card_name(card): tricks for card, tricks in
+               DoubleDummySolver(deal).get_tricks_for_all_leads(strain, leader).items()}
+    tricks = {}
+    for representative, cards in groups.items():
+        # Equivalent cards score the same, so any one listed will do
+        card = next((card for card in cards if card in results), None)
+        if card is not None:
+            tricks[representative] = results[card]
+    return tricks
+
+
+def solve_deals(deals, strain: str, leader: str,
+                groups: Dict[str, List[str]]) -> Tuple[List[Dict[str, int]], List[str]]:
+    """
+    Solve the leads of every deal.
+
+    Returns:
+        (solved, errors): the results of the deals that solved, and the error
+        message of each deal that did not.
+    """
+    solved, errors = [], []
+    for i, deal in enumerate(deals):
+        try:
+            solved.append(solve_leads(deal, strain, leader, groups))
+        except Exception as e:
+            print(f"Error in lead study deal {i}: {e}")
+            errors.append(str(e))
+    return solved, errors
+
+
+def solve_batch(task: Tuple[List[Dict[str, str]], str, str, Dict[str, List[str]]]
+                ) -> Tuple[List[Dict[str, int]], List[str]]:
+    """Worker entry point: rebuild a batch of deals from predeal strings and solve them."""
+    predeals, strain, leader, groups = task
+    deals = (Deal.prepare({seat: Hand.from_str(hand) for seat, hand in predeal.items()})()
+             for predeal in predeals)
+    return solve_deals(deals, strain, leader, groups)
+
+
+def summarize_leads(per_deal: Sequence[Dict[str, int]], groups: Dict[str, List[str]],
+                    needed: int) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Per-group statistics and the ranking of the leads.
+
+    Returns:
+        (leads, ranking): leads maps each representative to its 'cards', the
+        summary of declarer's 'tricks' (the tricks the lead concedes) and the
+        probability of setting the contract ('set_probability', with its
+        'set_stderr'). ranking lists representatives from the best lead down:
+        most likely to set, then fewest tricks conceded.
+    """
+    leads = {}
+    for representative, cards in groups.items():
+        tricks = [deal[representative] for deal in per_deal if representative in deal]
+        if not tricks:
+            continue
+        p = sum(1 for t in tricks if t < needed) / len(tricks)
+        leads[representative] = {
+            'cards': cards,
+            'tricks': aggregation.summarize(tricks),
+            'set_probability': p,
+            'set_stderr': math.sqrt(p * (1 - p) / len(tricks)),
+        }
+    ranking = sorted(leads, key=lambda card: (-leads[card]['set_probability'], leads[card]['tricks']['mean']))
+    return leads, ranking
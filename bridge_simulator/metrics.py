@@ -0,0 +1,413 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Directory shared by every gunicorn worker on the machine. Each process writes
+# its own snapshot file there and /metrics merges all of them.
+METRICS_DIR = os.environ.get(
+    'BRIDGE_METRICS_DIR',
+    os.path.join(tempfile.gettempdir(), 'bridge_simulator_metrics')
+)
+
+# Minimum number of seconds between two snapshot writes of the same process.
+FLUSH_INTERVAL = 1.0
+
+# Counters and histograms of exited workers, folded together so their snapshot
+# files can be deleted without the merged totals going backwards
+ARCHIVE_FILE = 'metrics_archive.json'
+# Taken by the process that folds dead snapshots into the archive
+LOCK_FILE = 'metrics.lock'
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+DDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# name -> (type, help text)
+METRIC_HELP = {
+    'bridge_deals_generated_total': ('counter', 'Deals produced by the dealer, accepted or not.'),
+    'bridge_deals_accepted_total': ('counter', 'Deals that satisfied every constraint.'),
+    'bridge_dds_solves_total': ('counter', 'Double dummy solver calls.'),
+    'bridge_dds_solve_seconds': ('histogram', 'Latency of a single double dummy solver call.'),
+    'bridge_http_requests_total': ('counter', 'Finished API requests.'),
+    'bridge_http_request_seconds': ('histogram', 'API request latency.'),
+    'bridge_http_requests_in_flight': ('gauge', 'API requests currently being served (queue depth).'),
+    'bridge_cache_requests_total': ('counter', 'Cache lookups by cache and result (hit/miss).'),
+    'bridge_cache_evictions_total': ('counter', 'Entries dropped from bounded caches to make room.'),
+    'process_resident_memory_bytes': ('gauge', 'Resident memory of each worker process.'),
+}
+
+# Ratios derived from the merged counters when rendering.
+DERIVED_HELP = {
+    'bridge_deal_acceptance_ratio': 'Accepted deals divided by generated deals.',
+    'bridge_cache_hit_ratio': 'Cache hits divided by cache lookups.',
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = list(labels) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in items) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _rss_bytes() -> int:
+    """Current resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is reported in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_start(pid: int) -> Optional[str]:
+    """Start time of a process in clock ticks since boot, where /proc has it."""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # Fields after the parenthesized command name; starttime is field 22
+            return f.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+@contextmanager
+def _directory_lock(directory: str):
+    """Exclusive lock shared by every worker writing to directory (a no-op without fcntl)."""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _merge_totals(snapshots: List[Dict]):
+    """Summed counters and histograms of several snapshots."""
+    counters, histograms = {}, {}
+    for snap in snapshots:
+        for name, labels, value in snap.get('counters', []):
+            key = (name, tuple(tuple(l) for l in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, buckets, counts, total in snap.get('histograms', []):
+            key = (name, tuple(tuple(l) for l in labels))
+            merged = histograms.get(key)
+            if merged is None or merged['buckets'] != buckets:
+                histograms[key] = {'buckets': buckets, 'counts': list(counts), 'sum': total}
+            else:
+                merged['counts'] = [a + b for a, b in zip(merged['counts'], counts)]
+                merged['sum'] += total
+    return counters, histograms
+
+
+class MetricsRegistry:
+    """
+    Process-local counters, gauges and histograms with a file-based merge step.
+
+    Updates only touch an in-memory dict under a lock. At most once per
+    FLUSH_INTERVAL the process snapshot is written atomically to
+    ``<directory>/metrics_<pid>_<start>.json``, where start is the process's
+    start time, so a worker that reuses a PID never overwrites an old file.
+    Rendering reads every snapshot in the directory, so any worker can answer
+    /metrics for the whole machine, and folds those of exited workers into
+    one archive file.
+    """
+
+    def __init__(self, directory: str = METRICS_DIR, pid: int = None,
+                 flush_interval: float = FLUSH_INTERVAL):
+        self.directory = directory
+        self.pid = pid
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._last_flush = 0.0
+        # Serializes snapshot writes: request threads share one tmp file, and a
+        # later snapshot must never be replaced by an earlier one
+        self._flush_lock = threading.Lock()
+        # Start time of each pid this registry has written as (forked workers
+        # inherit the registry)
+        self._starts = {}
+
+    def _current_pid(self) -> int:
+        return self.pid if self.pid is not None else os.getpid()
+
+    def _current_start(self) -> str:
+        pid = self._current_pid()
+        if pid not in self._starts:
+            # Without /proc, the first write stands in for the start time
+            self._starts[pid] = _process_start(pid) or f"t{time.time_ns()}"
+        return self._starts[pid]
+
+    def snapshot_path(self) -> str:
+        """This process's snapshot file."""
+        return os.path.join(self.directory, f"metrics_{self._current_pid()}_{self._current_start()}.json")
+
+    def _alive(self, snap: Dict) -> bool:
+        """Whether the process that wrote a snapshot is still running."""
+        pid, start = snap.get('pid', -1), snap.get('start')
+        if pid == self._current_pid():
+            return start == self._current_start()
+        if not _pid_alive(pid):
+            return False
+        running_start = _process_start(pid)
+        return running_start is None or running_start == start
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increase a counter."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        self.maybe_flush()
+
+    def add_gauge(self, name: str, value: float, **labels):
+        """Add (or subtract) from a gauge, e.g. +1 on request start, -1 on finish."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + value
+        self.maybe_flush()
+
+    def set_gauge(self, name: str, value: float, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._gauges[key] = value
+        self.maybe_flush()
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...], **labels):
+        """Record one observation in a histogram with the given upper bounds."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = {'buckets': list(buckets), 'counts': [0] * (len(buckets) + 1), 'sum': 0.0}
+                self._histograms[key] = hist
+            hist['counts'][bisect_left(hist['buckets'], value)] += 1
+            hist['sum'] += value
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush < self.flush_interval:
+            return
+        # Another thread already writing covers this interval
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self._write_snapshot()
+        finally:
+            self._flush_lock.release()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'pid': self._current_pid(),
+                'start': self._current_start(),
+                'counters': [[n, list(l), v] for (n, l), v in self._counters.items()],
+                'gauges': [[n, list(l), v] for (n, l), v in self._gauges.items()],
+                'histograms': [[n, list(l), h['buckets'], list(h['counts']), h['sum']]
+                               for (n, l), h in self._histograms.items()],
+            }
+
+    def flush(self):
+        """Write this process's snapshot to the shared directory."""
+        with self._flush_lock:
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        """Snapshot and write; callers hold _flush_lock."""
+        self._last_flush = time.monotonic()
+        with self._lock:
+            self._gauges[('process_resident_memory_bytes', (('pid', str(self._current_pid())),))] = _rss_bytes()
+        data = self.snapshot()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self.snapshot_path()
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # Metrics must never break a request.
+            print(f"Could not write metrics snapshot: {e}")
+
+    def _read_snapshots(self) -> Dict[str, Dict]:
+        """Snapshots in the directory (the archive included) by file name."""
+        snapshots = {}
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return snapshots
+        for filename in names:
+            if not (filename.startswith('metrics_') and filename.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    snapshots[filename] = json.load(f)
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def _archive_dead(self):
+        """
+        Fold the counters and histograms of exited workers into the archive
+        file and delete their snapshots, so the directory does not grow with
+        every worker restart. Gauges of exited workers are dropped.
+        """
+        with self._flush_lock, _directory_lock(self.directory):
+            snapshots = self._read_snapshots()
+            dead = [name for name, snap in snapshots.items()
+                    if name != ARCHIVE_FILE and not self._alive(snap)]
+            if not dead:
+                return
+            counters, histograms = _merge_totals(
+                [snapshots.get(ARCHIVE_FILE, {})] + [snapshots[name] for name in dead])
+            archive = {
+                'counters': [[n, list(l), v] for (n, l), v in counters.items()],
+                'histograms': [[n, list(l), h['buckets'], h['counts'], h['sum']]
+                               for (n, l), h in histograms.items()],
+            }
+            try:
+                path = os.path.join(self.directory, ARCHIVE_FILE)
+                with open(f"{path}.tmp", 'w') as f:
+                    json.dump(archive, f)
+                os.replace(f"{path}.tmp", path)
+                for name in dead:
+                    os.remove(os.path.join(self.directory, name))
+            except OSError as e:
+                print(f"Could not archive metrics snapshots: {e}")
+
+    def collect(self) -> Dict[str, Dict]:
+        """
+        Merge the snapshots of every process.
+
+        Counters and histograms are summed over the live workers' snapshots
+        and the archive of exited ones, so totals stay monotonic. Gauges only
+        count live processes.
+        """
+        self.flush()
+        self._archive_dead()
+        snapshots = self._read_snapshots()
+        counters, histograms = _merge_totals(list(snapshots.values()))
+        gauges = {}
+        for name, snap in snapshots.items():
+            if name == ARCHIVE_FILE or not self._alive(snap):
+                continue
+            for metric, labels, value in snap.get('gauges', []):
+                key = (metric, tuple(tuple(l) for l in labels))
+                gauges[key] = gauges.get(key, 0) + value
+        return {'counters': counters, 'gauges': gauges, 'histograms': histograms}
+
+    def render(self) -> str:
+        """Render the merged metrics in the Prometheus text exposition format."""
+        merged = self.collect()
+        lines = []
+        by_name = {}
+        for kind in ('counters', 'gauges', 'histograms'):
+            for (name, labels), value in merged[kind].items():
+                by_name.setdefault(name, []).append((labels, value))
+
+        for name in sorted(by_name):
+            metric_type, help_text = METRIC_HELP.get(name, ('untyped', ''))
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for labels, value in sorted(by_name[name], key=lambda item: item[0]):
+                if metric_type == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip(value['buckets'] + [float('inf')], value['counts']):
+                        cumulative += count
+                        le = (('le', _format_value(bound)),)
+                        lines.append(f'{name}_bucket{_format_labels(labels, le)} {cumulative}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value["sum"])}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+                else:
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+
+        lines.extend(self._derived_lines(merged['counters']))
+        return '\n'.join(lines) + '\n'
+
+    def _derived_lines(self, counters) -> List[str]:
+        lines = []
+        generated = sum(v for (n, _), v in counters.items() if n == 'bridge_deals_generated_total')
+        accepted = sum(v for (n, _), v in counters.items() if n == 'bridge_deals_accepted_total')
+        if generated:
+            lines.append(f"# HELP bridge_deal_acceptance_ratio {DERIVED_HELP['bridge_deal_acceptance_ratio']}")
+            lines.append('# TYPE bridge_deal_acceptance_ratio gauge')
+            lines.append(f'bridge_deal_acceptance_ratio {_format_value(accepted / generated)}')
+
+        caches = {}
+        for (name, labels), value in counters.items():
+            if name != 'bridge_cache_requests_total':
+                continue
+            label_dict = dict(labels)
+            hits, total = caches.get(label_dict.get('cache', ''), (0, 0))
+            if label_dict.get('result') == 'hit':
+                hits += value
+            caches[label_dict.get('cache', '')] = (hits, total + value)
+        if caches:
+            lines.append(f"# HELP bridge_cache_hit_ratio {DERIVED_HELP['bridge_cache_hit_ratio']}")
+            lines.append('# TYPE bridge_cache_hit_ratio gauge')
+            for cache, (hits, total) in sorted(caches.items()):
+                lines.append(f'bridge_cache_hit_ratio{{cache="{cache}"}} {_format_value(hits / total)}')
+        return lines
+
+
+registry = MetricsRegistry()
+
+
+def record_deals(generated: int, accepted: int):
+    """Record a batch of dealer output; called by the generator every few hundred deals."""
+    if generated:
+        registry.inc('bridge_deals_generated_total', generated)
+    if accepted:
+        registry.inc('bridge_deals_accepted_total', accepted)
+
+
+def record_dds_solve(kind: str, seconds: float):
+    registry.inc('bridge_dds_solves_total', kind=kind)
+    registry.observe('bridge_dds_solve_seconds', seconds, DDS_BUCKETS, kind=kind)
+
+
+def record_cache(cache: str, hit: bool):
+    registry.inc('bridge_cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+
+def record_eviction(cache: str):
+    registry.inc('bridge_cache_evictions_total', cache=cache)
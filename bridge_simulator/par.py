@@ -0,0 +1,157 @@
+"""
+Double dummy par from trick tables.
+
+A trick table holds declarer's tricks for each of the 5 strains and 4
+declarers (DoubleDummySolver.get_trick_table). Par is found by backward
+induction over the 35 bids: a side facing the opponents' bid either lets it
+stand (doubled if it fails) or outbids it, whichever is better for that side.
+Both sides play this optimally. The side of the dealer acts first, so it takes
+a contract both sides could make at the same value.
+
+Only the tables are needed, and every step works on arrays of deals, so par
+for every dealer and vulnerability of a whole simulation takes a few hundred
+NumPy operations and no solves. make_table() likewise turns the same tables
+into the probability of making every contract.
+"""
+from typing import Any, Dict, List, Sequence
+import numpy as np
+from . import scoring
+
+SEATS = 'NESW'
+
+# Bids in auction order: 1C, 1D, 1H, 1S, 1N, 2C, ..., 7N
+BIDS = [(level, strain) for level in range(1, 8) for strain in range(len(scoring.STRAINS))]
+
+
+def trick_array(tables: Sequence[Dict]) -> np.ndarray:
+    """Array of shape (deals, strains, seats) from trick tables keyed by (strain, seat)."""
+    return np.array([[[table[(strain, seat)] for seat in SEATS] for strain in scoring.STRAINS]
+                     for table in tables], dtype=np.intp).reshape(len(tables), len(scoring.STRAINS), len(SEATS))
+
+
+def _choose(side: int, first, second, prefer_second=False):
+    """
+    The better of two (value, bid, side) outcomes for `side`, per deal. Values
+    are from NS's point of view; ties keep `first` except where prefer_second.
+    """
+    better = second[0] > first[0] if side == 0 else second[0] < first[0]
+    better = better | ((second[0] == first[0]) & prefer_second)
+    return tuple(np.where(better, b, a) for a, b in zip(first, second))
+
+
+def _induct(side_tricks: np.ndarray, first_side: int, vulnerable: Sequence[bool]):
+    """
+    Par outcome (NS value, bid index or -1, side) per deal.
+
+    Args:
+        side_tricks: (deals, strains, 2) best tricks of each side in each strain.
+        first_side: 0 when NS acts first (NS dealer), else 1.
+        vulnerable: Vulnerability of (NS, EW).
+    """
+    deals = side_tricks.shape[0]
+    best_after = [None, None]
+    for bid in reversed(range(len(BIDS))):
+        level, strain = BIDS[bid]
+        outcomes = []
+        for side in (0, 1):
+            tricks = side_tricks[:, strain, side]
+            doubled = (tricks < level + 6).astype(np.intp)
+            value = scoring.SCORE_TABLE[level, strain, doubled, int(vulnerable[side]), tricks]
+            stand = (value if side == 0 else -value, np.full(deals, bid), np.full(deals, side))
+            # The opponents let the bid stand or outbid it. A failing bid they
+            # could outbid at no loss is only a cheap phantom of a later
+            # sacrifice, so they outbid and the real sacrifice is found.
+            other = 1 - side
+            outcomes.append(stand if best_after[other] is None else
+                            _choose(other, stand, best_after[other], prefer_second=doubled.astype(bool)))
+        for side in (0, 1):
+            # A lower bid is preferred at equal value
+            best_after[side] = outcomes[side] if best_after[side] is None else _choose(side, outcomes[side], best_after[side])
+
+    passed_out = (np.zeros(deals, dtype=np.intp), np.full(deals, -1), np.full(deals, -1))
+    second = 1 - first_side
+    after_pass = _choose(second, passed_out, best_after[second])
+    return _choose(first_side, after_pass, best_after[first_side])
+
+
+def _declarer(tricks: np.ndarray, strain: int, side: int, dealer: str) -> str:
+    """The side's seat with more tricks in the strain; the first to speak after the dealer on a tie."""
+    seats = [seat for seat in (SEATS[side], SEATS[side + 2])]
+    seats.sort(key=lambda seat: (-tricks[strain, SEATS.index(seat)], (SEATS.index(seat) - SEATS.index(dealer)) % 4))
+    return seats[0]
+
+
+def par(tables, dealer: str = 'N', vulnerability: str = 'none') -> Dict[str, List]:
+    """
+    Par of many deals for one dealer and vulnerability.
+
+    Args:
+        tables: Trick tables (dicts keyed by (strain, seat)) or a trick_array().
+        dealer: 'N', 'E', 'S' or 'W'.
+        vulnerability: 'none', 'NS', 'EW' or 'both'.
+
+    Returns:
+        'score': par score per deal from NS's point of view, and 'contract':
+        the par contract per deal, e.g. '4SN', '5HXE' or 'PASS'.
+    """
+    return par_all(tables, dealers=dealer, vulnerabilities=(vulnerability,))[dealer][vulnerability]
+
+
+def par_all(tables, dealers: str = SEATS,
+            vulnerabilities: Sequence[str] = scoring.VULNERABILITIES) -> Dict[str, Dict[str, Dict[str, List]]]:
+    """
+    Par of many deals for every dealer and vulnerability, as
+    result[dealer][vulnerability] = {'score': [...], 'contract': [...]}.
+    """
+    tricks = tables if isinstance(tables, np.ndarray) else trick_array(tables)
+    if dealers and any(dealer not in SEATS for dealer in dealers):
+        raise ValueError("Invalid dealer. Must be one of 'N', 'E', 'S', 'W'.")
+    side_tricks = np.stack([tricks[:, :, [0, 2]].max(axis=2), tricks[:, :, [1, 3]].max(axis=2)], axis=2)
+
+    result = {dealer: {} for dealer in dealers}
+    for vulnerability in vulnerabilities:
+        vulnerable = (scoring.side_vulnerable(vulnerability, 'N'), scoring.side_vulnerable(vulnerability, 'E'))
+        for first_side in sorted({SEATS.index(dealer) % 2 for dealer in dealers}):
+            value, bid, side = _induct(side_tricks, first_side, vulnerable)
+            for dealer in dealers:
+                if SEATS.index(dealer) % 2 != first_side:
+                    continue
+                contracts = []
+                for i in range(len(value)):
+                    if bid[i] < 0:
+                        contracts.append('PASS')
+                        continue
+                    level, strain = BIDS[bid[i]]
+                    declarer = _declarer(tricks[i], strain, int(side[i]), dealer)
+                    made = side_tricks[i, strain, side[i]] >= level + 6
+                    contracts.append(f"{level}{scoring.STRAINS[strain]}{'' if made else 'X'}{declarer}")
+                result[dealer][vulnerability] = {'score': value.tolist(), 'contract': contracts}
+    return result
+
+
+def make_table(tables) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Trick histograms and make probabilities of many deals, as
+    result[declarer][strain] = {'histogram': {tricks: deals}, 'mean': ...,
+    'make': {level: probability}}, where a level makes with level + 6 tricks.
+    """
+    tricks = tables if isinstance(tables, np.ndarray) else trick_array(tables)
+    deals = tricks.shape[0]
+    if not deals:
+        return {}
+    # counts[strain, seat, t]: deals where declarer takes exactly t tricks
+    counts = np.stack([(tricks == t).sum(axis=0) for t in range(14)], axis=2)
+    # at_least[strain, seat, t]: deals with t or more tricks
+    at_least = counts[:, :, ::-1].cumsum(axis=2)[:, :, ::-1]
+    means = tricks.mean(axis=0)
+    return {
+        seat: {
+            strain: {
+                'histogram': {str(t): int(counts[s, i, t]) for t in range(14) if counts[s, i, t]},
+                'mean': float(means[s, i]),
+                'make': {str(level): float(at_least[s, i, level + 6]) / deals for level in range(1, 8)},
+            }
+            for s, strain in enumerate(scoring.STRAINS)
+        }
+        for i, seat in enumerate(SEATS)
+    }
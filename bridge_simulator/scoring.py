@@ -0,0 +1,167 @@
+"""
+Vectorized duplicate scoring.
+
+Every score is precomputed in SCORE_TABLE, indexed by
+(level, strain, doubled, vulnerable, tricks): level 0 is a passed-out board,
+strains are ordered C, D, H, S, N, doubled is 0 (undoubled), 1 (doubled) or
+2 (redoubled). NumPy fancy indexing then scores whole arrays of results at
+once. imps() converts score differences to IMPs and matchpoints() scores a
+field of results against each other.
+"""
+import re
+from typing import Dict, List, Tuple
+import numpy as np
+
+STRAINS = 'CDHSN'
+STRAIN_INDEX = {strain: i for i, strain in enumerate(STRAINS)}
+
+# Lower bound of each IMP band above zero (a difference of 20-40 is 1 IMP, ...)
+IMP_THRESHOLDS = np.array([20, 50, 90, 130, 170, 220, 270, 320, 370, 430, 500, 600, 750,
+                           900, 1100, 1300, 1500, 1750, 2000, 2250, 2500, 3000, 3500, 4000])
+
+_CONTRACT_RE = re.compile(r'^([1-7])(NT|[CDHSN])(X{0,2})$')
+
+# Vulnerability states of a board, by vulnerable side
+VULNERABILITIES = ('none', 'NS', 'EW', 'both')
+
+
+def contract_score(level: int, strain: int, doubled: int, vulnerable: bool, tricks: int) -> int:
+    """Duplicate score of one result, from the declaring side's point of view."""
+    if level == 0:
+        return 0
+    needed = level + 6
+    if tricks < needed:
+        down = needed - tricks
+        if doubled == 0:
+            return -down * (100 if vulnerable else 50)
+        if vulnerable:
+            penalty = 200 + 300 * (down - 1)
+        else:
+            penalty = 100 + 200 * min(down - 1, 2) + 300 * max(down - 3, 0)
+        return -penalty * doubled
+
+    multiplier = (1, 2, 4)[doubled]
+    if strain == STRAIN_INDEX['N']:
+        trick_points = (40 + 30 * (level - 1)) * multiplier
+    else:
+        trick_points = (20 if strain < 2 else 30) * level * multiplier
+    score = trick_points
+    if trick_points >= 100:
+        score += 500 if vulnerable else 300
+    else:
+        score += 50
+    if level == 6:
+        score += 750 if vulnerable else 500
+    elif level == 7:
+        score += 1500 if vulnerable else 1000
+    score += (0, 50, 100)[doubled]
+
+    overtricks = tricks - needed
+    if doubled == 0:
+        score += overtricks * (20 if strain < 2 else 30)
+    else:
+        score += overtricks * (200 if vulnerable else 100) * doubled
+    return score
+
+
+def _build_table() -> np.ndarray:
+    table = np.zeros((8, 5, 3, 2, 14), dtype=np.int32)
+    for level in range(1, 8):
+        for strain in range(5):
+            for doubled in range(3):
+                for vulnerable in range(2):
+                    for tricks in range(14):
+                        table[level, strain, doubled, vulnerable, tricks] = contract_score(
+                            level, strain, doubled, bool(vulnerable), tricks)
+    return table
+
+
+SCORE_TABLE = _build_table()
+
+
+def parse_contract(contract: str) -> Tuple[int, int, int]:
+    """
+    (level, strain index, doubled) of a contract string such as '4S', '3NT',
+    '3N', '4HX' or 'PASS' (level 0).
+    """
+    text = contract.strip().upper()
+    if text in ('PASS', 'P', ''):
+        return 0, 0, 0
+    match = _CONTRACT_RE.match(text)
+    if not match:
+        raise ValueError(f"Invalid contract: {contract}")
+    level, strain, doubles = match.groups()
+    return int(level), STRAIN_INDEX[strain[0]], len(doubles)
+
+
+def side_vulnerable(vulnerability, declarer: str) -> bool:
+    """
+    Whether the declaring side is vulnerable. `vulnerability` is either that
+    answer already (a bool) or a board state from VULNERABILITIES.
+    """
+    if isinstance(vulnerability, bool):
+        return vulnerability
+    if vulnerability not in VULNERABILITIES:
+        raise ValueError(f"Invalid vulnerability: {vulnerability}. Must be a bool or one of {', '.join(VULNERABILITIES)}")
+    return vulnerability == 'both' or declarer.upper() in vulnerability
+
+
+def score(level, strain, doubled, vulnerable, tricks) -> np.ndarray:
+    """Scores of arrays (or scalars) of results, looked up in SCORE_TABLE."""
+    return SCORE_TABLE[np.asarray(level), np.asarray(strain), np.asarray(doubled),
+                       np.asarray(vulnerable, dtype=np.intp), np.asarray(tricks)]
+
+
+def score_contract(contract: str, vulnerable: bool, tricks: int) -> int:
+    level, strain, doubled = parse_contract(contract)
+    return int(SCORE_TABLE[level, strain, doubled, int(vulnerable), tricks])
+
+
+def imps(differences) -> np.ndarray:
+    """IMPs for an array of score differences (sign preserved)."""
+    diff = np.asarray(differences)
+    return np.sign(diff) * np.searchsorted(IMP_THRESHOLDS, np.abs(diff), side='right')
+
+
+def matchpoints(field) -> np.ndarray:
+    """
+    Matchpoint percentages of a field of results.
+
+    Args:
+        field: Array of shape (..., tables): the scores obtained at each table
+               on the same board (one row per board).
+
+    Returns:
+        Array of the same shape: 1 for every score beaten and 1/2 for every tie,
+        divided by the (tables - 1) other results.
+    """
+    scores = np.asarray(field, dtype=float)
+    tables = scores.shape[-1]
+    if tables < 2:
+        return np.full(scores.shape, 0.5)
+    beaten = (scores[..., :, None] > scores[..., None, :]).sum(axis=-1)
+    tied = (scores[..., :, None] == scores[..., None, :]).sum(axis=-1) - 1
+    return (beaten + 0.5 * tied) / (tables - 1)
+
+
+def derived_results(results: Dict[str, List]) -> Dict[str, List[float]]:
+    """
+    IMP and matchpoint series derived from a strategy comparison's per-deal results.
+
+    Every 'diff_<a>_minus_<b>' series gives 'imps_<a>_minus_<b>'. When there are
+    at least two '<name>_score' series of equal length, the strategies form the
+    field on each deal and each gets an 'mp_<name>' series of matchpoint percentages.
+    """
+    derived = {}
+    for key, values in results.items():
+        if key.startswith('diff_') and values:
+            derived['imps_' + key[len('diff_'):]] = imps(values).tolist()
+
+    score_keys = [key for key, values in results.items() if key.endswith('_score') and values]
+    lengths = {len(results[key]) for key in score_keys}
+    if len(score_keys) >= 2 and len(lengths) == 1:
+        field = np.column_stack([results[key] for key in score_keys])
+        percentages = matchpoints(field)
+        for i, key in enumerate(score_keys):
+            derived['mp_' + key[:-len('_score')]] = percentages[:, i].tolist()
+    return derived
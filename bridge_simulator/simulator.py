@@ -1,37 +1,428 @@
 from typing import Callable, Any, Dict, List
-import statistics
-from .hand_generator import BridgeHandGenerator
+import copy
+import json
+import math
+import multiprocessing
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from . import aggregation, checkpoint, exhaustive, frequency, leads, metrics, par, scoring
+from .bitboard import SEATS, bitboard_for
+from .hand_generator import BridgeHandGenerator, IMPORTANCE_TEMPER
 from .double_dummy import DoubleDummySolver
 
+# Largest number of layouts mode='exhaustive' will walk
+EXHAUSTIVE_MAX_LAYOUTS = 200000
+
+# Chunks per worker process, so uneven chunks still balance out
+CHUNKS_PER_WORKER = 4
+
+# Stratified mode: every stratum gets at least this many deals, feature
+# frequencies are estimated from PILOT_DEALS deals when they cannot be computed
+# exactly, and filtered strata ask the generator for STRATUM_OVERDRAW times the
+# deals they expect to need.
+MIN_PER_STRATUM = 2
+PILOT_DEALS = 2000
+STRATUM_OVERDRAW = 3
+
+# Pre-sample that estimates control variate expectations which cannot be
+# computed exactly: CV_PILOT_FACTOR deals per deal of the run, so a small run
+# is not dwarfed by its pilot, within [CV_MIN_PILOT_DEALS, CV_PILOT_DEALS]
+CV_PILOT_DEALS = 5000
+CV_MIN_PILOT_DEALS = 500
+CV_PILOT_FACTOR = 2
+
+# Pilot means of recent generator_params, keyed by (params, feature) and kept
+# with their pilot size, so repeated requests deal no pilot at all
+CV_PILOT_CACHE_SIZE = 64
+_cv_pilot_cache = OrderedDict()
+_cv_pilot_lock = threading.Lock()
+
+# Result key carrying each deal's trick table when par statistics are requested
+TRICK_TABLE_KEY = '_trick_table'
+
+# (runner, callback, generator_params) of the enumeration in progress. Set
+# before forking so worker processes inherit it; callbacks are often closures
+# and could not be pickled.
+_chunk_task = None
+
 class SimulationRunner:
-    def __init__(self):
+    def __init__(self, corpus=None):
+        """
+        Args:
+            corpus: Optional corpus.Corpus of pre-solved deals. Monte Carlo runs it
+                    can answer are served from it, with no dealing or solving.
+        """
         self.generator = BridgeHandGenerator()
+        self.corpus = corpus
 
     def run(self, 
             simulation_callback: Callable[[Any, DoubleDummySolver], Dict[str, Any]], 
             num_simulations: int = 100,
-            generator_params: Dict[str, Any] = None) -> Dict[str, Any]:
+            generator_params: Dict[str, Any] = None,
+            mode: str = 'auto',
+            workers: int = 1,
+            stratify_by: str = 'hcp',
+            stratify_seat: str = None,
+            control_variates: List[str] = None,
+            with_par: bool = False,
+            with_tricks: bool = False,
+            temper: float = IMPORTANCE_TEMPER) -> Dict[str, Any]:
         """
-        Run a Monte Carlo simulation.
+        Run a simulation, by Monte Carlo sampling or by exhaustive enumeration.
 
         Args:
             simulation_callback: A function that takes (deal, solver) and returns a dict of results.
                                  Example: lambda deal, solver: {'score_1nt': solver.solve(deal, '1NT', 'N')}
             num_simulations: Number of deals to simulate.
             generator_params: Dictionary of arguments to pass to BridgeHandGenerator (e.g., constraints).
+            mode: 'sample' deals num_simulations random deals; 'exhaustive' walks every
+                  layout left open by the predeal once, giving exact statistics; 'auto'
+                  (default) enumerates when there are no more layouts than num_simulations.
+                  'stratified' splits the deals over strata of one seat's feature and
+                  weights each stratum by its probability. 'weighted' draws deals by
+                  importance sampling (see BridgeHandGenerator.yield_weighted_deals),
+                  for rare constraints, and reports weighted statistics.
+            workers: Processes used to walk the layouts in exhaustive mode. Chunks run in
+                     forked processes, so only use more than 1 where forking is safe.
+            stratify_by: Stratum feature in stratified mode: 'hcp' or 'pattern' (shape class).
+            stratify_seat: Seat whose feature defines the strata; defaults to the
+                           SmartStack seat, or the only constrained seat.
+            control_variates: Cheap deal features used as control variates in Monte Carlo
+                              runs, e.g. ['hcp:NS', 'fit:NS'] (combined HCP, longest
+                              combined suit). Numeric stats then also report cv_mean,
+                              cv_stderr and cv_variance_reduction.
+            with_par: Also solve every deal's full trick table (reusing the callback's
+                      solves) and report par statistics for every dealer and
+                      vulnerability under 'par' (sample and exhaustive modes).
+            with_tricks: Likewise solve every deal's trick table and report, under
+                         'tricks', each declarer's trick histogram, mean tricks and
+                         probability of making every level in every strain.
+            temper: Bin tempering in weighted mode (see yield_weighted_deals). The
+                    default 1 deals bins at their natural rates; lower values
+                    over-sample rare bins and lower the effective sample size.
 
         Returns:
-            Dict containing aggregated statistics (mean, stdev) for numeric results, 
-            and raw counts for non-numeric results.
+            Dict containing aggregated statistics (mean, stdev, stderr) for numeric results,
+            and raw counts for non-numeric results. 'method' is 'monte_carlo', 'corpus' (a
+            Monte Carlo run served from the corpus), 'exhaustive', 'stratified' or
+            'importance'; exhaustive runs also report the number of 'layouts' walked,
+            stratified runs the weight and deal count of each stratum and weighted runs
+            their 'temper' and 'effective_sample_size'.
         """
         if generator_params is None:
             generator_params = {}
 
+        if with_par or with_tricks:
+            if mode in ('stratified', 'weighted'):
+                raise ValueError("Par and trick statistics are only available in sample and exhaustive modes")
+            simulation_callback = _with_trick_table(simulation_callback)
+
+        if mode == 'stratified':
+            return self._run_stratified(simulation_callback, num_simulations, generator_params,
+                                        stratify_by, stratify_seat)
+        if mode == 'weighted':
+            return self._run_weighted(simulation_callback, num_simulations, generator_params, temper)
+
+        layouts = self._enumerable_layouts(generator_params) if mode != 'sample' else None
+        if mode == 'exhaustive':
+            if layouts is None or layouts > EXHAUSTIVE_MAX_LAYOUTS:
+                raise ValueError(f"Too many layouts to enumerate (limit {EXHAUSTIVE_MAX_LAYOUTS})")
+        elif mode == 'auto':
+            # Walking every layout is no more work than sampling num_simulations deals
+            if layouts is None or layouts > num_simulations:
+                mode = 'sample'
+        elif mode != 'sample':
+            raise ValueError(f"Unknown mode: {mode}. Must be one of auto, sample, exhaustive, stratified, weighted")
+
+        if mode == 'sample':
+            features = [_control_feature(name) for name in control_variates or []]
+            corpus_deals = self.corpus.matches(generator_params, num_simulations) if self.corpus else None
+            if corpus_deals is not None:
+                deal_iterator = iter(corpus_deals)
+            else:
+                # Use yield_deals for efficient generation
+                deal_iterator = self.generator.yield_deals(num_hands=num_simulations, **generator_params)
+            feature_rows = []
+            results_accumulator, count = self._collect(deal_iterator, simulation_callback, feature_rows, features)
+            tables = results_accumulator.pop(TRICK_TABLE_KEY, None)
+            aggregated_stats = self._aggregate(results_accumulator, count, exact=False)
+            aggregated_stats['method'] = 'monte_carlo' if corpus_deals is None else 'corpus'
+            if with_par:
+                aggregated_stats['par'] = _par_stats(tables or [], exact=False)
+            if with_tricks:
+                aggregated_stats['tricks'] = par.make_table(tables or [])
+            if features:
+                self._apply_control_variates(aggregated_stats, results_accumulator, feature_rows,
+                                             generator_params, control_variates, num_simulations)
+            return aggregated_stats
+
+        results_accumulator, count = self._enumerate(simulation_callback, generator_params, layouts, workers)
+        tables = results_accumulator.pop(TRICK_TABLE_KEY, None)
+        aggregated_stats = self._aggregate(results_accumulator, count, exact=True)
+        aggregated_stats['method'] = 'exhaustive'
+        aggregated_stats['layouts'] = layouts
+        if with_par:
+            aggregated_stats['par'] = _par_stats(tables or [], exact=True)
+        if with_tricks:
+            aggregated_stats['tricks'] = par.make_table(tables or [])
+        return aggregated_stats
+
+    def run_sweep(self,
+                  make_callback: Callable[[Any], Callable[[Any, DoubleDummySolver], Dict[str, Any]]],
+                  num_simulations: int = 100,
+                  generator_params: Dict[str, Any] = None,
+                  mode: str = 'auto',
+                  workers: int = 1,
+                  vulnerabilities=scoring.VULNERABILITIES) -> Dict[str, Any]:
+        """
+        Run a simulation under every board vulnerability at once.
+
+        make_callback(vulnerability) returns the simulation callback for one
+        vulnerability ('none', 'NS', 'EW' or 'both'). All of them see the same
+        deals and the same solver, and trick counts do not depend on
+        vulnerability, so the sweep needs no more double dummy solves than a
+        single run.
+
+        Args:
+            mode: 'auto', 'sample' or 'exhaustive', as in run().
+
+        Returns:
+            The report of run() with 'vulnerabilities' mapping each vulnerability to
+            its stats. 'stats' holds the first vulnerability's stats.
+        """
+        if generator_params is None:
+            generator_params = {}
+        callbacks = {vulnerability: make_callback(vulnerability) for vulnerability in vulnerabilities}
+
+        def sweep_callback(deal, solver):
+            return {vulnerability: callback(deal, solver) for vulnerability, callback in callbacks.items()}
+
+        layouts = self._enumerable_layouts(generator_params) if mode != 'sample' else None
+        if mode == 'exhaustive':
+            if layouts is None or layouts > EXHAUSTIVE_MAX_LAYOUTS:
+                raise ValueError(f"Too many layouts to enumerate (limit {EXHAUSTIVE_MAX_LAYOUTS})")
+        elif mode == 'auto':
+            if layouts is None or layouts > num_simulations:
+                mode = 'sample'
+        elif mode != 'sample':
+            raise ValueError(f"Unknown sweep mode: {mode}. Must be one of auto, sample, exhaustive")
+
+        if mode == 'sample':
+            deal_iterator = self.generator.yield_deals(num_hands=num_simulations, **generator_params)
+            swept, count = self._collect(deal_iterator, sweep_callback)
+        else:
+            swept, count = self._enumerate(sweep_callback, generator_params, layouts, workers)
+
+        by_vulnerability = {}
+        for vulnerability in vulnerabilities:
+            results_accumulator = {}
+            for result in swept.get(vulnerability, []):
+                for key, value in result.items():
+                    results_accumulator.setdefault(key, []).append(value)
+            results_accumulator.update(scoring.derived_results(results_accumulator))
+            by_vulnerability[vulnerability] = self._aggregate(results_accumulator, count, exact=mode != 'sample')['stats']
+
+        aggregated_stats = {
+            'simulations_run': count,
+            'stats': by_vulnerability[vulnerabilities[0]],
+            'method': 'monte_carlo' if mode == 'sample' else 'exhaustive',
+            'vulnerabilities': by_vulnerability,
+        }
+        if mode != 'sample':
+            aggregated_stats['layouts'] = layouts
+        return aggregated_stats
+
+    def run_checkpointed(self,
+                         simulation_callback: Callable[[Any, DoubleDummySolver], Dict[str, Any]],
+                         path: str,
+                         num_simulations: int = 100,
+                         generator_params: Dict[str, Any] = None,
+                         spec: Dict[str, Any] = None,
+                         checkpoint_every: int = checkpoint.CHECKPOINT_EVERY,
+                         seed: int = None) -> Dict[str, Any]:
+        """
+        Monte Carlo run that saves its progress to a checkpoint file.
+
+        The run deals from its own random.Random (generator.yield_seeded_deals),
+        so concurrent requests drawing from the module-level generator cannot
+        shift its deals. Every checkpoint_every deals the summaries so far, the
+        deal count and that generator's position are written to path. Calling again with the
+        same path resumes from the last checkpoint; calling with a larger
+        num_simulations after the run finished extends it with more deals.
+
+        Args:
+            path: Checkpoint file (see checkpoint.job_path).
+            spec: JSON description of the callback (e.g. the strategies). A
+                  checkpoint is only resumed with equal generator_params and spec.
+            seed: Seed of a new run's generator; a resumed run continues from
+                  the saved position instead.
+
+        Returns:
+            The report of run() in sample mode, plus 'resumed_from' (deals taken
+            from the checkpoint) and 'checkpoint' (the path).
+        """
+        params = json.loads(json.dumps(generator_params or {}, sort_keys=True))
+        spec = json.loads(json.dumps(spec or {}, sort_keys=True))
+        state = checkpoint.load(path)
+        if state is None:
+            stats, count = aggregation.ResultStats(), 0
+            rng = random.Random(seed)
+        else:
+            if state['generator_params'] != params or state['spec'] != spec:
+                raise ValueError("The checkpoint belongs to a run with different parameters")
+            stats, count = aggregation.ResultStats.from_state(state['stats']), state['deals']
+            rng = checkpoint.restore_rng(state['rng'])
+        resumed_from = count
+
+        while count < num_simulations:
+            deal_iterator = self.generator.yield_seeded_deals(
+                rng, num_hands=min(checkpoint_every, num_simulations - count), **(generator_params or {}))
+            results_accumulator, chunk_count = self._collect(deal_iterator, simulation_callback)
+            if chunk_count == 0:
+                break
+            stats.add(results_accumulator)
+            count += chunk_count
+            checkpoint.save(path, {'generator_params': params, 'spec': spec, 'deals': count,
+                                   'stats': stats.to_state(), 'rng': checkpoint.rng_state(rng)})
+
+        return {
+            'simulations_run': count,
+            'stats': stats.summary(),
+            'method': 'monte_carlo',
+            'resumed_from': resumed_from,
+            'checkpoint': path,
+        }
+
+    def run_lead_study(self, contract: str, declarer: str, num_simulations: int = 100,
+                       generator_params: Dict[str, Any] = None, workers: int = 1) -> Dict[str, Any]:
+        """
+        Score every opening lead against a contract over many deals.
+
+        The leader (declarer's left-hand opponent) must be predealt a full hand;
+        the other hands follow the generator constraints. Each deal is solved
+        for all leads at once, and touching cards of the leader's hand are
+        reported as one lead (see leads.lead_groups).
+
+        Args:
+            contract: e.g. '4S' or '3NT'.
+            declarer: 'N', 'E', 'S' or 'W'.
+            workers: Processes solving batches of deals in parallel (forked, as
+                     in exhaustive mode).
+
+        Returns:
+            'leads' maps each representative card to its equivalent 'cards', the
+            tricks it concedes and the probability of setting the contract;
+            'ranking' orders the leads from best to worst; 'failed_deals'
+            counts deals that could not be solved and are left out.
+
+        Raises:
+            RuntimeError: If deals were dealt but none of them could be solved.
+        """
+        generator_params = dict(generator_params or {})
+        level, strain, _ = scoring.parse_contract(contract)
+        if level == 0:
+            raise ValueError("A lead study needs a contract")
+        declarer = declarer.upper()
+        if declarer not in SEATS:
+            raise ValueError("Invalid declarer. Must be one of 'N', 'E', 'S', 'W'.")
+        leader = SEATS[(SEATS.index(declarer) + 1) % 4]
+        hand = (generator_params.get('predeal') or {}).get(leader)
+        if not hand:
+            raise ValueError(f"The leader ({leader}) must be predealt")
+        groups = leads.lead_groups(hand)
+        strain = scoring.STRAINS[strain]
+
+        deals = list(self.generator.yield_deals(num_hands=num_simulations, **generator_params))
+        if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+            per_deal, errors = leads.solve_deals(deals, strain, leader, groups)
+        else:
+            predeals = [exhaustive.layout_predeal(bitboard_for(deal).masks) for deal in deals]
+            tasks = [(predeals[start:stop], strain, leader, groups)
+                     for start, stop in exhaustive.chunk_ranges(len(predeals), workers * CHUNKS_PER_WORKER)]
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                per_deal, errors = [], []
+                for solved, failed in pool.map(leads.solve_batch, tasks):
+                    per_deal.extend(solved)
+                    errors.extend(failed)
+        if deals and not per_deal:
+            # The same failure on every deal (a DDS error, say) must not pass for an empty study
+            raise RuntimeError(f"No deal of the lead study could be solved: {errors[0]}")
+
+        lead_stats, ranking = leads.summarize_leads(per_deal, groups, level + 6)
+        return {
+            'simulations_run': len(per_deal),
+            'failed_deals': len(errors),
+            'method': 'lead_study',
+            'contract': contract,
+            'declarer': declarer,
+            'leader': leader,
+            'leads': lead_stats,
+            'ranking': ranking,
+        }
+
+    def _enumerable_layouts(self, generator_params: Dict[str, Any]):
+        """Number of layouts left by the predeal, or None if the params cannot be enumerated."""
+        for config in (generator_params.get('smart_stack') or {}).values():
+            if config.get('shape') is not None and not isinstance(config.get('shape'), str):
+                return None
+        try:
+            return exhaustive.count_layouts(generator_params.get('predeal'))
+        except ValueError:
+            return None
+
+    def _enumerate(self, simulation_callback, generator_params, layouts: int, workers: int):
+        """
+        Walk every layout once, in chunks. With workers > 1 the chunks run in
+        forked processes, which inherit the callback instead of pickling it.
+        """
+        ranges = exhaustive.chunk_ranges(layouts, max(1, workers) * CHUNKS_PER_WORKER)
+        if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+            parts = [self._collect_chunk(simulation_callback, generator_params, bounds) for bounds in ranges]
+        else:
+            global _chunk_task
+            _chunk_task = (self, simulation_callback, generator_params)
+            try:
+                context = multiprocessing.get_context('fork')
+                with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                    parts = list(pool.map(_run_chunk, ranges))
+            finally:
+                _chunk_task = None
+
+        # Merge in layout order so the result does not depend on the worker count
+        results_accumulator = {}
+        count = 0
+        for part_results, part_count in parts:
+            for key, values in part_results.items():
+                results_accumulator.setdefault(key, []).extend(values)
+            count += part_count
+        return results_accumulator, count
+
+    def _collect_chunk(self, simulation_callback, generator_params, bounds):
+        start, stop = bounds
+        deals = self.generator.enumerate_deals(start, stop, **generator_params)
+        return self._collect(deals, simulation_callback)
+
+    def collect(self, deals, simulation_callback: Callable[[Any, DoubleDummySolver], Dict[str, Any]]):
+        """
+        Run the callback on the given deals, with a fresh solver for each. Deals
+        whose callback raises are logged and skipped.
+
+        Returns:
+            (values per result key, deals evaluated), with the IMP and matchpoint
+            series of strategy comparisons added.
+        """
+        return self._collect(iter(deals), simulation_callback)
+
+    def _collect(self, deal_iterator, simulation_callback, feature_rows: List = None, features=()):
+        """
+        Run the callback on every deal; returns (values per result key, deals evaluated).
+        Comparison results also get their IMP and matchpoint series (scoring.derived_results).
+        When feature_rows is given, features(deal) of every evaluated deal are appended to it.
+        """
         results_accumulator = {}
-        
-        # Use yield_deals for efficient generation
-        deal_iterator = self.generator.yield_deals(num_hands=num_simulations, **generator_params)
-        
         count = 0
         for deal in deal_iterator:
             solver = DoubleDummySolver(deal)
@@ -49,13 +440,22 @@ class SimulationRunner:
                     if key not in results_accumulator:
                         results_accumulator[key] = []
                     results_accumulator[key].append(value)
+                if feature_rows is not None:
+                    feature_rows.append([feature(deal) for feature in features])
                 
                 count += 1
             except Exception as e:
                 print(f"Error in simulation iteration {count}: {e}")
                 continue
+        # IMPs and matchpoints of strategy comparisons, from the scores already solved
+        results_accumulator.update(scoring.derived_results(results_accumulator))
+        return results_accumulator, count
 
-        # Aggregate results
+    def _aggregate(self, results_accumulator, count, exact: bool) -> Dict[str, Any]:
+        """
+        Summarize collected values. Exhaustive runs cover the whole population,
+        so their stdev is the population standard deviation.
+        """
         aggregated_stats = {
             'simulations_run': count,
             'stats': {}
@@ -64,24 +464,291 @@ class SimulationRunner:
         for key, values in results_accumulator.items():
             if not values:
                 continue
-                
-            # Check if values are numeric
-            if isinstance(values[0], (int, float)):
-                mean = statistics.mean(values)
-                stdev = statistics.stdev(values) if len(values) > 1 else 0.0
-                aggregated_stats['stats'][key] = {
-                    'mean': mean,
-                    'stdev': stdev,
-                    'min': min(values),
-                    'max': max(values)
-                }
+            aggregated_stats['stats'][key] = aggregation.summarize(values, exact=exact)
+
+        return aggregated_stats
+
+    def _control_expectations(self, generator_params, names: List[str], num_simulations: int = CV_PILOT_DEALS):
+        """
+        Expectation of each control feature under the constraints. HCP sums are
+        exact (frequency.expected_hcp); the rest, or all of them when the
+        constraints span several seats, come from a pre-sample of cheap deals
+        (no double dummy work), sized to the run and cached per generator_params.
+        """
+        expectations, sources = {}, {}
+        for name in names:
+            kind, _, seats = name.partition(':')
+            if kind != 'hcp':
+                continue
+            try:
+                expectations[name] = sum(frequency.expected_hcp(seat, **generator_params) for seat in seats)
+                sources[name] = 'exact'
+            except ValueError:
+                pass
+
+        pilot_size = min(CV_PILOT_DEALS, max(CV_MIN_PILOT_DEALS, CV_PILOT_FACTOR * num_simulations))
+        params_key = json.dumps(generator_params, sort_keys=True, default=str)
+        needs_pilot = [name for name in names if name not in expectations]
+        with _cv_pilot_lock:
+            for name in names:
+                cached = _cv_pilot_cache.get((params_key, name))
+                if name in expectations or cached is None or cached[1] < pilot_size:
+                    continue
+                _cv_pilot_cache.move_to_end((params_key, name))
+                expectations[name] = cached[0]
+                sources[name] = f'pilot ({cached[1]} deals, cached)'
+        missing = [name for name in names if name not in expectations]
+        if needs_pilot:
+            metrics.record_cache('cv_pilot', not missing)
+        if missing:
+            features = [_control_feature(name) for name in missing]
+            totals = [0.0] * len(missing)
+            count = 0
+            for deal in self.generator.yield_deals(num_hands=pilot_size, **generator_params):
+                for i, feature in enumerate(features):
+                    totals[i] += feature(deal)
+                count += 1
+            for name, total in zip(missing, totals):
+                if count:
+                    expectations[name] = total / count
+                    sources[name] = f'pilot ({count} deals)'
+                    with _cv_pilot_lock:
+                        _cv_pilot_cache[(params_key, name)] = (expectations[name], count)
+                        _cv_pilot_cache.move_to_end((params_key, name))
+                        while len(_cv_pilot_cache) > CV_PILOT_CACHE_SIZE:
+                            _cv_pilot_cache.popitem(last=False)
+                            metrics.record_eviction('cv_pilot')
+        return expectations, sources
+
+    def _apply_control_variates(self, aggregated_stats, results_accumulator, feature_rows,
+                                generator_params, names: List[str], num_simulations: int = CV_PILOT_DEALS):
+        """Add control-variate adjusted means and standard errors next to the raw ones."""
+        expectations, sources = self._control_expectations(generator_params, names, num_simulations)
+        usable = [i for i, name in enumerate(names) if name in expectations]
+        aggregated_stats['control_variates'] = {
+            name: {'expectation': expectations.get(name), 'source': sources.get(name)} for name in names
+        }
+        if not usable:
+            return
+        rows = [[row[i] for i in usable] for row in feature_rows]
+        means = [expectations[names[i]] for i in usable]
+        for key, values in results_accumulator.items():
+            # Keys the callback did not return for every deal cannot be paired with the features
+            if len(values) != len(rows) or not aggregation.is_numeric(values[0]):
+                continue
+            aggregated_stats['stats'][key].update(aggregation.control_variate(values, rows, means))
+
+    def _run_weighted(self, simulation_callback, num_simulations, generator_params, temper=IMPORTANCE_TEMPER):
+        """Importance-sampled run: every result is weighted by its deal's importance weight."""
+        current = {}
+
+        def deals():
+            for deal, weight in self.generator.yield_weighted_deals(num_hands=num_simulations, temper=temper,
+                                                                    **generator_params):
+                current['weight'] = weight
+                yield deal
+
+        # _collect evaluates each deal before drawing the next, so current holds its weight
+        weight_rows = []
+        results_accumulator, count = self._collect(deals(), simulation_callback, weight_rows,
+                                                   [lambda deal: current['weight']])
+        weights = [row[0] for row in weight_rows]
+        aggregated_stats = {
+            'simulations_run': count,
+            'stats': {},
+            'method': 'importance',
+            'temper': temper,
+            'effective_sample_size': aggregation.effective_sample_size(weights),
+        }
+        for key, values in results_accumulator.items():
+            if values and len(values) == len(weights):
+                aggregated_stats['stats'][key] = aggregation.weighted(values, weights)
+        return aggregated_stats
+
+    def _stratify_seat(self, generator_params: Dict[str, Any]) -> str:
+        """The SmartStack seat, or else the only seat with constraints."""
+        if generator_params.get('smart_stack'):
+            return next(iter(generator_params['smart_stack']))
+        seats = set()
+        for key in ('suit_holding', 'hcp', 'hand_shape', 'hand_losers', 'controls', 'any_shape'):
+            seats.update((generator_params.get(key) or {}).keys())
+        if len(seats) != 1:
+            raise ValueError("Pass stratify_seat: constraints do not single out one seat")
+        return seats.pop()
+
+    def _stratum_weights(self, generator_params, by: str, seat: str):
+        """
+        Probability of each stratum feature value under the constraints: exact
+        from the frequency module when it applies, otherwise estimated from
+        PILOT_DEALS cheap deals (no double dummy).
+        """
+        try:
+            return frequency.distribution(by, seat=seat, **generator_params), 'exact'
+        except ValueError:
+            pass
+        counts = {}
+        seat_index = SEATS.index(seat)
+        for deal in self.generator.yield_deals(num_hands=PILOT_DEALS, **generator_params):
+            value = _stratum_feature(deal, by, seat_index)
+            counts[value] = counts.get(value, 0) + 1
+        return counts, 'estimated'
+
+    def _build_strata(self, weights: Dict[Any, float], by: str, num_simulations: int):
+        """
+        Group feature values into strata expected to get at least
+        MIN_PER_STRATUM deals. HCP values are merged into contiguous ranges;
+        rare shape patterns are pooled together.
+        Returns a list of (set of values, weight).
+        """
+        total = sum(weights.values())
+        enough = MIN_PER_STRATUM * total / max(num_simulations, 1)
+        strata = []
+        if by == 'hcp':
+            current, current_weight = [], 0.0
+            for value in sorted(weights):
+                current.append(value)
+                current_weight += weights[value]
+                if current_weight >= enough:
+                    strata.append((frozenset(current), current_weight))
+                    current, current_weight = [], 0.0
+            if current:
+                if strata:
+                    values, weight = strata.pop()
+                    strata.append((values | frozenset(current), weight + current_weight))
+                else:
+                    strata.append((frozenset(current), current_weight))
+            return strata
+
+        rare, rare_weight = [], 0.0
+        for value in sorted(weights, key=weights.get, reverse=True):
+            if weights[value] >= enough:
+                strata.append((frozenset([value]), weights[value]))
+            else:
+                rare.append(value)
+                rare_weight += weights[value]
+        if rare:
+            if rare_weight < enough and strata:
+                values, weight = strata.pop()
+                strata.append((values | frozenset(rare), weight + rare_weight))
+            else:
+                strata.append((frozenset(rare), rare_weight))
+        return strata
+
+    def _stratum_deals(self, generator_params, by: str, seat: str, values, share: float, count: int):
+        """
+        Yield `count` deals from one stratum. HCP strata narrow the seat's hcp
+        range (on its SmartStack when it has one) so the dealer only produces
+        stratum deals; shape strata filter the deals of the full constraints.
+        """
+        seat_index = SEATS.index(seat)
+        params = copy.deepcopy(generator_params)
+        if by == 'hcp':
+            lo, hi = min(values), max(values)
+            predealt = (params.get('predeal') or {}).get(seat, '- - - -') != '- - - -'
+            if seat in (params.get('smart_stack') or {}) and not predealt:
+                old = params['smart_stack'][seat].get('hcp') or (0, 37)
+                params['smart_stack'][seat]['hcp'] = (max(lo, old[0]), min(hi, old[1]))
             else:
-                # Frequency count for non-numeric
-                # Convert to string to be safe for counting
-                counts = {}
-                for v in values:
-                    v_str = str(v)
-                    counts[v_str] = counts.get(v_str, 0) + 1
-                aggregated_stats['stats'][key] = counts
+                old = (params.get('hcp') or {}).get(seat, (0, 37))
+                params.setdefault('hcp', {})[seat] = (max(lo, old[0]), min(hi, old[1]))
+            yield from self.generator.yield_deals(num_hands=count, **params)
+            return
 
+        wanted = math.ceil(STRATUM_OVERDRAW * count / share)
+        produced = 0
+        for deal in self.generator.yield_deals(num_hands=wanted, **params):
+            if _stratum_feature(deal, by, seat_index) in values:
+                yield deal
+                produced += 1
+                if produced >= count:
+                    return
+
+    def _run_stratified(self, simulation_callback, num_simulations, generator_params, by, seat):
+        if by not in ('hcp', 'pattern'):
+            raise ValueError("stratify_by must be 'hcp' or 'pattern'")
+        seat = seat or self._stratify_seat(generator_params)
+        weights, weight_source = self._stratum_weights(generator_params, by, seat)
+        if not weights:
+            return {'simulations_run': 0, 'stats': {}, 'method': 'stratified', 'strata': []}
+        strata = self._build_strata(weights, by, num_simulations)
+        allocation = aggregation.allocate([w for _, w in strata], num_simulations, MIN_PER_STRATUM)
+        total_weight = sum(w for _, w in strata)
+
+        per_stratum = []
+        for (values, weight), count in zip(strata, allocation):
+            deals = self._stratum_deals(generator_params, by, seat, values, weight / total_weight, count)
+            results, produced = self._collect(deals, simulation_callback)
+            per_stratum.append((weight, results, produced))
+
+        aggregated_stats = {
+            'simulations_run': sum(produced for _, _, produced in per_stratum),
+            'stats': {},
+            'method': 'stratified',
+            'stratify_by': by,
+            'stratify_seat': seat,
+            'weights': weight_source,
+            'strata': [{'values': sorted(values), 'weight': weight / total_weight, 'deals': produced}
+                       for (values, _), (weight, _, produced) in zip(strata, per_stratum)],
+        }
+        keys = []
+        for _, results, _ in per_stratum:
+            keys.extend(key for key in results if key not in keys)
+        for key in keys:
+            aggregated_stats['stats'][key] = aggregation.stratified(
+                [(weight, results.get(key, [])) for weight, results, _ in per_stratum])
         return aggregated_stats
+
+
+def _with_trick_table(simulation_callback):
+    """Wrap a callback so every result also carries the deal's trick table."""
+    def callback(deal, solver):
+        result = dict(simulation_callback(deal, solver))
+        result[TRICK_TABLE_KEY] = solver.get_trick_table()
+        return result
+    return callback
+
+
+def _par_stats(tables: List[Dict], exact: bool) -> Dict[str, Any]:
+    """
+    Par score summaries and par contract counts per dealer and vulnerability,
+    computed in one batch from the deals' trick tables.
+    """
+    if not tables:
+        return {}
+    return {
+        dealer: {
+            vulnerability: {
+                'score': aggregation.summarize(result['score'], exact=exact),
+                'contract': aggregation.count_values(result['contract']),
+            }
+            for vulnerability, result in by_vulnerability.items()
+        }
+        for dealer, by_vulnerability in par.par_all(tables).items()
+    }
+
+
+def _control_feature(name: str):
+    """
+    Feature function of a deal for a control variate name: 'hcp:<seats>' is
+    the seats' combined HCP, 'fit:<seats>' their longest combined suit.
+    """
+    kind, _, seats = name.partition(':')
+    if kind not in ('hcp', 'fit') or not seats or any(seat not in SEATS for seat in seats):
+        raise ValueError(f"Unknown control variate: {name}. Use e.g. 'hcp:NS' or 'fit:EW'")
+    indices = [SEATS.index(seat) for seat in seats]
+    if kind == 'hcp':
+        return lambda deal: sum(bitboard_for(deal).hcp(i) for i in indices)
+    return lambda deal: max(sum(bitboard_for(deal).length(i, suit) for i in indices) for suit in range(4))
+
+
+def _stratum_feature(deal, by: str, seat_index: int):
+    board = bitboard_for(deal)
+    if by == 'hcp':
+        return board.hcp(seat_index)
+    return tuple(sorted(board.shape(seat_index), reverse=True))
+
+
+def _run_chunk(bounds):
+    """Worker entry point for one enumeration chunk (see SimulationRunner._enumerate)."""
+    runner, simulation_callback, generator_params = _chunk_task
+    return runner._collect_chunk(simulation_callback, generator_params, bounds)
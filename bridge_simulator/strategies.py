@@ -1,5 +1,6 @@
 from typing import Dict, Any, Optional
 from redeal.redeal import Deal, Suit
+from .bitboard import bitboard_for
 
 class DecisionNode:
     """
@@ -58,21 +59,19 @@ class DecisionNode:
             
             # Assuming checking North's hand for now (System usually defined for N/S pair)
             # Todo: Make player configurable in condition? Defaulting to North (Opener)
-            hand = deal.north
+            board = bitboard_for(deal)
             
             length = 0
-            if suit_char == 'S': length = len(hand.spades)
-            elif suit_char == 'H': length = len(hand.hearts)
-            elif suit_char == 'D': length = len(hand.diamonds)
-            elif suit_char == 'C': length = len(hand.clubs)
+            suit_index = {'S': 0, 'H': 1, 'D': 2, 'C': 3}.get(suit_char)
+            if suit_index is not None:
+                length = board.length(0, suit_index)
             
             return self.compare(length, operator, value)
 
         elif cond_type == 'hcp':
             operator = condition.get('operator')
             value = condition.get('value')
-            hand = deal.north 
-            return self.compare(hand.hcp, operator, value)
+            return self.compare(bitboard_for(deal).hcp(0), operator, value)
             
         return False
 
@@ -0,0 +1,219 @@
+"""
+Parameter sweeps over one shared deal pool.
+
+A grid maps paths to the values to try, e.g.
+
+    {"generator_params.smart_stack.N.hcp": [[14, 16], [15, 17]],
+     "strategies.0.root.condition.value": [4, 5]}
+
+Paths are dotted keys into the simulation request, with list positions as
+numbers. Every combination of values is a grid point.
+
+The pool is dealt once under a superset of every point's constraints: swept
+ranges are widened to their union, and a seat's constraint with any other
+swept part is dropped as a whole (a SmartStack seat is then dealt freely).
+Each point then keeps the pool deals that satisfy its own constraints. Since
+the pool is uniform over the superset, those deals follow the point's
+distribution exactly. Every deal keeps one solver across all points, so a
+contract is solved at most once per deal however many points ask for it.
+Points that share deals are compared deal by deal against the first point.
+"""
+import copy
+import itertools
+import math
+import os
+from typing import Any, Dict, List
+from . import aggregation, comparison, frequency, scoring
+from .double_dummy import DoubleDummySolver
+from .strategies import DecisionStrategy
+
+# Largest number of grid points in one sweep
+MAX_GRID_POINTS = 64
+# Pool size as a multiple of num_simulations: at most, and when the points'
+# shares of the superset cannot be computed exactly
+MAX_POOL_FACTOR = 20
+DEFAULT_POOL_FACTOR = 4
+# The whole pool stays in memory with its solvers for the sweep, so requests
+# whose num_simulations or pool would exceed these are refused (the 512 MB VM
+# holds a pool of this size comfortably)
+MAX_SIMULATIONS = int(os.environ.get('BRIDGE_SWEEP_MAX_EVENTS', 2000))
+MAX_POOL_SIZE = int(os.environ.get('BRIDGE_SWEEP_MAX_POOL', 10000))
+
+# Keys of generator_params holding (min, max) ranges per seat
+RANGE_KEYS = ('hcp', 'hand_losers', 'controls')
+
+
+def _split(path: str) -> List:
+    return [int(part) if part.isdigit() else part for part in path.split('.')]
+
+
+def set_path(target, path: str, value):
+    """Set the value at a dotted path, creating missing dicts on the way."""
+    parts = _split(path)
+    for part in parts[:-1]:
+        if isinstance(part, str) and isinstance(target, dict):
+            target = target.setdefault(part, {})
+        else:
+            target = target[part]
+    target[parts[-1]] = value
+
+
+def _delete_path(target, path: str):
+    parts = _split(path)
+    for part in parts[:-1]:
+        target = target.get(part) if isinstance(target, dict) else target[part]
+        if target is None:
+            return
+    if isinstance(target, dict):
+        target.pop(parts[-1], None)
+
+
+def tuple_ranges(generator_params: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON ranges arrive as lists; the generator wants tuples."""
+    for key in RANGE_KEYS:
+        for seat, value in (generator_params.get(key) or {}).items():
+            generator_params[key][seat] = tuple(value)
+    for config in (generator_params.get('smart_stack') or {}).values():
+        if isinstance(config.get('hcp'), list):
+            config['hcp'] = tuple(config['hcp'])
+    return generator_params
+
+
+def _is_range(value) -> bool:
+    return isinstance(value, (list, tuple)) and len(value) == 2 and all(isinstance(v, (int, float)) for v in value)
+
+
+def grid_points(grid: Dict[str, List]) -> List[Dict[str, Any]]:
+    """Every combination of the grid's values, as {path: value}."""
+    for path in grid:
+        if not path.startswith(('generator_params.', 'strategies.')):
+            raise ValueError(f"Grid paths must start with generator_params. or strategies.: {path}")
+    points = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+    if not points or len(points) > MAX_GRID_POINTS:
+        raise ValueError(f"A sweep needs between 1 and {MAX_GRID_POINTS} grid points")
+    return points
+
+
+def superset_params(generator_params: Dict[str, Any], grid: Dict[str, List]) -> Dict[str, Any]:
+    """Generator constraints every grid point's constraints imply."""
+    params = copy.deepcopy(generator_params)
+    dropped = []
+    for path, values in grid.items():
+        if not path.startswith('generator_params.'):
+            continue
+        inner = path[len('generator_params.'):]
+        if all(_is_range(value) for value in values):
+            set_path(params, inner, (min(v[0] for v in values), max(v[1] for v in values)))
+        else:
+            # Dropping only the swept part could leave a constraint that means
+            # something else or cannot be built (a SmartStack with no shape),
+            # so the seat's whole constraint of that kind goes
+            dropped.append('.'.join(inner.split('.')[:2]))
+    for path in dropped:
+        _delete_path(params, path)
+    return tuple_ranges(params)
+
+
+def pool_size(superset: Dict[str, Any], points: List[Dict[str, Any]], num_simulations: int) -> int:
+    """
+    Deals to draw so the rarest point still gets about num_simulations, from
+    the exact share of each point in the superset where that can be computed.
+    """
+    try:
+        whole = frequency.probability(**superset)
+        rarest = min(frequency.probability(**params) for params in points) / whole if whole else 0.0
+    except ValueError:
+        return DEFAULT_POOL_FACTOR * num_simulations
+    if rarest <= 0:
+        return num_simulations
+    return min(math.ceil(num_simulations / rarest), MAX_POOL_FACTOR * num_simulations)
+
+
+def run_grid(runner, strategies_json: List[Dict[str, Any]], grid: Dict[str, List],
+             num_simulations: int = 100, generator_params: Dict[str, Any] = None,
+             vulnerable=False) -> Dict[str, Any]:
+    """
+    Run every grid point of a sweep on one shared pool of deals.
+
+    Args:
+        runner: SimulationRunner supplying the generator.
+        strategies_json: DecisionStrategy trees as JSON.
+        grid: {path: [values]} over 'generator_params.…' and 'strategies.…'.
+
+    Returns:
+        'points': per grid point its 'params', the deals it kept and the usual
+        strategy stats; 'paired': for every later point, the per-strategy score
+        difference against the first point over the deals both kept;
+        'pool_size' and 'dds_solved' (double dummy solver calls over the whole sweep).
+
+    Raises:
+        ValueError: If num_simulations exceeds MAX_SIMULATIONS or the pool would
+                    exceed MAX_POOL_SIZE deals.
+    """
+    generator_params = generator_params or {}
+    if not 0 < num_simulations <= MAX_SIMULATIONS:
+        raise ValueError(f"num_events must be between 1 and {MAX_SIMULATIONS}")
+    points = grid_points(grid)
+    request = {'generator_params': generator_params, 'strategies': strategies_json}
+    configs = []
+    for point in points:
+        config = copy.deepcopy(request)
+        for path, value in point.items():
+            set_path(config, path, value)
+        configs.append({'generator_params': tuple_ranges(config['generator_params']),
+                        'strategies': [DecisionStrategy(s) for s in config['strategies']]})
+
+    superset = superset_params(generator_params, grid)
+    size = pool_size(superset, [c['generator_params'] for c in configs], num_simulations)
+    if size > MAX_POOL_SIZE:
+        raise ValueError(f"The sweep needs a pool of {size} deals, over the limit of {MAX_POOL_SIZE}; "
+                         f"lower num_events or narrow the grid")
+    pool = list(runner.generator.yield_deals(num_hands=size, **superset))
+    solvers = [DoubleDummySolver(deal) for deal in pool]
+
+    results = []
+    point_reports = []
+    for point, config in zip(points, configs):
+        matches = runner.generator.constraint_filter(**config['generator_params'])
+        callback = comparison.strategy_callback(config['strategies'], vulnerable)
+        per_deal = {}
+        for i, (deal, solver) in enumerate(zip(pool, solvers)):
+            if not matches(deal):
+                continue
+            try:
+                per_deal[i] = callback(deal, solver)
+            except Exception as e:
+                print(f"Error in sweep deal {i}: {e}")
+        results.append(per_deal)
+
+        accumulator = {}
+        for result in per_deal.values():
+            for key, value in result.items():
+                accumulator.setdefault(key, []).append(value)
+        accumulator.update(scoring.derived_results(accumulator))
+        point_reports.append({
+            'params': point,
+            'simulations_run': len(per_deal),
+            'stats': {key: aggregation.summarize(values) for key, values in accumulator.items() if values},
+        })
+
+    paired = []
+    baseline = results[0]
+    for index in range(1, len(points)):
+        shared = [i for i in results[index] if i in baseline]
+        stats = {}
+        for key in baseline[shared[0]] if shared else []:
+            if key.endswith('_score'):
+                diffs = [results[index][i][key] - baseline[i][key] for i in shared if key in results[index][i]]
+                if diffs:
+                    stats[f"diff_{key}"] = aggregation.summarize(diffs)
+                    stats[f"imps_{key}"] = aggregation.summarize(scoring.imps(diffs).tolist())
+        paired.append({'point': index, 'baseline': 0, 'shared_deals': len(shared), 'stats': stats})
+
+    return {
+        'method': 'sweep',
+        'pool_size': len(pool),
+        'points': point_reports,
+        'paired': paired,
+        'dds_solved': sum(solver.solves for solver in solvers),
+    }
@@ -0,0 +1,80 @@
+import random
+import unittest
+from bridge_simulator import aggregation
+
+class TestAggregation(unittest.TestCase):
+    def test_summarize(self):
+        """Sampled runs report the standard error; exhaustive runs are exact."""
+        stats = aggregation.summarize([1, 2, 3, 4])
+        self.assertEqual(stats['mean'], 2.5)
+        self.assertAlmostEqual(stats['stderr'], stats['stdev'] / 2)
+        self.assertEqual(aggregation.summarize([1, 2, 3, 4], exact=True)['stderr'], 0.0)
+        self.assertEqual(aggregation.summarize(['a', 'b', 'a']), {'a': 2, 'b': 1})
+
+    def test_stratified_weights_strata(self):
+        """Strata are combined by weight, not by how many deals each one got."""
+        # 90% of the population scores 0, 10% scores 100; the rare stratum is oversampled
+        stats = aggregation.stratified([(0.9, [0, 0]), (0.1, [100, 100, 100, 100])])
+        self.assertAlmostEqual(stats['mean'], 10.0)
+        self.assertAlmostEqual(stats['stderr'], 0.0)
+        self.assertAlmostEqual(stats['stdev'], 30.0)
+
+        counts = aggregation.stratified([(0.5, ['win', 'win']), (0.5, ['loss'] * 6)])
+        self.assertAlmostEqual(counts['win'], 4.0)
+        self.assertAlmostEqual(counts['loss'], 4.0)
+
+    def test_allocate(self):
+        """Allocation is proportional, sums to the budget and gives every stratum a minimum."""
+        self.assertEqual(aggregation.allocate([0.5, 0.3, 0.2], 10), [5, 3, 2])
+        counts = aggregation.allocate([0.97, 0.02, 0.01], 20)
+        self.assertEqual(sum(counts), 20)
+        self.assertTrue(all(c >= 2 for c in counts))
+
+    def test_control_variate(self):
+        """A correlated feature with a known mean corrects the estimate and shrinks its error."""
+        rng = random.Random(7)
+        features = [[rng.gauss(20, 3)] for _ in range(400)]
+        values = [10 * x[0] + rng.gauss(0, 5) for x in features]
+        raw = aggregation.summarize(values)
+        adjusted = aggregation.control_variate(values, features, [20.0])
+        self.assertGreater(adjusted['cv_variance_reduction'], 0.9)
+        self.assertLess(adjusted['cv_stderr'], raw['stderr'] / 3)
+        self.assertAlmostEqual(adjusted['cv_mean'], 200.0, delta=3 * adjusted['cv_stderr'])
+        # A constant feature carries no information
+        self.assertEqual(aggregation.control_variate(values, [[1.0]] * 400, [1.0]), {})
+
+    def test_weighted(self):
+        """Importance weights reweight means and counts; ESS reflects uneven weights."""
+        stats = aggregation.weighted([0, 10], [3.0, 1.0])
+        self.assertAlmostEqual(stats['mean'], 2.5)
+        counts = aggregation.weighted(['a', 'b'], [3.0, 1.0])
+        self.assertAlmostEqual(counts['a'], 1.5)
+        self.assertAlmostEqual(aggregation.effective_sample_size([1.0] * 10), 10)
+        self.assertLess(aggregation.effective_sample_size([10.0, 1.0, 1.0]), 2)
+
+    def test_running_stats_merge(self):
+        """Merged partial statistics equal the statistics of all values at once."""
+        values = [3, 1, 4, 1, 5, 9, 2, 6]
+        left, right = aggregation.RunningStats(), aggregation.RunningStats()
+        for v in values[:3]:
+            left.add(v)
+        for v in values[3:]:
+            right.add(v)
+        left.merge(aggregation.RunningStats.from_state(right.to_state()))
+        expected = aggregation.summarize(values)
+        for key in ('mean', 'stdev', 'stderr', 'min', 'max'):
+            self.assertAlmostEqual(left.summary()[key], expected[key])
+
+    def test_result_stats(self):
+        """Merged result summaries match summarize() over all values, numeric or not."""
+        left, right = aggregation.ResultStats(), aggregation.ResultStats()
+        left.add({'score': [3, 1], 'contract': ['4S']})
+        right.add({'score': [4, 1, 5], 'contract': ['3N', '4S']})
+        left.merge(aggregation.ResultStats.from_state(right.to_state()))
+        summary = left.summary()
+        self.assertEqual(summary['contract'], aggregation.summarize(['4S', '3N', '4S']))
+        for key, value in aggregation.summarize([3, 1, 4, 1, 5]).items():
+            self.assertAlmostEqual(summary['score'][key], value)
+
+if __name__ == '__main__':
+    unittest.main()
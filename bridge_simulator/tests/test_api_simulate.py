@@ -1,3 +1,6 @@
+import os
+import subprocess
+import sys
 import unittest
 import json
 from app import app
@@ -53,6 +56,42 @@ class TestSimulationAPI(unittest.TestCase):
         
         # 7NT with 26+ HCP should score much higher than 1NT
         # Just checking generated keys, logic verified in engine tests
+
+    def test_metrics_endpoint(self):
+        """
+        Test /metrics exposes request latency and generator counters after an API call.
+        """
+        response = self.app.get('/api/generate-hands?num_hands=2')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.app.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        text = response.get_data(as_text=True)
+        self.assertIn('bridge_http_request_seconds_bucket{endpoint="/api/generate-hands"', text)
+        self.assertIn('bridge_deals_generated_total', text)
+        
+    def test_frequency_endpoint(self):
+        """
+        /api/frequency answers analytically and rejects constraints on several seats.
+        """
+        payload = {"generator_params": {"smart_stack": {"N": {"shape": "balanced", "hcp": [15, 17]}}}}
+        response = self.app.post('/api/frequency', json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertAlmostEqual(response.json['probability'], 0.0487, places=4)
+
+        payload = {"generator_params": {"hcp": {"N": [15, 17], "S": [8, 9]}}}
+        response = self.app.post('/api/frequency', json=payload)
+        self.assertEqual(response.status_code, 400)
+
+    def test_health_check_does_not_load_redeal(self):
+        """
+        Cold start: importing the app and answering /healthz must not import redeal.
+        """
+        code = ("import sys, app; r = app.app.test_client().get('/healthz'); "
+                "print(r.status_code, 'redeal' in sys.modules)")
+        root = os.path.join(os.path.dirname(__file__), '..', '..')
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=root, text=True)
+        self.assertEqual(output.strip().splitlines()[-1], '200 False')
         
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,73 @@
+import csv
+import json
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+from bridge_simulator import batch
+
+SCENARIO_FILE = '''
+PARAMS = {'predeal': {'S': 'K842 QT72 986 52'}, 'smart_stack': {'N': {'shape': 'balanced', 'hcp': [15, 17]}}}
+
+def one_nt(deal, solver):
+    return {'score_1nt': solver.get_score('1N', 'N')}
+
+def two_hearts(deal, solver):
+    return {'score_2h': solver.get_score('2H', 'N')}
+
+SCENARIOS = [
+    {'name': 'one_nt', 'generator_params': PARAMS, 'callback': one_nt, 'num_simulations': 6},
+    {'name': 'two_hearts', 'generator_params': PARAMS, 'callback': two_hearts, 'num_simulations': 4},
+    {'name': 'no_predeal', 'generator_params': {'hcp': {'N': [20, 37]}}, 'callback': one_nt, 'num_simulations': 3},
+]
+'''
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'scenarios.py')
+        with open(self.path, 'w') as f:
+            f.write(SCENARIO_FILE)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_load_scenarios(self):
+        """Ranges become tuples; scenarios with equal params share a group key."""
+        scenarios = batch.load_scenarios(self.path)
+        self.assertEqual([s['name'] for s in scenarios], ['one_nt', 'two_hearts', 'no_predeal'])
+        self.assertEqual(scenarios[0]['generator_params']['smart_stack']['N']['hcp'], (15, 17))
+        self.assertEqual(batch.group_key(scenarios[0]['generator_params']),
+                         batch.group_key(scenarios[1]['generator_params']))
+        with self.assertRaises(ValueError):
+            batch.load_scenarios(os.path.join(self.directory.name, 'scenarios.txt'))
+
+    def test_groups_share_deals(self):
+        """Scenarios of one group use the first deals of the group; reports are written as JSON and CSV."""
+        reports = batch.run_scenarios(batch.load_scenarios(self.path))
+        self.assertEqual(reports['one_nt']['simulations_run'], 6)
+        self.assertEqual(reports['two_hearts']['simulations_run'], 4)
+        self.assertEqual(reports['two_hearts']['group_deals'], 6)
+        self.assertEqual(reports['no_predeal']['group_deals'], 3)
+
+        out = os.path.join(self.directory.name, 'reports')
+        batch.write_reports(reports, out)
+        with open(os.path.join(out, 'one_nt.json')) as f:
+            self.assertEqual(json.load(f)['simulations_run'], 6)
+        with open(os.path.join(out, 'summary.csv')) as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual({row['key'] for row in rows}, {'score_1nt', 'score_2h'})
+
+    def test_seeded_run_ignores_worker_count(self):
+        """With the same seed, the deals of every group depend on the chunk size and not on --workers."""
+        scenarios = batch.load_scenarios(self.path)
+        runs = []
+        with mock.patch.object(batch, 'BATCH_CHUNK_SIZE', 2):
+            for workers in (1, 2):
+                reports = batch.run_scenarios(scenarios, workers=workers, rng=random.Random(7))
+                runs.append({name: report['stats'] for name, report in reports.items()})
+        self.assertEqual(runs[0], runs[1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from redeal.redeal import Deal, Hand
+from bridge_simulator.bitboard import DealBitboard, bitboard_for
+from bridge_simulator.hand_generator import BridgeHandGenerator
+
+class TestDealBitboard(unittest.TestCase):
+    def setUp(self):
+        self.deal = Deal.prepare({
+            'N': Hand.from_str("AKJ84 53 K52 A83"),
+            'E': Hand.from_str("QT2 AKJ84 Q3 K52"),
+        })()
+
+    def test_features_match_redeal(self):
+        board = bitboard_for(self.deal)
+        for seat in range(4):
+            hand = self.deal[seat]
+            self.assertEqual(board.shape(seat), tuple(hand.shape))
+            self.assertEqual(board.hcp(seat), hand.hcp)
+            self.assertEqual(board.controls(seat), hand.controls)
+        self.assertEqual(board.length(0, 0), 5)
+        self.assertEqual(board.ranks(1, 1), ['A', 'K', 'J', '8', '4'])
+
+    def test_cached_on_deal(self):
+        self.assertIs(bitboard_for(self.deal), bitboard_for(self.deal))
+
+    def test_formatted_round_trip(self):
+        formatted = BridgeHandGenerator()._format_hand(self.deal)
+        self.assertEqual(DealBitboard.from_formatted(formatted), DealBitboard.from_deal(self.deal))
+        # Every card is held exactly once
+        for suit in range(4):
+            masks = [bitboard_for(self.deal).masks[seat][suit] for seat in range(4)]
+            self.assertEqual(masks[0] | masks[1] | masks[2] | masks[3], (1 << 13) - 1)
+            self.assertEqual(sum(m.bit_count() for m in masks), 13)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+from bridge_simulator import checkpoint
+from bridge_simulator.simulator import SimulationRunner
+
+PARAMS = {'predeal': {'S': 'K842 QT72 986 52'}, 'smart_stack': {'N': {'shape': 'balanced', 'hcp': (15, 17)}}}
+
+def callback(deal, solver):
+    return {'hcp_n': deal.north.hcp, 'score_1nt': solver.get_score('1N', 'N')}
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'job.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_save_and_rng(self):
+        """Checkpoints round-trip and restore the job's random generator."""
+        rng = random.Random(7)
+        checkpoint.save(self.path, {'rng': checkpoint.rng_state(rng)})
+        expected = rng.random()
+        self.assertEqual(checkpoint.restore_rng(checkpoint.load(self.path)['rng']).random(), expected)
+        self.assertEqual(os.listdir(self.directory.name), ['job.json'])
+        self.assertIsNone(checkpoint.load(os.path.join(self.directory.name, 'missing.json')))
+        with self.assertRaises(ValueError):
+            checkpoint.job_path('../etc')
+
+    def test_persistence_problem(self):
+        """Temporary directories are flagged; on Fly.io so is the root filesystem."""
+        self.assertIn('temporary', checkpoint.persistence_problem(self.directory.name))
+        with mock.patch.object(checkpoint, '_mount_point', return_value='/'), \
+                mock.patch.object(checkpoint, '_filesystem_type', return_value='overlay'), \
+                mock.patch.object(checkpoint.tempfile, 'gettempdir', return_value='/nonexistent'):
+            self.assertIsNone(checkpoint.persistence_problem('/srv/checkpoints'))
+            with mock.patch.object(checkpoint, 'REQUIRE_PERSISTENT', True):
+                self.assertIn('root filesystem', checkpoint.persistence_problem('/srv/checkpoints'))
+
+    def test_resume_matches_uninterrupted_run(self):
+        """A run stopped at a checkpoint and extended gives the uninterrupted run's result."""
+        runner = SimulationRunner()
+        full = runner.run_checkpointed(callback, os.path.join(self.directory.name, 'full.json'),
+                                       num_simulations=6, generator_params=PARAMS, checkpoint_every=3, seed=11)
+        first = runner.run_checkpointed(callback, self.path, num_simulations=3,
+                                        generator_params=PARAMS, checkpoint_every=3, seed=11)
+        self.assertEqual(first['simulations_run'], 3)
+        # Other users of the module-level generator do not shift the job's deals
+        random.seed(99)
+        random.random()
+        extended = runner.run_checkpointed(callback, self.path, num_simulations=6,
+                                           generator_params=PARAMS, checkpoint_every=3)
+        self.assertEqual(extended['resumed_from'], 3)
+        self.assertEqual(extended['simulations_run'], 6)
+        self.assertEqual(extended['stats'], full['stats'])
+        with self.assertRaises(ValueError):
+            runner.run_checkpointed(callback, self.path, num_simulations=9, generator_params={})
+
+    def test_module_generator_untouched(self):
+        """A checkpointed run leaves the module-level random generator where it was."""
+        before = random.getstate()
+        SimulationRunner().run_checkpointed(callback, self.path, num_simulations=2,
+                                            generator_params=PARAMS, seed=5)
+        self.assertEqual(random.getstate(), before)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import random
+import threading
+import unittest
+from werkzeug.serving import make_server
+from app import app
+from bridge_simulator import cluster
+
+SPEC = {
+    "generator_params": {
+        "predeal": {"S": "AKQJ AKQJ AK AK"},
+        "smart_stack": {"N": {"shape": "balanced", "hcp": [0, 5]}}
+    },
+    "strategies": [
+        {"name": "Bid7NT", "root": {"type": "contract", "contract": "7N", "declarer": "S"}},
+        {"name": "Bid1NT", "root": {"type": "contract", "contract": "1N", "declarer": "S"}}
+    ]
+}
+
+class TestCluster(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Two app instances on their own ports stand in for machines
+        cls.servers = [make_server('127.0.0.1', 0, app, threaded=True) for _ in range(2)]
+        for server in cls.servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        cls.urls = [f"http://127.0.0.1:{server.server_port}" for server in cls.servers]
+
+    @classmethod
+    def tearDownClass(cls):
+        for server in cls.servers:
+            server.shutdown()
+
+    def test_split(self):
+        """Shards cover every deal and their seeds depend only on the run's seed."""
+        shards = cluster.split(10, 3, seed=5)
+        self.assertEqual([s['num_events'] for s in shards], [4, 3, 3])
+        self.assertEqual(shards, cluster.split(10, 3, seed=5))
+        self.assertNotEqual(shards[0]['seed'], shards[1]['seed'])
+
+    def test_shard_has_its_own_generator(self):
+        """A shard's deals follow from its seed, and the process's random generator is left alone."""
+        before = random.getstate()
+        first = cluster.run_shard(SPEC, 4, seed=8)
+        self.assertEqual(random.getstate(), before)
+        random.seed(1)
+        self.assertEqual(cluster.run_shard(SPEC, 4, seed=8), first)
+
+    def test_lost_worker_is_replaced(self):
+        """A worker that cannot be reached loses its shard to the others; results match one worker."""
+        dead = 'http://127.0.0.1:9'
+        report = cluster.Coordinator([dead] + self.urls, timeout=30).run(SPEC, num_simulations=12, shards=6, seed=3)
+        self.assertEqual(report['simulations_run'], 12)
+        self.assertEqual(report['lost_workers'], [dead])
+        self.assertGreaterEqual(report['reassigned'], 1)
+        self.assertEqual(sum(report['workers'].values()), 6)
+
+        single = cluster.Coordinator(self.urls[:1]).run(SPEC, num_simulations=12, shards=6, seed=3)
+        for key in ('Bid7NT_score', 'Bid1NT_score'):
+            self.assertAlmostEqual(report['stats'][key]['mean'], single['stats'][key]['mean'])
+
+    def test_rejected_shard_stops_the_run(self):
+        """Invalid specs are refused by the workers and not retried."""
+        with self.assertRaises(cluster.ShardRejected):
+            cluster.Coordinator(self.urls).run(dict(SPEC, vulnerability='sometimes'), num_simulations=2)
+
+if __name__ == '__main__':
+    unittest.main()
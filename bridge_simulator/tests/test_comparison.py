@@ -0,0 +1,82 @@
+import unittest
+from bridge_simulator.comparison import racing_z, run_disagreement, run_racing
+from bridge_simulator.simulator import SimulationRunner
+from bridge_simulator.strategies import DecisionStrategy
+
+STAYMAN = {"name": "Stayman", "root": {
+    "type": "branch",
+    "condition": {"type": "suit_length", "suit": "H", "operator": ">=", "value": 4},
+    "true_branch": {"type": "contract", "contract": "2H", "declarer": "N"},
+    "false_branch": {"type": "contract", "contract": "1N", "declarer": "N"}
+}}
+PASS_1NT = {"name": "Pass1NT", "root": {"type": "contract", "contract": "1N", "declarer": "N"}}
+GENERATOR_PARAMS = {
+    'predeal': {'S': 'K842 QT72 986 52'},
+    'smart_stack': {'N': {'shape': 'balanced', 'hcp': (15, 17)}}
+}
+
+class TestDisagreement(unittest.TestCase):
+    def test_only_disagreements_are_solved(self):
+        """
+        Deals where both trees bid 1NT are ties without solving; only 4-card
+        heart hands and a small agreement sample reach the solver.
+        """
+        strategies = [DecisionStrategy(STAYMAN), DecisionStrategy(PASS_1NT)]
+        report = run_disagreement(SimulationRunner(), strategies, num_simulations=40,
+                                  generator_params=GENERATOR_PARAMS, agreement_sample=5)
+        self.assertEqual(report['method'], 'disagreement')
+        self.assertEqual(report['simulations_run'], 40)
+        stats = report['stats']
+        agreeing = round(report['agreement_rate'] * 40)
+        # Disagreements solve 2H and 1NT, sampled agreements 1NT only
+        self.assertEqual(report['dds_solved'], 2 * (40 - agreeing) + min(5, agreeing))
+        self.assertGreaterEqual(stats['winner'].get('tie', 0), agreeing)
+        self.assertEqual(sum(stats['winner'].values()), 40)
+        self.assertEqual(stats['Pass1NT_contract'], {'1N': 40})
+        self.assertIn('mean', stats['Stayman_score'])
+
+    def test_failing_strategy_skips_the_deal(self):
+        """A strategy that raises on a deal drops that deal instead of failing the run."""
+        stayman = DecisionStrategy(STAYMAN)
+        evaluate = stayman.evaluate
+        calls = []
+
+        def flaky(deal):
+            calls.append(deal)
+            if len(calls) % 4 == 0:
+                raise ValueError("bad tree")
+            return evaluate(deal)
+
+        stayman.evaluate = flaky
+        report = run_disagreement(SimulationRunner(), [stayman, DecisionStrategy(PASS_1NT)], num_simulations=20,
+                                  generator_params=GENERATOR_PARAMS, agreement_sample=5)
+        self.assertEqual(report['simulations_run'], 15)
+        self.assertEqual(report['stats']['Pass1NT_contract'], {'1N': 15})
+
+class TestRacing(unittest.TestCase):
+    def test_dominated_strategies_are_dropped(self):
+        """
+        7NT on a 0-5 count opposite 26 HCP goes down heavily; racing drops it
+        and ranks the survivors with confidence intervals.
+        """
+        strategies = [DecisionStrategy({"name": name, "root": {"type": "contract", "contract": c, "declarer": "S"}})
+                      for name, c in (("Bid1NT", "1N"), ("Bid3NT", "3N"), ("Bid7NT", "7N"))]
+        params = {'predeal': {'S': 'AKQJ AKQJ AK AK'},
+                  'smart_stack': {'N': {'shape': 'balanced', 'hcp': (0, 5)}}}
+        report = run_racing(SimulationRunner(), strategies, num_simulations=60, generator_params=params)
+        self.assertEqual(report['method'], 'racing')
+        self.assertIn('Bid7NT', report['eliminated'])
+        survivors = [row['strategy'] for row in report['ranking']]
+        self.assertNotIn('Bid7NT', survivors)
+        for row in report['ranking']:
+            self.assertLessEqual(row['ci95'][0], row['mean'])
+        self.assertIn('diff_Bid1NT_minus_Bid3NT', report['stats'])
+
+    def test_threshold_covers_every_look(self):
+        """One look at one pair is the plain 99% test; more looks or pairs raise the bar."""
+        self.assertAlmostEqual(racing_z(30, 2), 2.576, places=3)
+        self.assertGreater(racing_z(60, 2), racing_z(30, 2))
+        self.assertGreater(racing_z(60, 3), racing_z(60, 2))
+
+if __name__ == '__main__':
+    unittest.main()
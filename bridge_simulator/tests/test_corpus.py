@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from bridge_simulator import corpus
+from bridge_simulator.double_dummy import DoubleDummySolver
+from bridge_simulator.simulator import SimulationRunner
+
+PARAMS = {'smart_stack': {'N': {'shape': 'balanced', 'hcp': (15, 17)}}}
+
+class TestCorpus(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, 'corpus.db')
+        corpus.build(cls.path, 6, PARAMS, batch_size=3)
+        cls.corpus = corpus.Corpus(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_answerable(self):
+        """Queries must repeat the corpus constraints and may only add filterable ones."""
+        self.assertEqual(self.corpus.size, 6)
+        self.assertTrue(self.corpus.answerable(PARAMS))
+        self.assertTrue(self.corpus.answerable(dict(PARAMS, hcp={'S': (0, 40)})))
+        self.assertFalse(self.corpus.answerable({'hcp': {'S': (0, 40)}}))
+        self.assertFalse(self.corpus.answerable({'smart_stack': {'N': {'shape': 'balanced', 'hcp': (12, 14)}}}))
+        # The corpus was dealt with no hand fixed
+        self.assertFalse(self.corpus.answerable(dict(PARAMS, predeal={'S': 'K842 QT72 986 52'})))
+        self.assertIsNone(self.corpus.matches(dict(PARAMS, predeal={'S': 'K842 QT72 986 52'}), 1))
+
+    def test_unknown_seats_and_suits_are_not_answerable(self):
+        """Seat and suit keys outside N/E/S/W and S/H/D/C never reach the SQL text."""
+        for extra in ({'hcp': {'s': (0, 40)}},
+                      {'hcp': {'S OR 1=1 --': (0, 40)}},
+                      {'suit_holding': {'S': {'SH': 4}}},
+                      {'suit_holding': {'X': {'S': 4}}},
+                      {'hand_shape': {'NE': [4, 3, 3, 3]}}):
+            self.assertFalse(self.corpus.answerable(dict(PARAMS, **extra)))
+            self.assertIsNone(self.corpus.matches(dict(PARAMS, **extra), 1))
+
+    def test_matches_carry_tricks(self):
+        """Matched deals satisfy the query and need no solving."""
+        deals = self.corpus.matches(dict(PARAMS, hcp={'S': (0, 40)}), 4)
+        self.assertEqual(len(deals), 4)
+        for deal in deals:
+            self.assertTrue(15 <= deal[0].hcp <= 17)
+            self.assertEqual(len(DoubleDummySolver(deal)._tricks), 20)
+        self.assertIsNone(self.corpus.matches(PARAMS, 7))
+
+    def test_suit_holding_is_filtered_in_sql(self):
+        """Minimum suit lengths become conditions on the indexed length columns."""
+        query = dict(PARAMS, suit_holding={'N': {'S': 2}})
+        where, args = self.corpus._where(corpus._normalize(query))
+        self.assertIn('s_n >= ?', where)
+        self.assertEqual(args[-1], 2)
+        # A balanced hand always has two spades
+        self.assertEqual(len(self.corpus.matches(query, 6)), 6)
+
+    def test_rejected_rows_build_no_deal(self):
+        """Rows failing the mask check are skipped before a Deal is built."""
+        with mock.patch.object(corpus.Deal, 'prepare') as prepare:
+            self.assertIsNone(self.corpus.matches(dict(PARAMS, controls={'N': (13, 13)}), 1))
+        prepare.assert_not_called()
+
+    def test_sampling_wraps_around(self):
+        """Paged sampling from a random start reaches every matching deal once."""
+        with mock.patch.object(corpus, 'PAGE_SIZE', 2):
+            deals = self.corpus.matches(PARAMS, 6)
+        self.assertEqual(len({str(deal) for deal in deals}), 6)
+
+    def test_runner_uses_corpus(self):
+        """Runs the corpus can answer are served from it; others fall back to dealing."""
+        runner = SimulationRunner(corpus=self.corpus)
+
+        def callback(deal, solver):
+            return {'tricks': solver.get_tricks("3N", "N")}
+
+        result = runner.run(callback, num_simulations=5, generator_params=PARAMS, mode='sample')
+        self.assertEqual(result['method'], 'corpus')
+        result = runner.run(callback, num_simulations=2, generator_params={'hcp': {'S': (10, 12)}}, mode='sample')
+        self.assertEqual(result['method'], 'monte_carlo')
+
+if __name__ == '__main__':
+    unittest.main()
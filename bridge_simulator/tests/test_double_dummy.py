@@ -1,6 +1,6 @@
 import unittest
 from redeal.redeal import Deal, Hand
-from bridge_simulator.double_dummy import DoubleDummySolver
+from bridge_simulator.double_dummy import DoubleDummySolver, _table_library
 
 class TestDoubleDummySolver(unittest.TestCase):
 
@@ -136,5 +136,26 @@ class TestDoubleDummySolver(unittest.TestCase):
         self.assertEqual(best_contract.tricks, 13)
 
 
+    def test_trick_table_in_one_call(self):
+        """The batched table agrees with single solves and costs one DDS call."""
+        deal = Deal.prepare({})()
+        solver = DoubleDummySolver(deal)
+        table = solver.get_trick_table()
+        self.assertEqual(solver.solves, 1 if _table_library() is not None else 20)
+        single = DoubleDummySolver(deal)
+        for (strain, declarer), tricks in table.items():
+            self.assertEqual(single.get_tricks(f"1{strain}", declarer), tricks)
+        # A second table on the same solver needs no further solves
+        self.assertEqual(solver.get_trick_table(), table)
+        self.assertEqual(solver.solves, 1 if _table_library() is not None else 20)
+
+    def test_levels_share_one_solve(self):
+        """Every level and doubling of a strain is answered from one solve of the deal."""
+        solver = DoubleDummySolver(Deal.prepare({})())
+        tricks = solver.get_tricks("4S", "N")
+        self.assertEqual(solver.get_tricks("2SX", "N"), tricks)
+        solver.get_score("6S", "N", vulnerable=True)
+        self.assertEqual(solver.solves, 1)
+
 if __name__ == '__main__':
     unittest.main()
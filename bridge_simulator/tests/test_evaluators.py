@@ -0,0 +1,41 @@
+import unittest
+from bridge_simulator import evaluators
+
+def masks_of(hand_str):
+    """Masks from a 'S H D C' string, using plain rank characters as holdings."""
+    return evaluators.hand_masks([[] if suit == '-' else list(suit) for suit in hand_str.split()])
+
+class TestEvaluators(unittest.TestCase):
+    def test_tables_cover_every_holding(self):
+        for table in (evaluators.HOLDING_HCP, evaluators.HOLDING_CONTROLS, evaluators.HOLDING_LENGTH,
+                      evaluators.HOLDING_LTC, evaluators.HOLDING_NLTC, evaluators.HOLDING_QUICK_TRICKS):
+            self.assertEqual(len(table), 8192)
+        full_suit = evaluators.NUM_HOLDINGS - 1
+        self.assertEqual(evaluators.HOLDING_HCP[full_suit], 10)
+        self.assertEqual(evaluators.HOLDING_LENGTH[full_suit], 13)
+        self.assertEqual(evaluators.HOLDING_LTC[full_suit], 0)
+
+    def test_hand_features(self):
+        masks = masks_of('AKQ K2 A Q34')
+        self.assertEqual(evaluators.hcp(masks), 9 + 3 + 4 + 2)
+        self.assertEqual(evaluators.controls(masks), 6)
+        self.assertEqual(evaluators.shape(masks), (3, 2, 1, 3))
+        # AKQ=0, Kx=1, A=0, Qxx=2
+        self.assertEqual(evaluators.losers(masks), 3)
+        # AKQ=0, Kx=1.5, A=0, Qxx=2.5
+        self.assertEqual(evaluators.new_losers(masks), 4.0)
+        # AK=2, Kx=0.5, A=1, Q=0
+        self.assertEqual(evaluators.quick_tricks(masks), 3.5)
+
+    def test_losing_trick_count_by_length(self):
+        cases = {
+            'A': 0, 'K': 1, '2': 1,
+            'AK': 0, 'AQ': 1, 'KQ': 1, 'Q2': 2,
+            'AKQ': 0, 'AKJ': 1, 'KQ2': 1, 'QJT9': 2, '5432': 3,
+        }
+        for holding, expected in cases.items():
+            mask = evaluators.holding_mask(holding)
+            self.assertEqual(evaluators.HOLDING_LTC[mask], expected, holding)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from bridge_simulator import exhaustive, frequency
+
+class TestExhaustive(unittest.TestCase):
+    def test_count_layouts(self):
+        """Layouts are the multinomial split of the unknown cards over the open seats."""
+        self.assertEqual(exhaustive.count_layouts({
+            'N': 'AKQJ AKQ AKQ AKQ', 'E': 'T98 JT98 JT9 JT9', 'S': '765 765 8765 876'}), 1)
+        # Two hands known: 26 cards split 13/13 between E and W
+        self.assertEqual(exhaustive.count_layouts({
+            'N': 'AKQJ AKQ AKQ AKQ', 'S': '765 765 8765 876'}), 10400600)
+
+    def test_every_layout_once(self):
+        """Each layout is produced exactly once, with complete 13-card hands."""
+        predeal = {'N': 'AKQJ AKQ AKQ AK', 'E': 'T98 JT98 JT9 JT9', 'S': '765 765 8765 87'}
+        total = exhaustive.count_layouts(predeal)
+        north = frequency.parse_hand(predeal['N'])
+        layouts = list(exhaustive.iter_layouts(predeal))
+        self.assertEqual(len(layouts), total)
+        self.assertEqual(len(set(layouts)), total)
+        for layout in layouts:
+            self.assertEqual([sum(m.bit_count() for m in hand) for hand in layout], [13] * 4)
+            self.assertTrue(all(have & known == known for have, known in zip(layout[0], north)))
+
+    def test_chunks_cover_all_layouts(self):
+        """Chunked walks concatenate to the full walk."""
+        predeal = {'N': 'AKQJ AKQ AKQ AK', 'E': 'T98 JT98 JT9 JT', 'S': '765 765 8765 87'}
+        full = list(exhaustive.iter_layouts(predeal))
+        ranges = exhaustive.chunk_ranges(len(full), 4)
+        chunked = [layout for start, stop in ranges
+                   for layout in exhaustive.iter_layouts(predeal, start, stop)]
+        self.assertEqual(chunked, full)
+
+    def test_chunk_starts_at_its_layout(self):
+        """A chunk starting anywhere yields the same layouts as the full walk there."""
+        predeal = {'N': 'AKQJ AKQ AKQ AK', 'E': 'T98 JT98 JT9 JT', 'S': '765 765 8765 87'}
+        full = list(exhaustive.iter_layouts(predeal))
+        for start in (1, 11, 1000, len(full) - 1):
+            self.assertEqual(list(exhaustive.iter_layouts(predeal, start, start + 5)), full[start:start + 5])
+        self.assertEqual(list(exhaustive.iter_layouts(predeal, len(full), len(full) + 5)), [])
+        # The last of ten million layouts is reached without walking the others
+        two_known = {'N': 'AKQJ AKQ AKQ AKQ', 'S': '765 765 8765 876'}
+        first = next(exhaustive.iter_layouts(two_known))
+        last = list(exhaustive.iter_layouts(two_known, 10400599))
+        # East's first choice is West's last, and the other way round
+        self.assertEqual(last, [(first[0], first[3], first[2], first[1])])
+
+if __name__ == '__main__':
+    unittest.main()
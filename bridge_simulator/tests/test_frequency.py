@@ -0,0 +1,72 @@
+import unittest
+from itertools import combinations
+from math import comb
+from bridge_simulator import evaluators, frequency
+
+class TestFrequency(unittest.TestCase):
+    def test_known_frequencies(self):
+        """Textbook hand-pattern and honor frequencies are reproduced exactly."""
+        self.assertAlmostEqual(frequency.probability(any_shape={'N': '(4432)'}), 0.215512, places=6)
+        self.assertAlmostEqual(frequency.probability(any_shape={'N': 'balanced'}), 0.476042, places=6)
+        # All four aces and all four kings: the other 5 cards from the remaining 44
+        self.assertAlmostEqual(frequency.probability(controls={'N': (12, 12)}),
+                               comb(44, 5) / comb(52, 13))
+        self.assertEqual(frequency.probability(hcp={'N': (0, 37)}), 1.0)
+        self.assertEqual(frequency.probability(), 1.0)
+
+    def test_shape_patterns(self):
+        """Digits fix a suit, 'x' is any length, parentheses allow any order."""
+        self.assertIn((5, 5, 2, 1), frequency.shape_lengths('(55)xx'))
+        self.assertNotIn((5, 2, 5, 1), frequency.shape_lengths('(55)xx'))
+        self.assertEqual(len(frequency.shape_lengths('(4432)')), 12)
+        self.assertEqual(frequency.shape_lengths('4333'), {(4, 3, 3, 3)})
+        with self.assertRaises(ValueError):
+            frequency.shape_lengths('44')
+
+    def test_matches_brute_force_with_predeal(self):
+        """With most cards predealt, counting every completion gives the same answer."""
+        predeal = {'N': 'AK2 QJ32 T98 -', 'E': 'QJT9 AK K2 5432', 'S': '8765 987 AQJ6 K'}
+        constraints = dict(hcp={'W': (4, 8)}, any_shape={'W': 'x(44)x'}, controls={'W': (1, 3)})
+        known = [evaluators.holding_mask('43'), evaluators.holding_mask('T654'), 0, 0]
+        predeal['W'] = '43 T654 - -'
+        masks = [frequency.parse_hand(h) for h in predeal.values()]
+        pool = [(s, r) for s in range(4) for r in evaluators.RANK_ORDER
+                if not any(m[s] & evaluators.RANK_BITS[r] for m in masks)]
+        need = 13 - sum(m.bit_count() for m in known)
+        hits = 0
+        for cards in combinations(pool, need):
+            hand = list(known)
+            for s, r in cards:
+                hand[s] |= evaluators.RANK_BITS[r]
+            shape = evaluators.shape(hand)
+            if (4 <= evaluators.hcp(hand) <= 8 and shape[1] == 4 and shape[2] == 4
+                    and 1 <= evaluators.controls(hand) <= 3):
+                hits += 1
+        expected = hits / comb(len(pool), need)
+        self.assertAlmostEqual(frequency.probability(predeal=predeal, **constraints), expected)
+
+    def test_smart_stack_and_distribution(self):
+        """SmartStack regions are counted, and distributions sum to the probability."""
+        smart_stack = {'N': {'shape': 'balanced', 'hcp': (15, 17)}}
+        p = frequency.probability(smart_stack=smart_stack)
+        by_hcp = frequency.distribution('hcp', smart_stack=smart_stack)
+        self.assertEqual(sorted(by_hcp), [15, 16, 17])
+        self.assertAlmostEqual(sum(by_hcp.values()), p)
+
+    def test_expected_hcp(self):
+        """Expected HCP of all four seats add up to 40, with the predeal respected."""
+        params = dict(smart_stack={'N': {'shape': 'balanced', 'hcp': (15, 17)}},
+                      predeal={'S': 'K842 QT72 986 52'})
+        expected = {seat: frequency.expected_hcp(seat, **params) for seat in 'NESW'}
+        self.assertAlmostEqual(sum(expected.values()), 40)
+        self.assertEqual(expected['S'], 5)
+        self.assertAlmostEqual(expected['E'], expected['W'])
+        self.assertTrue(15 <= expected['N'] <= 17)
+
+    def test_rejects_several_seats(self):
+        """Constraints on two seats are not independent and are refused."""
+        with self.assertRaises(ValueError):
+            frequency.probability(hcp={'N': (15, 17), 'S': (8, 9)})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,7 @@
+import random
 import unittest
+from unittest import mock
+from bridge_simulator import hand_generator
 from bridge_simulator.hand_generator import BridgeHandGenerator
 from redeal.redeal import Suit, Rank, Card, Hand
 from redeal.redeal import Hand as RedealHand # Not strictly needed due to MockHand
@@ -247,6 +250,20 @@ class TestBridgeHandGenerator(unittest.TestCase):
         else:
             print("Skipping controls_parameter test: No hand generated with W:(6,7) Controls.")
 
+    def test_losers_parameter(self):
+        """hand_losers filters on the losing-trick count."""
+        hands = self.generator.generate_hands(num_hands=5, hand_losers={'N': (5, 6)})
+        self.assertGreater(len(hands), 0, "Should generate hands with a losers constraint")
+        for hand_deal in hands:
+            north = hand_deal['N']
+            hand_str = ' '.join(''.join(north[s]) or '-' for s in ['S', 'H', 'D', 'C'])
+            losers = self.generator._calculate_losers(Hand.from_str(hand_str))
+            self.assertTrue(5 <= losers <= 6, f"North losers {losers} not in range (5,6)")
+
+    def test_calculate_losers(self):
+        # AKQ=0, Kx=1, A=0, Qxx=2
+        self.assertEqual(self.generator._calculate_losers(Hand.from_str('AKQ K2 A Q34')), 3)
+
     #     if hands:
     #         north_hand_dict = hands[0]['N']
     #         north_hand_obj = self._get_hand_obj_from_str_lists(
@@ -399,5 +416,113 @@ class TestBridgeHandGenerator(unittest.TestCase):
             self.assertGreaterEqual(hcp, 15)
             self.assertLessEqual(hcp, 17)
 
+    def test_hand_summary_takes_deal(self):
+        """get_hand_summary works on an explicit deal; the generator keeps no state."""
+        deal = next(self.generator.yield_deals(num_hands=1, predeal={'N': 'AKT KJ84 QJ5 432'}))
+        summary = self.generator.get_hand_summary(deal)
+        self.assertEqual(summary['N'], {'S': 3, 'H': 4, 'D': 3, 'C': 3})
+        for player in ['E', 'S', 'W']:
+            self.assertEqual(sum(summary[player].values()), 13)
+        self.assertFalse(hasattr(self.generator, 'deal'))
+
+    def test_seeded_deals(self):
+        """Seeded deals follow from the rng alone, meet the constraints and leave the module generator alone."""
+        params = {'smart_stack': {'N': {'shape': 'balanced', 'hcp': (15, 17)}}, 'predeal': {'S': 'K842 QT72 986 52'}}
+        before = random.getstate()
+        first = [str(deal) for deal in self.generator.yield_seeded_deals(random.Random(3), num_hands=5, **params)]
+        self.assertEqual(random.getstate(), before)
+        random.seed(1)
+        second = [str(deal) for deal in self.generator.yield_seeded_deals(random.Random(3), num_hands=5, **params)]
+        self.assertEqual(first, second)
+        for deal in self.generator.yield_seeded_deals(random.Random(4), num_hands=5, **params):
+            self.assertTrue(15 <= deal.north.hcp <= 17)
+            self.assertLessEqual(max(len(suit) for suit in deal.north), 5)
+            self.assertEqual(self.generator.get_hand_summary(deal)['S'], {'S': 4, 'H': 4, 'D': 3, 'C': 2})
+
+    def test_seeded_smart_stack_is_drawn(self):
+        """A rare SmartStack seat is drawn from its region, and a hopeless run stops at MAX_ATTEMPTS."""
+        params = {'smart_stack': {'N': {'shape': 'balanced', 'hcp': (22, 24)}}}
+        deals = list(self.generator.yield_seeded_deals(random.Random(5), num_hands=10, **params))
+        self.assertEqual(len(deals), 10)
+        for deal in deals:
+            self.assertTrue(22 <= deal.north.hcp <= 24)
+            self.assertLessEqual(max(len(suit) for suit in deal.north), 5)
+
+        with mock.patch.object(hand_generator, 'MAX_ATTEMPTS', 300), \
+                mock.patch.object(hand_generator.metrics, 'record_deals') as record_deals:
+            # 22+ opposite 30+ cannot be dealt
+            deals = list(self.generator.yield_seeded_deals(random.Random(5), num_hands=5,
+                                                           hcp={'E': (30, 37)}, **params))
+        self.assertEqual(deals, [])
+        self.assertEqual(sum(call.args[0] for call in record_deals.call_args_list), 300)
+
+    def test_seeded_smart_stack_follows_its_region(self):
+        """Seeded SmartStack hands have the exact pattern frequencies of their region."""
+        from collections import Counter
+        from bridge_simulator import frequency
+        # South's honors make North's hcp depend strongly on its shape
+        params = {'predeal': {'S': 'AKQJ AKQJ AK AK'},
+                  'smart_stack': {'N': {'shape': 'balanced', 'hcp': (3, 6)}}}
+        deals = list(self.generator.yield_seeded_deals(random.Random(3), num_hands=4000, **params))
+        counts = Counter(tuple(sorted((len(suit) for suit in deal.north), reverse=True)) for deal in deals)
+        exact = frequency.distribution('pattern', seat='N', **params)
+        total = sum(exact.values())
+        for pattern, p in exact.items():
+            self.assertAlmostEqual(counts[pattern] / len(deals), p / total, delta=0.02)
+
+    def test_concurrent_generation(self):
+        """A shared generator serves concurrent threads with SmartStack and plain constraints."""
+        from concurrent.futures import ThreadPoolExecutor
+        jobs = [
+            {'smart_stack': {'N': {'shape': 'balanced', 'hcp': (15, 17)}}},
+            {'smart_stack': {'N': {'shape': 'balanced', 'hcp': (15, 17)}}, 'predeal': {'S': 'K842 QT72 986 52'}},
+            {'hcp': {'E': (10, 20)}},
+        ] * 4
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda params: self.generator.generate_hands(num_hands=10, **params), jobs))
+        for params, hands in zip(jobs, results):
+            self.assertEqual(len(hands), 10)
+            for hand in hands:
+                if 'predeal' in params:
+                    self.assertEqual(sorted(hand['S']['S']), sorted('K842'))
+
+    def test_smart_stack_cache_is_bounded(self):
+        """Each predeal gets its own SmartStack; the least recently used are evicted."""
+        from unittest import mock
+        from bridge_simulator import hand_generator
+        with mock.patch.object(hand_generator, 'SMART_STACK_CACHE_SIZE', 2), \
+                mock.patch.object(hand_generator, '_smart_stack_cache', hand_generator.OrderedDict()):
+            for south in ('K842 QT72 986 52', 'AQ4 KT72 986 J52', 'J9 Q8765 T98 652'):
+                self.generator.generate_hands(num_hands=2, predeal={'S': south},
+                                              smart_stack={'N': {'shape': 'balanced', 'hcp': (15, 17)}})
+            cached = list(hand_generator._smart_stack_cache)
+        self.assertEqual(len(cached), 2)
+        self.assertEqual(cached[-1][3], (('S', 'J9 Q8765 T98 652'),))
+
+    def test_warm_up_prebuilds_predealt_stacks(self):
+        """The predealt Stayman scenario finds its SmartStack already built after warm-up."""
+        from bridge_simulator import warmup
+        with mock.patch.object(hand_generator, '_smart_stack_cache', hand_generator.OrderedDict()):
+            warmup.warm_up()
+            with mock.patch.object(hand_generator.metrics, 'record_cache') as record_cache:
+                self.generator.generate_hands(num_hands=2, predeal={'S': 'K842 QT72 986 52'},
+                                              smart_stack={'N': {'shape': 'balanced', 'hcp': (15, 17)}})
+        record_cache.assert_called_once_with('smart_stack', True)
+
+    def test_weighted_deals_reach_rare_regions(self):
+        """
+        Importance sampling: every deal satisfies the constraints, weights are
+        positive, and the weighted mean HCP matches the exact expectation.
+        """
+        from bridge_simulator import frequency
+        pairs = list(self.generator.yield_weighted_deals(num_hands=400, hcp={'N': (22, 37)}))
+        self.assertEqual(len(pairs), 400)
+        total = sum(w for _, w in pairs)
+        mean = sum(deal[0].hcp * w for deal, w in pairs) / total
+        for deal, weight in pairs:
+            self.assertGreaterEqual(deal[0].hcp, 22)
+            self.assertGreater(weight, 0)
+        self.assertAlmostEqual(mean, frequency.expected_hcp('N', hcp={'N': (22, 37)}), delta=0.5)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
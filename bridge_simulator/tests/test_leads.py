@@ -0,0 +1,43 @@
+import unittest
+from unittest import mock
+from bridge_simulator import leads
+
+class TestLeads(unittest.TestCase):
+    def test_lead_groups(self):
+        """Touching cards in a suit form one lead, represented by the highest."""
+        groups = leads.lead_groups('KQJ72 A T986 432')
+        self.assertEqual(groups['SK'], ['SK', 'SQ', 'SJ'])
+        self.assertEqual(groups['DT'], ['DT', 'D9', 'D8'])
+        self.assertEqual(groups['C4'], ['C4', 'C3', 'C2'])
+        self.assertEqual(sorted(groups), sorted(['SK', 'S7', 'S2', 'HA', 'DT', 'D6', 'C4']))
+        with self.assertRaises(ValueError):
+            leads.lead_groups('KQJ72 A T986 43')
+
+    def test_summarize_leads(self):
+        """Leads are ranked by the chance of setting the contract."""
+        groups = {'SK': ['SK', 'SQ'], 'S7': ['S7']}
+        per_deal = [{'SK': 9, 'S7': 10}, {'SK': 10, 'S7': 10}]
+        stats, ranking = leads.summarize_leads(per_deal, groups, needed=10)
+        self.assertEqual(stats['SK']['set_probability'], 0.5)
+        self.assertEqual(stats['S7']['set_probability'], 0.0)
+        self.assertEqual(stats['SK']['tricks']['mean'], 9.5)
+        self.assertEqual(ranking, ['SK', 'S7'])
+
+    def test_failed_deals_are_reported(self):
+        """A deal that fails to solve is counted with its error, not silently dropped."""
+        groups = {'SK': ['SK']}
+        with mock.patch.object(leads, 'solve_leads', side_effect=[{'SK': 9}, ValueError('bad strain')]):
+            solved, errors = leads.solve_deals(['deal 1', 'deal 2'], 'N', 'W', groups)
+        self.assertEqual(solved, [{'SK': 9}])
+        self.assertEqual(errors, ['bad strain'])
+
+    def test_study_with_no_solved_deal_raises(self):
+        """A failure on every deal is an error, not an empty ranking."""
+        from bridge_simulator.simulator import SimulationRunner
+        with mock.patch.object(leads, 'solve_leads', side_effect=ValueError('DDS error')):
+            with self.assertRaises(RuntimeError):
+                SimulationRunner().run_lead_study('3NT', 'S', num_simulations=3,
+                                                  generator_params={'predeal': {'W': 'KQJ72 A T986 432'}})
+
+if __name__ == '__main__':
+    unittest.main()
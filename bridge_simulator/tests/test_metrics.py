@@ -0,0 +1,99 @@
+import os
+import json
+import tempfile
+import threading
+import unittest
+from bridge_simulator.metrics import MetricsRegistry, DDS_BUCKETS
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_counters_merge_across_workers(self):
+        """Two workers writing to the same directory are summed on render."""
+        worker_a = MetricsRegistry(self.tmp.name, pid=os.getpid())
+        worker_b = MetricsRegistry(self.tmp.name, pid=os.getpid() + 100000)
+
+        worker_a.inc('bridge_deals_generated_total', 300)
+        worker_a.inc('bridge_deals_accepted_total', 30)
+        worker_b.inc('bridge_deals_generated_total', 100)
+        worker_b.inc('bridge_deals_accepted_total', 70)
+        worker_b.flush()
+
+        text = worker_a.render()
+        self.assertIn('bridge_deals_generated_total 400', text)
+        self.assertIn('bridge_deals_accepted_total 100', text)
+        self.assertIn('bridge_deal_acceptance_ratio 0.25', text)
+
+    def test_concurrent_flushes(self):
+        """Threads flushing at once never leave a torn or stale snapshot behind."""
+        registry = MetricsRegistry(self.tmp.name, pid=os.getpid(), flush_interval=0)
+
+        def work():
+            for _ in range(200):
+                registry.inc('bridge_deals_generated_total')
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        registry.flush()
+        with open(registry.snapshot_path()) as f:
+            counters = json.load(f)['counters']
+        self.assertEqual(counters, [['bridge_deals_generated_total', [], 1600]])
+        self.assertEqual(os.listdir(self.tmp.name), [os.path.basename(registry.snapshot_path())])
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry(self.tmp.name, pid=os.getpid())
+        registry.observe('bridge_dds_solve_seconds', 0.0007, DDS_BUCKETS, kind='tricks')
+        registry.observe('bridge_dds_solve_seconds', 0.02, DDS_BUCKETS, kind='tricks')
+        registry.observe('bridge_dds_solve_seconds', 10.0, DDS_BUCKETS, kind='tricks')
+
+        text = registry.render()
+        self.assertIn('# TYPE bridge_dds_solve_seconds histogram', text)
+        self.assertIn('bridge_dds_solve_seconds_bucket{kind="tricks",le="0.001"} 1', text)
+        self.assertIn('bridge_dds_solve_seconds_bucket{kind="tricks",le="0.025"} 2', text)
+        self.assertIn('bridge_dds_solve_seconds_bucket{kind="tricks",le="+Inf"} 3', text)
+        self.assertIn('bridge_dds_solve_seconds_count{kind="tricks"} 3', text)
+
+    def test_gauges_of_dead_workers_are_dropped(self):
+        """Queue depth must not include requests of a worker that no longer exists."""
+        live = MetricsRegistry(self.tmp.name, pid=os.getpid())
+        dead = MetricsRegistry(self.tmp.name, pid=2 ** 22 + 12345)
+        live.add_gauge('bridge_http_requests_in_flight', 1, endpoint='/api/simulate')
+        dead.add_gauge('bridge_http_requests_in_flight', 5, endpoint='/api/simulate')
+        dead.inc('bridge_cache_requests_total', cache='dds', result='hit')
+        dead.inc('bridge_cache_requests_total', cache='dds', result='miss')
+        dead.flush()
+
+        text = live.render()
+        self.assertIn('bridge_http_requests_in_flight{endpoint="/api/simulate"} 1', text)
+        self.assertIn('bridge_cache_hit_ratio{cache="dds"} 0.5', text)
+
+    def test_dead_workers_are_archived(self):
+        """Snapshots of exited workers fold into the archive; totals never go backwards."""
+        live = MetricsRegistry(self.tmp.name, pid=os.getpid())
+        dead_pid = 2 ** 22 + 12345
+        old = MetricsRegistry(self.tmp.name, pid=dead_pid)
+        old.inc('bridge_deals_generated_total', 10)
+        old.observe('bridge_dds_solve_seconds', 0.02, DDS_BUCKETS, kind='tricks')
+        old.flush()
+        # A new worker reusing the PID starts from zero in its own file
+        reused = MetricsRegistry(self.tmp.name, pid=dead_pid)
+        reused.inc('bridge_deals_generated_total', 3)
+        reused.flush()
+        self.assertNotEqual(reused.snapshot_path(), old.snapshot_path())
+
+        text = live.render()
+        self.assertIn('bridge_deals_generated_total 13', text)
+        self.assertIn('bridge_dds_solve_seconds_count{kind="tricks"} 1', text)
+        names = os.listdir(self.tmp.name)
+        self.assertIn('metrics_archive.json', names)
+        self.assertNotIn(os.path.basename(old.snapshot_path()), names)
+        # Rendering again does not count the archived workers twice
+        self.assertIn('bridge_deals_generated_total 13', live.render())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from bridge_simulator import par
+
+def table(ns, ew):
+    """Trick table where both members of a side take the same tricks, strains C D H S N."""
+    tricks = {}
+    for strain, ns_tricks, ew_tricks in zip('CDHSN', ns, ew):
+        for seat in 'NS':
+            tricks[(strain, seat)] = ns_tricks
+        for seat in 'EW':
+            tricks[(strain, seat)] = ew_tricks
+    return tricks
+
+class TestPar(unittest.TestCase):
+    def test_making_contract(self):
+        """The best making contract is par when a sacrifice costs more."""
+        result = par.par([table([7, 7, 3, 10, 7], [6, 6, 6, 3, 6])], 'N', 'none')
+        self.assertEqual(result, {'score': [420], 'contract': ['4SN']})
+
+    def test_sacrifice(self):
+        """A cheap sacrifice over the opponents' game is par, priced by vulnerability."""
+        tables = [table([7, 7, 3, 10, 7], [6, 6, 9, 3, 6])]
+        self.assertEqual(par.par(tables, 'N', 'none'), {'score': [300], 'contract': ['5HXE']})
+        self.assertEqual(par.par(tables, 'N', 'both')['score'], [500])
+        # Vulnerable against not, the sacrifice costs 500 and the game is only worth 420
+        self.assertEqual(par.par(tables, 'N', 'EW'), {'score': [420], 'contract': ['4SN']})
+
+    def test_dealer_side_first(self):
+        """When both sides make 1NT, the dealer's side plays it."""
+        tables = [table([7, 6, 6, 6, 7], [6, 6, 6, 7, 7])]
+        self.assertEqual(par.par(tables, 'S', 'none'), {'score': [90], 'contract': ['1NS']})
+        self.assertEqual(par.par(tables, 'W', 'none'), {'score': [-90], 'contract': ['1NW']})
+
+    def test_batch(self):
+        """par_all covers every dealer and vulnerability for a batch of deals."""
+        tables = [table([13] * 5, [0] * 5), table([6] * 5, [6] * 5)]
+        result = par.par_all(tables)
+        self.assertEqual(set(result), set('NESW'))
+        self.assertEqual(result['E']['both']['score'], [2220, 0])
+        self.assertEqual(result['E']['both']['contract'], ['7NS', 'PASS'])
+
+    def test_make_table(self):
+        """Make probabilities and trick histograms per declarer and strain."""
+        tables = [table([7, 7, 3, 10, 7], [6, 6, 10, 3, 6]), table([8, 7, 3, 9, 7], [5, 6, 10, 4, 6])]
+        result = par.make_table(tables)
+        self.assertEqual(result['N']['S']['histogram'], {'9': 1, '10': 1})
+        self.assertEqual(result['N']['S']['mean'], 9.5)
+        self.assertEqual(result['S']['S']['make']['3'], 1.0)
+        self.assertEqual(result['S']['S']['make']['4'], 0.5)
+        self.assertEqual(result['W']['H']['make']['4'], 1.0)
+        self.assertEqual(result['E']['C']['make']['1'], 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+from bridge_simulator import scoring
+
+class TestScoring(unittest.TestCase):
+    def test_known_scores(self):
+        """The table matches the duplicate scoring rules."""
+        self.assertEqual(scoring.score_contract('4S', False, 10), 420)
+        self.assertEqual(scoring.score_contract('4S', True, 11), 650)
+        self.assertEqual(scoring.score_contract('3NT', False, 9), 400)
+        self.assertEqual(scoring.score_contract('1N', False, 7), 90)
+        self.assertEqual(scoring.score_contract('2CX', False, 8), 180)
+        self.assertEqual(scoring.score_contract('6H', True, 12), 1430)
+        self.assertEqual(scoring.score_contract('7NT', False, 13), 1520)
+        self.assertEqual(scoring.score_contract('4HX', False, 6), -800)
+        self.assertEqual(scoring.score_contract('4HX', True, 7), -800)
+        self.assertEqual(scoring.score_contract('1SXX', False, 9), 920)
+        self.assertEqual(scoring.score_contract('PASS', True, 0), 0)
+
+    def test_vectorized_score(self):
+        """Arrays of results are scored in one lookup."""
+        level, strain, doubled = scoring.parse_contract('4S')
+        tricks = np.array([8, 9, 10, 11])
+        scores = scoring.score(level, strain, doubled, [False, False, True, True], tricks)
+        self.assertEqual(scores.tolist(), [-100, -50, 620, 650])
+
+    def test_side_vulnerable(self):
+        """Board vulnerability resolves to the declaring side's."""
+        self.assertTrue(scoring.side_vulnerable('NS', 'S'))
+        self.assertFalse(scoring.side_vulnerable('NS', 'E'))
+        self.assertTrue(scoring.side_vulnerable('both', 'W'))
+        self.assertFalse(scoring.side_vulnerable('none', 'N'))
+        self.assertTrue(scoring.side_vulnerable(True, 'E'))
+        with self.assertRaises(ValueError):
+            scoring.side_vulnerable('all', 'N')
+
+    def test_imps(self):
+        """Differences map onto the IMP scale with their sign."""
+        self.assertEqual(scoring.imps([0, 10, 20, -50, 420, -4000, 5000]).tolist(),
+                         [0, 0, 1, -2, 9, -24, 24])
+
+    def test_matchpoints(self):
+        """Each result scores 1 per result beaten and 1/2 per tie, as a fraction of the field."""
+        mp = scoring.matchpoints([[420, 450, 420, -50]])
+        self.assertEqual(mp.tolist(), [[0.5, 1.0, 0.5, 0.0]])
+
+    def test_derived_results(self):
+        """Comparison results gain IMP and matchpoint series."""
+        derived = scoring.derived_results({
+            'A_score': [420, -50], 'B_score': [170, -50], 'diff_A_minus_B': [250, 0]})
+        self.assertEqual(derived['imps_A_minus_B'], [6, 0])
+        self.assertEqual(derived['mp_A'], [1.0, 0.5])
+        self.assertEqual(derived['mp_B'], [0.0, 0.5])
+
+if __name__ == '__main__':
+    unittest.main()
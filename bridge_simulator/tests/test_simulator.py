@@ -1,5 +1,5 @@
 import unittest
-from bridge_simulator.simulator import SimulationRunner
+from bridge_simulator.simulator import CV_MIN_PILOT_DEALS, SimulationRunner
 from bridge_simulator.double_dummy import DoubleDummySolver
 from redeal.redeal import Deal, Hand
 
@@ -52,5 +52,171 @@ class TestSimulationRunner(unittest.TestCase):
         self.assertEqual(min_diff, 0)
         self.assertEqual(max_diff, 0)
 
+    def test_exhaustive_mode(self):
+        """
+        With three hands predealt the last hand is forced: auto mode enumerates
+        the single layout and reports exact statistics.
+        """
+        runner = SimulationRunner()
+        generator_params = {'predeal': {
+            'N': 'AKQJ AKQ AKQ AKQ',
+            'E': 'T98 JT98 JT9 JT9',
+            'S': '765 765 8765 876',
+        }}
+
+        def callback(deal, solver):
+            return {'tricks_7nt': solver.get_tricks("7N", "N")}
+
+        result = runner.run(callback, num_simulations=50, generator_params=generator_params)
+        self.assertEqual(result['method'], 'exhaustive')
+        self.assertEqual(result['layouts'], 1)
+        self.assertEqual(result['simulations_run'], 1)
+        self.assertEqual(result['stats']['tricks_7nt']['mean'], 13)
+        self.assertEqual(result['stats']['tricks_7nt']['stdev'], 0)
+
+    def test_stratified_mode(self):
+        """
+        Stratifying a 15-17 balanced North by HCP gives one stratum per value,
+        weighted by its exact frequency, and every stratum is dealt.
+        """
+        runner = SimulationRunner()
+
+        def callback(deal, solver):
+            return {'north_hcp': deal[0].hcp}
+
+        generator_params = {'smart_stack': {'N': {'shape': 'balanced', 'hcp': (15, 17)}}}
+        result = runner.run(callback, num_simulations=30, generator_params=generator_params,
+                            mode='stratified', stratify_by='hcp')
+        self.assertEqual(result['method'], 'stratified')
+        self.assertEqual(result['weights'], 'exact')
+        self.assertEqual([s['values'] for s in result['strata']], [[15], [16], [17]])
+        self.assertEqual(result['simulations_run'], 30)
+        # Within each stratum North's HCP is constant, so the estimate has no error
+        self.assertAlmostEqual(result['stats']['north_hcp']['stderr'], 0.0)
+        expected = sum(s['weight'] * s['values'][0] for s in result['strata'])
+        self.assertAlmostEqual(result['stats']['north_hcp']['mean'], expected)
+
+    def test_control_variates(self):
+        """
+        A result that is exactly the control feature is estimated without error,
+        at the exact expectation of the feature.
+        """
+        runner = SimulationRunner()
+
+        def callback(deal, solver):
+            return {'ns_hcp': deal[0].hcp + deal[2].hcp}
+
+        generator_params = {'smart_stack': {'N': {'shape': 'balanced', 'hcp': (15, 17)}}}
+        result = runner.run(callback, num_simulations=20, generator_params=generator_params,
+                            mode='sample', control_variates=['hcp:NS'])
+        info = result['control_variates']['hcp:NS']
+        self.assertEqual(info['source'], 'exact')
+        stats = result['stats']['ns_hcp']
+        self.assertAlmostEqual(stats['cv_mean'], info['expectation'])
+        self.assertAlmostEqual(stats['cv_stderr'], 0.0)
+
+    def test_control_variate_pilot_is_cached(self):
+        """Fit expectations come from a pilot sized to the run, reused by the next request."""
+        runner = SimulationRunner()
+
+        def callback(deal, solver):
+            return {'north_hcp': deal[0].hcp}
+
+        generator_params = {'predeal': {'S': 'K842 QT72 986 52'}, 'hcp': {'N': (12, 14)}}
+        first = runner.run(callback, num_simulations=5, generator_params=generator_params,
+                           mode='sample', control_variates=['fit:NS'])
+        self.assertEqual(first['control_variates']['fit:NS']['source'], f'pilot ({CV_MIN_PILOT_DEALS} deals)')
+        second = runner.run(callback, num_simulations=5, generator_params=generator_params,
+                            mode='sample', control_variates=['fit:NS'])
+        self.assertEqual(second['control_variates']['fit:NS']['source'], f'pilot ({CV_MIN_PILOT_DEALS} deals, cached)')
+        self.assertEqual(second['control_variates']['fit:NS']['expectation'],
+                         first['control_variates']['fit:NS']['expectation'])
+
+    def test_weighted_mode(self):
+        """
+        A rare East 6-5 hand is simulated with importance weights.
+        """
+        runner = SimulationRunner()
+
+        def callback(deal, solver):
+            return {'east_spades': len(deal[1].spades)}
+
+        generator_params = {'any_shape': {'E': '65xx'}}
+        result = runner.run(callback, num_simulations=20, generator_params=generator_params, mode='weighted')
+        self.assertEqual(result['method'], 'importance')
+        self.assertEqual(result['simulations_run'], 20)
+        self.assertEqual(result['stats']['east_spades']['mean'], 6)
+        self.assertGreater(result['effective_sample_size'], 0)
+
+    def test_weighted_mode_tempering_is_opt_in(self):
+        """
+        By default bins keep their natural rates, so no deal is down-weighted;
+        a lower temper trades effective sample size for rare-bin coverage.
+        """
+        runner = SimulationRunner()
+
+        def callback(deal, solver):
+            return {'north_hcp': deal[0].hcp}
+
+        generator_params = {'smart_stack': {'N': {'shape': 'balanced', 'hcp': (20, 27)}}}
+        natural = runner.run(callback, num_simulations=40, generator_params=generator_params, mode='weighted')
+        self.assertEqual(natural['temper'], 1.0)
+        self.assertAlmostEqual(natural['effective_sample_size'], 40)
+        tempered = runner.run(callback, num_simulations=40, generator_params=generator_params,
+                              mode='weighted', temper=0.5)
+        self.assertEqual(tempered['temper'], 0.5)
+        self.assertLess(tempered['effective_sample_size'], 40)
+
+    def test_vulnerability_sweep(self):
+        """
+        All four vulnerabilities are scored from one solve per strain and declarer.
+        """
+        runner = SimulationRunner()
+        solvers = []
+
+        def make_callback(vulnerability):
+            def callback(deal, solver):
+                solvers.append(solver)
+                return {'score_4s': solver.get_score("4S", "N", vulnerable=vulnerability)}
+            return callback
+
+        generator_params = {'smart_stack': {'N': {'shape': 'balanced', 'hcp': (12, 14)}}}
+        result = runner.run_sweep(make_callback, num_simulations=5, generator_params=generator_params)
+        self.assertEqual(set(result['vulnerabilities']), {'none', 'NS', 'EW', 'both'})
+        self.assertEqual(result['vulnerabilities']['none'], result['vulnerabilities']['EW'])
+        self.assertTrue(all(len(solver._tricks) == 1 for solver in solvers))
+
+    def test_par_stats(self):
+        """
+        Par is reported for every dealer and vulnerability from the cached tables.
+        """
+        runner = SimulationRunner()
+
+        def callback(deal, solver):
+            return {'tricks_4s': solver.get_tricks("4S", "N")}
+
+        generator_params = {'smart_stack': {'N': {'shape': 'balanced', 'hcp': (20, 21)}}}
+        result = runner.run(callback, num_simulations=3, generator_params=generator_params,
+                            mode='sample', with_par=True)
+        self.assertNotIn('_trick_table', result['stats'])
+        self.assertEqual(set(result['par']), {'N', 'E', 'S', 'W'})
+        self.assertEqual(sum(result['par']['N']['none']['contract'].values()), 3)
+
+    def test_lead_study(self):
+        """
+        Every lead group of the fixed leader hand is scored against the contract.
+        """
+        runner = SimulationRunner()
+        generator_params = {
+            'predeal': {'W': 'KQJ72 A T986 432'},
+            'smart_stack': {'S': {'shape': 'balanced', 'hcp': (15, 17)}},
+        }
+        result = runner.run_lead_study('3NT', 'S', num_simulations=3, generator_params=generator_params)
+        self.assertEqual(result['leader'], 'W')
+        self.assertEqual(result['simulations_run'], 3)
+        self.assertEqual(set(result['ranking']), {'SK', 'S7', 'S2', 'HA', 'DT', 'D6', 'C4'})
+        for stats in result['leads'].values():
+            self.assertTrue(0 <= stats['set_probability'] <= 1)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest import mock
+from bridge_simulator import sweep
+from bridge_simulator.simulator import SimulationRunner
+
+STAYMAN = {"name": "Stayman", "root": {
+    "type": "branch",
+    "condition": {"type": "suit_length", "suit": "H", "operator": ">=", "value": 4},
+    "true_branch": {"type": "contract", "contract": "2H", "declarer": "N"},
+    "false_branch": {"type": "contract", "contract": "1N", "declarer": "N"}
+}}
+PASS_1NT = {"name": "Pass1NT", "root": {"type": "contract", "contract": "1N", "declarer": "N"}}
+GENERATOR_PARAMS = {
+    'predeal': {'S': 'K842 QT72 986 52'},
+    'smart_stack': {'N': {'shape': 'balanced', 'hcp': (15, 17)}}
+}
+GRID = {
+    'generator_params.smart_stack.N.hcp': [[14, 16], [15, 17]],
+    'strategies.0.root.condition.value': [4, 5],
+}
+
+class TestGrid(unittest.TestCase):
+    def test_points_and_superset(self):
+        """Points are the product of the grid; the pool covers the union of swept ranges."""
+        points = sweep.grid_points(GRID)
+        self.assertEqual(len(points), 4)
+        self.assertEqual(points[0], {'generator_params.smart_stack.N.hcp': [14, 16],
+                                     'strategies.0.root.condition.value': 4})
+        superset = sweep.superset_params(GENERATOR_PARAMS, GRID)
+        self.assertEqual(superset['smart_stack']['N']['hcp'], (14, 17))
+        self.assertEqual(GENERATOR_PARAMS['smart_stack']['N']['hcp'], (15, 17))
+        with self.assertRaises(ValueError):
+            sweep.grid_points({'num_events': [1, 2]})
+
+    def test_superset_drops_swept_shapes(self):
+        """Sweeping a SmartStack's shape deals that seat freely in the pool."""
+        grid = {'generator_params.smart_stack.N.shape': ['balanced', 'semibalanced'],
+                'generator_params.smart_stack.N.hcp': [[14, 16], [15, 17]]}
+        superset = sweep.superset_params(GENERATOR_PARAMS, grid)
+        self.assertNotIn('N', superset['smart_stack'])
+        self.assertEqual(superset['predeal'], GENERATOR_PARAMS['predeal'])
+
+    def test_sweep_over_shape(self):
+        """Each shape point keeps only its own deals from the freely dealt pool."""
+        grid = {'generator_params.smart_stack.N.shape': ['balanced', 'semibalanced']}
+        report = sweep.run_grid(SimulationRunner(), [STAYMAN, PASS_1NT], grid, num_simulations=10,
+                                generator_params=GENERATOR_PARAMS)
+        balanced, semibalanced = report['points']
+        self.assertGreater(balanced['simulations_run'], 0)
+        # Every balanced hand is also semi-balanced
+        self.assertGreaterEqual(semibalanced['simulations_run'], balanced['simulations_run'])
+        self.assertEqual(report['paired'][0]['shared_deals'], balanced['simulations_run'])
+
+    def test_points_share_pool_and_solves(self):
+        """Every point draws from one pool; identical points pair with zero difference."""
+        grid = {'strategies.0.root.condition.value': [4, 4]}
+        report = sweep.run_grid(SimulationRunner(), [STAYMAN, PASS_1NT], grid, num_simulations=10,
+                                generator_params=GENERATOR_PARAMS)
+        self.assertEqual(report['method'], 'sweep')
+        first, second = report['points']
+        self.assertEqual(first['simulations_run'], report['pool_size'])
+        self.assertEqual(first['stats']['Stayman_score'], second['stats']['Stayman_score'])
+        paired = report['paired'][0]
+        self.assertEqual(paired['shared_deals'], report['pool_size'])
+        self.assertEqual(paired['stats']['diff_Stayman_score']['mean'], 0)
+        # 1NT on every deal, 2H where North has four hearts: once each, not once per point
+        self.assertGreaterEqual(report['dds_solved'], report['pool_size'])
+        self.assertLessEqual(report['dds_solved'], 2 * report['pool_size'])
+
+    def test_oversized_sweeps_are_refused(self):
+        """Sweeps over the event or pool limit are refused before any deal is dealt."""
+        grid = {'generator_params.smart_stack.N.hcp': [[14, 16], [15, 17]]}
+        runner = SimulationRunner()
+        with mock.patch.object(runner.generator, 'yield_deals') as yield_deals:
+            with self.assertRaises(ValueError):
+                sweep.run_grid(runner, [PASS_1NT], grid, num_simulations=sweep.MAX_SIMULATIONS + 1,
+                               generator_params=GENERATOR_PARAMS)
+            with mock.patch.object(sweep, 'MAX_POOL_SIZE', 5), self.assertRaises(ValueError):
+                sweep.run_grid(runner, [PASS_1NT], grid, num_simulations=10, generator_params=GENERATOR_PARAMS)
+        yield_deals.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
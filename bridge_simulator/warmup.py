@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+# Budget for importing app.py (Flask and our light modules only). Exceeding it
+# is logged as a warning so regressions in cold start are visible in the logs.
+IMPORT_BUDGET_MS = float(os.environ.get('BRIDGE_IMPORT_BUDGET_MS', 500))
+
+# SmartStacks most used by the Simulation Lab, as (North's config, predeal);
+# built before the first request. The generator caches a stack per predeal, so
+# the predealt scenarios the app ships (simulations/major_vs_1nt.py and the
+# load-test payloads) are listed with their exact South hand.
+POPULAR_SMART_STACKS = [
+    ({'shape': 'balanced', 'hcp': (15, 17)}, None),
+    ({'shape': 'balanced', 'hcp': (12, 14)}, None),
+    ({'shape': 'balanced', 'hcp': (20, 21)}, None),
+    ({'shape': 'balanced', 'hcp': (0, 5)}, None),
+    ({'shape': 'balanced', 'hcp': (15, 17)}, {'S': 'K842 QT72 986 52'}),
+    ({'shape': 'balanced', 'hcp': (0, 5)}, {'S': 'AKQJ AKQJ AK AK'}),
+]
+
+# Phase name -> duration in seconds, in the order the phases finished
+phases: Dict[str, float] = {}
+_ready = threading.Event()
+_started = False
+_start_lock = threading.Lock()
+
+
+def log(message: str):
+    print(f"[startup] {message}", flush=True)
+
+
+@contextmanager
+def phase(name: str):
+    """Time a startup phase and report it in the logs."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = time.perf_counter() - start
+        log(f"{name}: {phases[name] * 1000:.0f} ms")
+
+
+def report_import_time(seconds: float):
+    phases['app_import'] = seconds
+    if seconds * 1000 > IMPORT_BUDGET_MS:
+        log(f"WARNING app import took {seconds * 1000:.0f} ms, over the {IMPORT_BUDGET_MS:.0f} ms budget")
+    else:
+        log(f"app_import: {seconds * 1000:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)")
+
+
+def warm_up():
+    """
+    Pay every one-off cost before the first real request: import redeal and
+    load libdds, run one solve so DDS allocates its threads and memory, and
+    build the popular SmartStacks into the generator cache.
+
+    SmartStacks are cached per predeal, because their tables count only the
+    cards left after it. A request that predeals a hand not listed in
+    POPULAR_SMART_STACKS, such as a South hand typed into the UI, still builds
+    its stack on first use.
+    """
+    total_start = time.perf_counter()
+    try:
+        with phase('import_redeal'):
+            from .hand_generator import BridgeHandGenerator
+            from .double_dummy import DoubleDummySolver
+
+        generator = BridgeHandGenerator()
+        with phase('dds_init'):
+            deal = next(generator.yield_deals(num_hands=1))
+            DoubleDummySolver(deal).get_tricks('1N', 'N')
+
+        with phase('smart_stack_prebuild'):
+            for config, predeal in POPULAR_SMART_STACKS:
+                generator._prepare_dealer(None, None, None, None, None, None, {'N': config}, predeal)
+    except Exception as e:
+        # A failed warm-up only means the first request pays the cost itself.
+        log(f"warm-up failed: {e}")
+    finally:
+        phases['warm_up_total'] = time.perf_counter() - total_start
+        log(f"ready after {phases['warm_up_total'] * 1000:.0f} ms of warm-up")
+        _ready.set()
+
+
+def start_background_warmup():
+    """Start warm_up() on a daemon thread once per process."""
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=warm_up, name='bridge-warmup', daemon=True).start()
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def wait_until_ready(timeout: float = 30.0) -> bool:
+    """
+    Block until a running warm-up has finished so a request never initialises
+    DDS at the same time. Returns immediately when no warm-up was started.
+    """
+    if not _started:
+        return True
+    return _ready.wait(timeout)
@@ -0,0 +1,17 @@
+# gunicorn settings for the Docker / Fly.io deployment
+bind = "0.0.0.0:8080"
+timeout = 120
+
+# One process on the 512 MB VM, with threads so status polls and
+# generate-hands requests are served while a simulation is running.
+# The generator is stateless and DDS calls are serialized by a lock.
+workers = 1
+worker_class = "gthread"
+threads = 4
+
+
+def post_worker_init(worker):
+    # Each worker loads libdds and builds SmartStacks in the background while it
+    # already answers health checks, instead of on the first simulate request.
+    from bridge_simulator import warmup
+    warmup.start_background_warmup()
@@ -6,7 +6,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from bridge_simulator.simulator import SimulationRunner
 
-def major_vs_1nt_callback(deal, solver):
+def major_vs_1nt_callback(deal, solver, vulnerability='none'):
     """
     Simulation Callback for comparing 1NT vs Weak Major Suit Stayman.
     
@@ -24,6 +24,8 @@ def major_vs_1nt_callback(deal, solver):
     4. If North bids 2D (no major): We play 2D (South passes 2D? or North Declarer?).
        Usually Stayman responses are by Opener (N). 2D is N. South passes.
        So contract is 2D by North.
+
+    vulnerability is the board's ('none', 'NS', 'EW' or 'both').
     """
     
     # 1. Determine Contract for "Strategy B" (Stayman)
@@ -54,10 +56,8 @@ def major_vs_1nt_callback(deal, solver):
             stayman_declarer = "S"
         
     # 2. Compare Scores
-    # Vulnerability: False (Simplifying assumption, or could be random)
-    
-    score_1nt = solver.get_score("1N", "N", vulnerable=False)
-    score_stayman = solver.get_score(stayman_contract, stayman_declarer, vulnerable=False)
+    score_1nt = solver.get_score("1N", "N", vulnerable=vulnerability)
+    score_stayman = solver.get_score(stayman_contract, stayman_declarer, vulnerable=vulnerability)
     
     return {
         'score_1nt': score_1nt,
@@ -69,6 +69,25 @@ def major_vs_1nt_callback(deal, solver):
         'push': 1 if score_1nt == score_stayman else 0
     }
 
+# Exact South Hand
+# S: K842, H: QT72, D: 986, C: 52
+PARAMS = {
+    'smart_stack': {
+        'N': {'shape': 'balanced', 'hcp': (15, 17)}
+    },
+    'predeal': {
+        'S': "K842 QT72 986 52"
+    }
+}
+
+# Picked up by the batch runner: python -m bridge_simulator run simulations/major_vs_1nt.py
+SCENARIO = {
+    'name': 'major_vs_1nt',
+    'generator_params': PARAMS,
+    'callback': major_vs_1nt_callback,
+    'num_simulations': 1000,
+}
+
 def run():
     print("Running Simulation: 1NT vs Stayman (Selected Hand)")
     print("South: K842 QT72 986 52")
@@ -77,29 +96,21 @@ def run():
     
     runner = SimulationRunner()
     
-    # Exact South Hand
-    # S: K842, H: QT72, D: 986, C: 52
-    south_hand_str = "K842 QT72 986 52"
-    
-    params = {
-        'smart_stack': {
-            'N': {'shape': 'balanced', 'hcp': (15, 17)}
-        },
-        'predeal': {
-            'S': south_hand_str
-        }
-    }
-    
-    results = runner.run(major_vs_1nt_callback, num_simulations=1000, generator_params=params)
+    # Every vulnerability is scored from the same deals and trick counts
+    results = runner.run_sweep(
+        lambda vulnerability: lambda deal, solver: major_vs_1nt_callback(deal, solver, vulnerability),
+        num_simulations=1000, generator_params=PARAMS)
     
     stats = results['stats']
     n_sims = results['simulations_run']
     
     print(f"Simulations Run: {n_sims}")
-    print(f"1NT Mean Score: {stats['score_1nt']['mean']:.2f}")
-    print(f"Stayman Mean Score: {stats['score_stayman']['mean']:.2f}")
-    print(f"Avg Gain from Stayman: {stats['stayman_gain']['mean']:.2f} points")
+    print(f"{'Vulnerable':<12}{'1NT':>10}{'Stayman':>10}{'Gain':>10}")
+    for vulnerability, vul_stats in results['vulnerabilities'].items():
+        print(f"{vulnerability:<12}{vul_stats['score_1nt']['mean']:>10.2f}"
+              f"{vul_stats['score_stayman']['mean']:>10.2f}{vul_stats['stayman_gain']['mean']:>10.2f}")
     print("-" * 40)
+    print("Not vulnerable:")
     
     win_pct = (stats['stayman_beats_1nt']['mean'] * 100)
     loss_pct = (stats['1nt_beats_stayman']['mean'] * 100)